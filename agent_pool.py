@@ -0,0 +1,321 @@
+import asyncio
+import queue
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
+
+from decouple import config
+from llama_index.core.chat_engine.types import StreamingAgentChatResponse
+from llama_index.core.llms import ChatMessage, MessageRole
+
+
+# Sessions that have not been used for this many seconds are dropped.
+AGENT_IDLE_TIMEOUT = config("AGENT_IDLE_TIMEOUT", default=1800, cast=float)
+# Hard cap on live sessions; the least recently used one is dropped first.
+AGENT_MAX_SESSIONS = config("AGENT_MAX_SESSIONS", default=500, cast=int)
+# Worker threads shared by every pool for running blocking agent turns.
+AGENT_WORKERS = config("AGENT_WORKERS", default=8, cast=int)
+
+# Agent turns make blocking OpenAI/Qdrant/Cohere calls, so they run here
+# instead of on the discord.py event loop.
+agent_executor = ThreadPoolExecutor(
+    max_workers=AGENT_WORKERS, thread_name_prefix="agent"
+)
+
+
+@contextmanager
+def memory_written(agent: Any) -> Iterator[Optional[threading.Event]]:
+    """
+    Event set once llama-index's writer thread has put a streamed turn into the
+    agent's memory. That thread sets response.is_done before the write, which
+    happens in the agent worker's finalize_task, so the turn only ends with it.
+    Yields None for agents without a worker.
+    """
+    worker = getattr(agent, "agent_worker", None)
+    if worker is None:
+        yield None
+        return
+    turn_thread = threading.current_thread()
+    written = threading.Event()
+    finalize_task = worker.finalize_task
+
+    def finalize_and_signal(task, **kwargs):
+        try:
+            finalize_task(task, **kwargs)
+        finally:
+            # finalize_response also finalizes, on the turn's own thread
+            if threading.current_thread() is not turn_thread:
+                written.set()
+
+    worker.finalize_task = finalize_and_signal
+    try:
+        yield written
+    finally:
+        vars(worker).pop("finalize_task", None)
+
+
+class AgentSession:
+    """A long-lived agent for one bot/user plus its usage bookkeeping."""
+
+    def __init__(self, key: str, agent: Any):
+        self.key = key
+        self.agent = agent
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.turns = 0
+        # Set by AgentPool.abandon while a turn may still be running
+        self.abandoned = False
+
+
+class AgentPool:
+    """
+    Builds one agent per session key and keeps it alive across turns.
+    :param build_agent: Callable that takes a session key and returns a new agent.
+    :param idle_timeout: Seconds of inactivity after which a session is evicted.
+    :param max_sessions: Maximum number of live sessions kept in the pool.
+    :param executor: Thread pool used by achat to run agent turns.
+    """
+
+    def __init__(
+        self,
+        build_agent: Callable[[str], Any],
+        idle_timeout: float = AGENT_IDLE_TIMEOUT,
+        max_sessions: int = AGENT_MAX_SESSIONS,
+        executor: ThreadPoolExecutor = agent_executor,
+    ):
+        self.build_agent = build_agent
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.executor = executor
+        self._sessions: "OrderedDict[str, AgentSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        # One turn at a time per session; locks disappear once nobody holds them.
+        self._turn_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = (
+            weakref.WeakValueDictionary()
+        )
+        self.built = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._sessions
+
+    def get(self, key: str) -> AgentSession:
+        """Return the session for a key, building its agent on first use."""
+        with self._lock:
+            self._evict_idle()
+            session = self._sessions.get(key)
+            if session is None:
+                session = AgentSession(key, self.build_agent(key))
+                self._sessions[key] = session
+                self.built += 1
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+                    self.evicted += 1
+            else:
+                self._sessions.move_to_end(key)
+            session.last_used = time.monotonic()
+            return session
+
+    def chat(self, key: str, message: str):
+        """Send a message to the session's agent and return its response."""
+        session = self.get(key)
+        with self._discard_if_abandoned(session):
+            response = session.agent.chat(message)
+        session.turns += 1
+        return response
+
+    def stream_chat(self, key: str, message: str, on_delta: Callable[[str], None]):
+        """
+        Send a message to the session's agent, passing each piece of the final
+        answer to on_delta as the LLM produces it. Tool steps still run first.
+        Returns once the turn is written to the agent's memory.
+        :return: The full answer.
+        """
+        session = self.get(key)
+        discard = self._discard_if_abandoned(session)
+        with discard, memory_written(session.agent) as written:
+            response = session.agent.stream_chat(message)
+            session.turns += 1
+            if not isinstance(response, StreamingAgentChatResponse):
+                # The agent answered without a final streaming step
+                on_delta(response.response)
+                return response.response
+            try:
+                # Blocking reads from the response's queue; its response_gen spins
+                # on sleep(0) between tokens, which would starve the event loop's
+                # thread.
+                while not response.is_done or not response.queue.empty():
+                    if response.exception is not None:
+                        raise response.exception
+                    try:
+                        delta = response.queue.get(timeout=0.05)
+                    except queue.Empty:
+                        continue
+                    response.unformatted_response += delta
+                    on_delta(delta)
+                if response.exception is not None:
+                    raise response.exception
+            finally:
+                # Wait for the memory write, which a failed stream never makes
+                while written is not None and not written.wait(0.05):
+                    if response.exception is not None:
+                        break
+        response.response = response.unformatted_response.strip()
+        return response.response
+
+    def _turn_lock(self, key: str) -> asyncio.Lock:
+        lock = self._turn_locks.get(key)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._turn_locks[key] = lock
+        return lock
+
+    async def achat(self, key: str, message: str):
+        """
+        Run a turn on the executor without blocking the event loop.
+        Turns for the same key are serialized so they never share an agent's memory.
+        """
+        async with self._turn_lock(key):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, self.chat, key, message)
+
+    async def astream_chat(self, key: str, message: str) -> AsyncIterator[str]:
+        """
+        Run a streaming turn on the executor and yield the answer's pieces on
+        the event loop as they arrive. Serialized per key like achat.
+        The turn runs in its own task, so the key stays locked until the turn
+        is in the agent's memory, and no longer, even if the consumer stops
+        iterating early.
+        """
+        loop = asyncio.get_running_loop()
+        deltas: "asyncio.Queue[Any]" = asyncio.Queue()
+
+        async def run_turn():
+            async with self._turn_lock(key):
+                try:
+                    return await loop.run_in_executor(
+                        self.executor,
+                        self.stream_chat,
+                        key,
+                        message,
+                        lambda delta: loop.call_soon_threadsafe(
+                            deltas.put_nowait, delta
+                        ),
+                    )
+                finally:
+                    # Runs on the loop after every delta the turn queued
+                    deltas.put_nowait(None)
+
+        turn = asyncio.create_task(run_turn())
+        # An abandoned turn's error is not reported as never retrieved
+        turn.add_done_callback(lambda task: task.cancelled() or task.exception())
+        while True:
+            delta = await deltas.get()
+            if delta is None:
+                break
+            yield delta
+        await turn
+
+    def set_last_reply(self, key: str, reply: str, turns: int = 1) -> None:
+        """
+        Fold the session's last turns into one answered by reply, e.g. when the
+        reply that was sent is not the one the agent gave.
+        :param turns: Latest turns to fold; the first one's user message is kept.
+        """
+        memory = getattr(self.get(key).agent, "memory", None)
+        if memory is None:
+            return
+        messages = memory.get_all()
+        starts = [i for i, m in enumerate(messages) if m.role == MessageRole.USER]
+        if len(starts) < turns:
+            return
+        memory.set(
+            messages[: starts[-turns] + 1]
+            + [ChatMessage(role=MessageRole.ASSISTANT, content=reply)]
+        )
+
+    async def aset_last_reply(self, key: str, reply: str, turns: int = 1) -> None:
+        """set_last_reply, waiting for any turn of the session to end first."""
+        async with self._turn_lock(key):
+            self.set_last_reply(key, reply, turns)
+
+    def add_turn(self, key: str, message: str, reply: str) -> None:
+        """
+        Record a turn answered without the agent, e.g. by the intent router, so
+        the agent sees it in its history on the next message.
+        """
+        memory = getattr(self.get(key).agent, "memory", None)
+        if memory is None:
+            return
+        memory.put(ChatMessage(role=MessageRole.USER, content=message))
+        memory.put(ChatMessage(role=MessageRole.ASSISTANT, content=reply))
+
+    async def aadd_turn(self, key: str, message: str, reply: str) -> None:
+        """add_turn off the event loop, after any turn of the session has ended."""
+        async with self._turn_lock(key):
+            await asyncio.to_thread(self.add_turn, key, message, reply)
+
+    def remove(self, key: str) -> None:
+        """Drop a session so the next message rebuilds it."""
+        with self._lock:
+            self._sessions.pop(key, None)
+
+    def abandon(self, key: str) -> None:
+        """
+        Drop a session whose turn is still running, e.g. one that timed out, so
+        the next message rebuilds it. The old agent's memory is moved to a
+        scratch key of its chat store, so the late turn cannot overwrite the
+        history the new agent reads; the scratch history is deleted once the
+        turn ends.
+        """
+        with self._lock:
+            session = self._sessions.pop(key, None)
+        if session is None:
+            return
+        session.abandoned = True
+        memory = getattr(session.agent, "memory", None)
+        if getattr(memory, "chat_store_key", None) is not None:
+            memory.chat_store_key = f"{key}:abandoned:{id(session):x}"
+
+    @contextmanager
+    def _discard_if_abandoned(self, session: AgentSession) -> Iterator[None]:
+        """Run a turn, deleting what it wrote if the session is abandoned meanwhile."""
+        try:
+            yield
+        finally:
+            memory = getattr(session.agent, "memory", None)
+            if session.abandoned and getattr(memory, "chat_store", None) is not None:
+                memory.chat_store.delete_messages(memory.chat_store_key)
+
+    def evict_idle(self) -> List[str]:
+        """Evict sessions idle for longer than idle_timeout and return their keys."""
+        with self._lock:
+            return self._evict_idle()
+
+    def _evict_idle(self) -> List[str]:
+        cutoff = time.monotonic() - self.idle_timeout
+        evicted = []
+        # The dict is kept in LRU order, so idle sessions are always at the front.
+        for key, session in self._sessions.items():
+            if session.last_used > cutoff:
+                break
+            evicted.append(key)
+        for key in evicted:
+            del self._sessions[key]
+        self.evicted += len(evicted)
+        return evicted
+
+    def stats(self) -> Dict[str, int]:
+        """Return counters describing the pool."""
+        return {
+            "sessions": len(self._sessions),
+            "built": self.built,
+            "evicted": self.evicted,
+        }
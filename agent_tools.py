@@ -1,55 +1,134 @@
-import requests
 import json
-import feedparser
-from textblob import TextBlob
-from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Optional, Union
 from decouple import config
+from coin_resolver import COIN_LIST_PATH, CoinResolver
+from http_client import AsyncHTTPClient, HTTPRequestError, http_client
+from market_data import MarketDataCache, normalize_coin_ids
+from market_snapshot import MarketPoller, MarketSnapshotStore
+from news_feed import NEWS_STORE_PATH, NewsIngestion, NewsStore
 from schemas import BinancePriceData, CoingeckoMarketData
+from sentiment import SentimentAnalyzer, parse_timestamp
 
 
 class CryptoTools:
-    def __init__(self):
-        self.coingecko_base_url = "https://api.coingecko.com/api/v3"
-        self.binance_base_url = "https://api.binance.com/api/v3"
-        self.rss_feed_urls = [
+    """
+    Market data and news fetchers for the agents.
+    The fetchers are async and share the pooled http_client; the sync methods of
+    the same name wrap them for the FunctionTools.
+    :param http: HTTP client; the base URLs can point at a local stub server.
+    :param snapshot: Market snapshot kept fresh by a MarketPoller; coins found
+        in it are answered without a network call.
+    :param coin_list_path: Where the coin list behind the ticker and name
+        resolver is cached.
+    :param rss_feed_urls: RSS or Atom feeds to aggregate news from.
+    :param news_store_path: SQLite database of seen articles and feed validators.
+    """
+
+    def __init__(
+        self,
+        http: Optional[AsyncHTTPClient] = None,
+        coingecko_base_url: str = "https://api.coingecko.com/api/v3",
+        binance_base_url: str = "https://api.binance.com/api/v3",
+        cryptopanic_base_url: str = "https://cryptopanic.com/api/v1",
+        snapshot: Optional[MarketSnapshotStore] = None,
+        coin_list_path: str = COIN_LIST_PATH,
+        rss_feed_urls: Optional[List[str]] = None,
+        news_store_path: str = NEWS_STORE_PATH,
+    ):
+        self.http = http or http_client
+        self.coingecko_base_url = coingecko_base_url
+        self.binance_base_url = binance_base_url
+        self.cryptopanic_base_url = cryptopanic_base_url
+        self.snapshot = snapshot
+        # Runs on the HTTP client's loop, like every fetcher
+        self.market_data = MarketDataCache(self.afetch_coingecko_markets)
+        self.coin_resolver = CoinResolver(
+            self.afetch_coingecko_list, path=coin_list_path
+        )
+        self.rss_feed_urls = rss_feed_urls or [
             "https://cointelegraph.com/rss",
             "https://www.coindesk.com/arc/outboundfeeds/rss/",
             "https://decrypt.co/feed",
         ]
+        self.sentiment = SentimentAnalyzer()
+        self.news = NewsIngestion(
+            self.http,
+            NewsStore(news_store_path),
+            self.rss_feed_urls,
+            fetch_extra=self.afetch_cryptopanic_news,
+        )
 
     # Crypto Data Fetchers
-    def fetch_coingecko_list(self):
+    async def afetch_coingecko_list(self):
         """
         Fetches a list of supported cryptocurrencies from CoinGecko.
         """
         url = f"{self.coingecko_base_url}/coins/list"
-        response = requests.get(url)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            print(f"Error fetching CoinGecko data: {response.status_code}")
+        try:
+            return await self.http.get_json(url)
+        except HTTPRequestError as e:
+            print(f"Error fetching CoinGecko data: {e}")
             return None
 
-    def fetch_coingecko_market_data(self, coin_id: str):
+    async def afetch_coingecko_markets(self, coin_ids: List[str]):
         """
-        Fetches market data for a specific cryptocurrency from CoinGecko.
-        :param coin_id: The ID of the cryptocurrency (e.g., 'bitcoin').
-        :return: JSON data of market information.
+        Fetches market data for several cryptocurrencies in one CoinGecko request.
+        :param coin_ids: The IDs of the cryptocurrencies (e.g., ['bitcoin', 'pepe']).
+        :return: JSON list of market information, one entry per known coin.
         """
         url = f"{self.coingecko_base_url}/coins/markets"
         params = {
             "vs_currency": "usd",
-            "ids": coin_id,
+            "ids": ",".join(coin_ids),
+            "per_page": len(coin_ids),
         }
-        response = requests.get(url, params=params)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            print(f"Error fetching CoinGecko data: {response.status_code}")
+        try:
+            return await self.http.get_json(url, params=params)
+        except HTTPRequestError as e:
+            print(f"Error fetching CoinGecko data: {e}")
             return None
 
-    def fetch_binance_price(self, symbol: str):
+    async def afetch_coingecko_market_data(self, coin_ids: Union[str, List[str]]):
+        """
+        Fetches market data for one or more cryptocurrencies from CoinGecko.
+        Tickers, names and $cashtags are resolved to coin IDs locally first.
+        Recently fetched coins are served from a TTL cache and the rest are
+        fetched together in one request.
+        :param coin_ids: Coin IDs, tickers or names, as one value, a
+            comma-separated string or a list (e.g., 'bitcoin' or ['btc', '$PEPE']).
+        :return: JSON list of market information, plus an error entry for each
+            query that matches no coin.
+        """
+        if isinstance(coin_ids, str):
+            coin_ids = [coin_ids]
+        await self.http.submit(self.coin_resolver.ensure_fresh())
+        coin_ids, unresolved = self.coin_resolver.resolve_many(
+            normalize_coin_ids(coin_ids)
+        )
+        errors = [
+            {"query": query, "error": "No CoinGecko coin matches this ticker or name"}
+            for query in unresolved
+        ]
+        from_snapshot = {}
+        if self.snapshot is not None:
+            for coin_id in coin_ids:
+                market = self.snapshot.get_coin(coin_id)
+                if market is not None:
+                    from_snapshot[coin_id] = market
+        missing = [c for c in coin_ids if c not in from_snapshot]
+        if not missing:
+            return [from_snapshot[c] for c in coin_ids] + errors
+        fetched = {
+            market["id"]: market
+            for market in await self.http.submit(self.market_data.get(missing))
+        }
+        return [
+            from_snapshot.get(c) or fetched[c]
+            for c in coin_ids
+            if c in from_snapshot or c in fetched
+        ] + errors
+
+    async def afetch_binance_price(self, symbol: str):
         """
         Fetches the latest price for a trading pair from Binance.
         :param symbol: The trading pair symbol (e.g., 'BTCUSDT').
@@ -57,85 +136,137 @@ class CryptoTools:
         """
         url = f"{self.binance_base_url}/ticker/price"
         params = {"symbol": symbol}
-        response = requests.get(url, params=params)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            print(f"Error fetching Binance data: {response.status_code}")
+        try:
+            return await self.http.get_json(url, params=params)
+        except HTTPRequestError as e:
+            print(f"Error fetching Binance data: {e}")
             return None
 
+    async def afetch_binance_prices(self, symbols: List[str]):
+        """
+        Fetches the latest prices for several trading pairs in one Binance request.
+        :param symbols: The trading pair symbols (e.g., ['BTCUSDT', 'ETHUSDT']).
+        :return: JSON list of the latest prices.
+        """
+        url = f"{self.binance_base_url}/ticker/price"
+        params = {"symbols": json.dumps(symbols, separators=(",", ":"))}
+        try:
+            return await self.http.get_json(url, params=params)
+        except HTTPRequestError as e:
+            print(f"Error fetching Binance data: {e}")
+            return None
+
+    def fetch_price_momentum(self, coin_ids: List[str], window_minutes: float = 60):
+        """
+        Summarizes recent price moves of watched coins from the local price series:
+        first and last price, percent change, high and low over the window.
+        Answered without any network call; coins not on the watchlist are skipped.
+        :param coin_ids: CoinGecko coin IDs, tickers or names (e.g., ['bitcoin', 'pepe']).
+        :param window_minutes: How far back to look, up to 1440 (24 hours).
+        """
+        if self.snapshot is None:
+            return []
+        results = []
+        coin_ids, _ = self.coin_resolver.resolve_many(normalize_coin_ids(coin_ids))
+        for coin_id in coin_ids:
+            momentum = self.snapshot.momentum(f"coin:{coin_id}", window_minutes)
+            if momentum is not None:
+                market = self.snapshot.coins.get(coin_id, {})
+                momentum["price_change_percentage_24h"] = market.get(
+                    "price_change_percentage_24h"
+                )
+                results.append(momentum)
+        return results
+
     # News Fetchers
-    def fetch_cryptopanic_news(self) -> List[Dict]:
+    async def afetch_cryptopanic_news(self) -> List[Dict]:
         """Fetch crypto news from CryptoPanic API."""
-        url = "https://cryptopanic.com/api/v1/posts/"
+        url = f"{self.cryptopanic_base_url}/posts/"
         params = {
             "auth_token": config("CRYPTOPANIC_API_KEY"),
             "filter": "trending",
             "kind": "news",
         }
-        response = requests.get(url, params=params)
-        if response.status_code == 200:
-            data = response.json()
-            return [
-                {
-                    "title": article.get("title"),
-                    "url": article.get("url"),
-                    "source": "CryptoPanic",
-                    "published_at": article.get("published_at"),
-                    "sentiment": article.get("votes", {}).get("important", "neutral"),
-                }
-                for article in data.get("results", [])
-            ]
-        else:
-            raise Exception("Failed to fetch news from CryptoPanic API")
+        try:
+            data = await self.http.get_json(url, params=params)
+        except HTTPRequestError as e:
+            raise Exception("Failed to fetch news from CryptoPanic API") from e
+        return [
+            {
+                "title": article.get("title"),
+                "url": article.get("url"),
+                "source": "CryptoPanic",
+                "published_at": article.get("published_at"),
+                "sentiment": article.get("votes", {}).get("important", "neutral"),
+            }
+            for article in data.get("results", [])
+        ]
+
+    # Sync wrappers used by the FunctionTools
+    def fetch_coingecko_list(self):
+        """
+        Fetches a list of supported cryptocurrencies from CoinGecko.
+        """
+        return self.http.run_sync(self.afetch_coingecko_list())
+
+    def fetch_coingecko_market_data(self, coin_ids: Union[str, List[str]]):
+        """
+        Fetches market data for one or more cryptocurrencies from CoinGecko.
+        :param coin_ids: A coin ID, a comma-separated string or a list of IDs
+            (e.g., 'bitcoin' or ['bitcoin', 'pepe']).
+        :return: JSON list of market information.
+        """
+        return self.http.run_sync(self.afetch_coingecko_market_data(coin_ids))
+
+    def fetch_binance_price(self, symbol: str):
+        """
+        Fetches the latest price for a trading pair from Binance.
+        :param symbol: The trading pair symbol (e.g., 'BTCUSDT').
+        :return: JSON data of the latest price.
+        """
+        return self.http.run_sync(self.afetch_binance_price(symbol))
+
+    def fetch_cryptopanic_news(self) -> List[Dict]:
+        """Fetch crypto news from CryptoPanic API."""
+        return self.http.run_sync(self.afetch_cryptopanic_news())
+
+    async def afetch_rss_news(self) -> List[Dict]:
+        """
+        Fetch crypto news from all RSS feeds at once. Feeds unchanged since the
+        last aggregation answer 304 and contribute no articles.
+        """
+        articles, _ = await self.news.fetch_feeds()
+        return articles
 
     def fetch_rss_news(self) -> List[Dict]:
         """Fetch crypto news from RSS feeds."""
-        articles = []
-        for url in self.rss_feed_urls:
-            feed = feedparser.parse(url)
-            for entry in feed.entries:
-                articles.append(
-                    {
-                        "title": entry.title,
-                        "url": entry.link,
-                        "source": feed.feed.title,
-                        "published_at": (
-                            entry.published if hasattr(entry, "published") else None
-                        ),
-                        "content": entry.summary,
-                    }
-                )
-        return articles
+        return self.http.run_sync(self.afetch_rss_news())
 
     # Sentiment Analysis
     def analyze_sentiment(self, text: str) -> str:
         """Perform sentiment analysis using TextBlob."""
-        analysis = TextBlob(text)
-        if analysis.sentiment.polarity > 0:
-            return "bullish"
-        elif analysis.sentiment.polarity < 0:
-            return "bearish"
-        else:
-            return "neutral"
+        return self.sentiment.analyze_batch([text])[0]
 
     # News Processing
     def process_news_articles(self, articles: List[Dict]) -> List[Dict]:
-        """Process news articles by adding sentiment and formatting timestamps."""
-        for article in articles:
-            content = article.get("content", article.get("title", ""))
-            article["sentiment"] = self.analyze_sentiment(content)
+        """
+        Process news articles by adding sentiment and formatting timestamps.
+        Sentiment is scored for the whole batch at once and remembered by
+        content, so articles seen in an earlier call are not scored again.
+        """
+        labels = self.sentiment.analyze_batch(
+            [
+                article.get("content") or article.get("title") or ""
+                for article in articles
+            ]
+        )
+        for article, label in zip(articles, labels):
+            article["sentiment"] = label
             if article.get("published_at"):
-                try:
-                    # Try to parse the datetime with the expected format
-                    article["published_at"] = datetime.strptime(
-                        article["published_at"], "%Y-%m-%dT%H:%M:%S%z"
-                    ).strftime("%Y-%m-%d %H:%M:%S")
-                except ValueError:
-                    # If the first format fails, try parsing with the alternative format
-                    article["published_at"] = datetime.strptime(
-                        article["published_at"], "%a, %d %b %Y %H:%M:%S %z"
-                    ).strftime("%Y-%m-%d %H:%M:%S")
+                # Unknown formats are kept as they are
+                article["published_at"] = (
+                    parse_timestamp(article["published_at"]) or article["published_at"]
+                )
         return articles
 
     # Save to JSON
@@ -145,37 +276,32 @@ class CryptoTools:
             json.dump(data, f, indent=4)
 
     # Main function to aggregate and process news
-    def aggregate_and_process_news(self, rss_feeds: List[str]):
-        """Aggregate news from CryptoPanic and RSS feeds, then process and save to JSON."""
-        print("Fetching news from CryptoPanic...")
-        cryptopanic_news = self.fetch_cryptopanic_news()
-
-        print("Fetching news from RSS feeds...")
-        rss_feeds = [
-            "https://cointelegraph.com/rss",
-            "https://www.coindesk.com/arc/outboundfeeds/rss/",
-            "https://decrypt.co/feed",
-        ]
-        rss_news = self.fetch_rss_news(rss_feeds)
-
-        print("Processing news articles...")
-        all_articles = cryptopanic_news + rss_news
-        processed_articles = self.process_news_articles(all_articles)
-        return processed_articles
+    async def aaggregate_news(self, rss_feeds: Optional[List[str]] = None):
+        """
+        Aggregate news from CryptoPanic and RSS feeds, returning only articles
+        not seen in an earlier aggregation, de-duplicated by URL and title.
+        :param rss_feeds: Feeds to read instead of rss_feed_urls.
+        """
+        return await self.news.collect(rss_feeds)
 
-        # print("Saving processed news to JSON file...")
-        # self.save_to_json(processed_articles, "crypto_news.json")
+    def aggregate_and_process_news(self, rss_feeds: Optional[List[str]] = None):
+        """Aggregate new articles from CryptoPanic and RSS feeds, then process them."""
+        print("Fetching news from CryptoPanic and RSS feeds...")
+        new_articles = self.http.run_sync(self.aaggregate_news(rss_feeds))
 
-        # print("News aggregation completed! File saved as crypto_news.json")
+        print(f"Processing {len(new_articles)} new news articles...")
+        return self.process_news_articles(new_articles)
 
 
-crypto_tools = CryptoTools()
+crypto_tools = CryptoTools(snapshot=MarketSnapshotStore())
+# Refreshes the watchlist in the background once a bot starts it
+market_poller = MarketPoller(crypto_tools, crypto_tools.snapshot)
 # Example usage
 if __name__ == "__main__":
     crypto_tools = CryptoTools()
 
     # Example of fetching market data
-    coingecko_data = crypto_tools.fetch_coingecko_market_data(coin_id="bitcoin")
+    coingecko_data = crypto_tools.fetch_coingecko_market_data(coin_ids=["bitcoin"])
     print("CoinGecko Market Data:", json.dumps(coingecko_data, indent=2))
 
     # Example of aggregating and processing news
@@ -6,13 +6,23 @@ from dotenv import load_dotenv
 from llama_index.core.agent import ReActAgent
 from llama_index.agent.openai import OpenAIAgent
 from llama_index.llms.openai import OpenAI
-from llama_index.core.query_engine import SubQuestionQueryEngine
 from llama_index.core.tools import FunctionTool, QueryEngineTool, ToolMetadata
 from agent_tools import crypto_tools
-from schemas import BinancePriceData, CoingeckoMarketData
+from intent_router import (
+    INTENT_CLASSIFIER_MODEL,
+    INTENT_ROUTER_LLM_ANSWERS,
+    IntentRouter,
+    llm_classifier,
+)
+from schemas import BinancePriceData, CoingeckoMarketData, PriceMomentumData
+from sub_question import QA_SUB_QUESTIONS, ParallelSubQuestionQueryEngine
 
 
-from degen_trader_agent import degen_trader_query_engine
+from degen_trader_agent import (
+    create_news_indexer,
+    degen_trader_query_engine,
+    news_query_engine,
+)
 
 logging.basicConfig(stream=sys.stdout, level=logging.INFO)
 logging.getLogger().handlers = []
@@ -25,7 +35,8 @@ openai_api_key = os.getenv("OPENAI_API_KEY")
 llm = OpenAI(model="gpt-4-1106-preview", max_tokens=1000, api_key=openai_api_key)
 fetch_coingecko_market_data = crypto_tools.fetch_coingecko_market_data
 
-process_news_articles = crypto_tools.process_news_articles
+# Aggregates news and embeds new articles once a bot starts it
+news_indexer = create_news_indexer(crypto_tools)
 
 
 # create query engine tool for the degen trader query engine
@@ -36,12 +47,43 @@ degen_trader_query_engine_tool = QueryEngineTool(
         description="This tool is used to answer questions related meme coins and degen traders, crypto trading, etc.",
     ),
 )
+fetch_coingecko_market_data = FunctionTool.from_defaults(
+    fn=fetch_coingecko_market_data,
+    async_fn=crypto_tools.afetch_coingecko_market_data,
+    tool_metadata=ToolMetadata(
+        fn_schema=CoingeckoMarketData,
+        name="fetch_coingecko_market_data",
+        description="This tool is used to fetch market data for one or more cryptocurrencies from CoinGecko. Pass every coin you need in a single call; tickers, names and $cashtags are resolved to CoinGecko ids.",
+    ),
+)
+
+fetch_price_momentum = FunctionTool.from_defaults(
+    fn=crypto_tools.fetch_price_momentum,
+    tool_metadata=ToolMetadata(
+        fn_schema=PriceMomentumData,
+        name="fetch_price_momentum",
+        description="This tool is used to get recent price momentum (change, high, low over a window of up to 24 hours) for watched cryptocurrencies, without calling any external API.",
+    ),
+)
+
+# Returns a few relevant recent headlines with their sentiment, instead of the
+# agent passing whole article lists through tool arguments
+news_query_engine_tool = QueryEngineTool(
+    query_engine=news_query_engine,
+    metadata=ToolMetadata(
+        name="crypto_news",
+        description="This tool is used to find the most relevant recent crypto news headlines for a question, with their source, time and sentiment (bullish, bearish or neutral).",
+    ),
+)
+
 # create query engine tool to be use in the sub question degen_trader query engine
-degen_trader_query_engine_tools = [degen_trader_query_engine_tool]
-# create a sub question query engine
-degen_trader_sub_question_query_engine = SubQuestionQueryEngine.from_defaults(
+degen_trader_query_engine_tools = [degen_trader_query_engine_tool, news_query_engine_tool]
+# create a sub question query engine; sub-questions run concurrently, and
+# duplicate ones and shared source nodes are handled once
+degen_trader_sub_question_query_engine = ParallelSubQuestionQueryEngine.from_defaults(
     query_engine_tools=degen_trader_query_engine_tools,
     llm=llm,
+    verbose=False,
 )
 
 # create query engine tool for sub question degen_trader query engine
@@ -49,41 +91,42 @@ degen_trader_sub_question_query_engine_tool = QueryEngineTool(
     query_engine=degen_trader_sub_question_query_engine,
     metadata=ToolMetadata(
         name="degen_trader_sub_question_query_engine",
-        description="This tool is used to answer sub-questions related to the degen trader query engine.",
+        description="This tool is used to answer complex, multi-part questions (comparisons, several coins or topics at once) by splitting them into sub-questions for the degen trader query engine and crypto news, answered in parallel. Use degen_trader_query_engine or crypto_news directly for single questions.",
     ),
 )
 
-fetch_coingecko_market_data = FunctionTool.from_defaults(
-    fn=fetch_coingecko_market_data,
-    name="fetch_coingecko_market_data",
-    description="This tool is used to fetch market data for a specific cryptocurrency from CoinGecko.",
-    tool_metadata=ToolMetadata(
-        fn_schema=CoingeckoMarketData,
-        name="fetch_coingecko_market_data",
-        description="This tool is used to fetch market data for a specific cryptocurrency from CoinGecko.",
+# Answers simple price and news questions without the ReAct loop
+intent_router = IntentRouter(
+    crypto_tools,
+    news_query_engine,
+    llm=llm if INTENT_ROUTER_LLM_ANSWERS else None,
+    classifier=(
+        llm_classifier(
+            OpenAI(model=INTENT_CLASSIFIER_MODEL, max_tokens=2, api_key=openai_api_key)
+        )
+        if INTENT_CLASSIFIER_MODEL
+        else None
     ),
 )
 
-process_news_articles = FunctionTool.from_defaults(
-    fn=process_news_articles,
-    name="process_news_articles",
-    description="This tool is used to process news articles to  extract relevant information. like sentiment, etc.",
-)
-
 # tools
 bot1_tools = [
     degen_trader_query_engine_tool,
     fetch_coingecko_market_data,
+    fetch_price_momentum,
 ]
 
 bot2_tools = [
-    process_news_articles,
+    news_query_engine_tool,
 ]
 discord_ai_agent_tools = [
     degen_trader_query_engine_tool,
     fetch_coingecko_market_data,
-    process_news_articles,
+    fetch_price_momentum,
+    news_query_engine_tool,
 ]
+if QA_SUB_QUESTIONS:
+    discord_ai_agent_tools.append(degen_trader_sub_question_query_engine_tool)
 
 # response = agent.chat("tell me the latest news on meme coins that are trending")
 # print(response)
@@ -0,0 +1,99 @@
+"""
+Compare per-message agent construction against the pooled agents.
+
+Runs offline: the agents use llama_index's MockLLM and stub tools, so only the
+setup cost (tool resolution, prompt and memory construction) is measured.
+
+    python benchmarks/bench_agent_pool.py
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llama_index.core.agent import ReActAgent
+from llama_index.core.llms import MockLLM
+from llama_index.core.memory import ChatMemoryBuffer
+from llama_index.core.tools import FunctionTool
+
+from agent_pool import AgentPool
+from prompt import bot1_context, discord_ai_agent_context
+
+MESSAGES = 200
+USERS = 20
+
+llm = MockLLM()
+
+
+def fetch_coingecko_market_data(coin_id: str):
+    """Fetch market data for a coin."""
+    return []
+
+
+def process_news_articles(articles: list):
+    """Process news articles."""
+    return articles
+
+
+tools = [
+    FunctionTool.from_defaults(fn=fetch_coingecko_market_data),
+    FunctionTool.from_defaults(fn=process_news_articles),
+]
+
+
+def build_agent(username: str):
+    return ReActAgent.from_tools(
+        tools=tools,
+        context=discord_ai_agent_context.replace("{username}", username),
+        memory=ChatMemoryBuffer.from_defaults(llm=llm, token_limit=3000),
+        llm=llm,
+    )
+
+
+def per_message():
+    # The old code path: format the history into the prompt and rebuild every time.
+    for i in range(MESSAGES):
+        ReActAgent.from_tools(
+            tools=tools,
+            context=bot1_context + f"\nUser: message {i}",
+            llm=llm,
+        )
+
+
+def pooled():
+    pool = AgentPool(build_agent)
+    for i in range(MESSAGES):
+        pool.get(f"user{i % USERS}")
+    return pool
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    rebuild_time, rebuild_peak = measure(per_message)
+    pool_time, pool_peak = measure(pooled)
+    print(f"messages: {MESSAGES}, users: {USERS}")
+    print(
+        f"rebuild per message: {rebuild_time / MESSAGES * 1000:.3f} ms/msg, "
+        f"peak {rebuild_peak / 1024:.0f} KiB"
+    )
+    print(
+        f"pooled agents:       {pool_time / MESSAGES * 1000:.3f} ms/msg, "
+        f"peak {pool_peak / 1024:.0f} KiB"
+    )
+    print(f"setup time saved: {(1 - pool_time / rebuild_time) * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Lookup latency, accuracy and memory of the coin ticker and name resolver.
+
+Builds the index from a synthetic coin list of the size CoinGecko's /coins/list
+returns (about 15k coins, with wrapped and bridged tokens reusing popular
+tickers and names), or from a saved /coins/list response given with
+--coin-list. Then resolves ids, tickers, $cashtags, names, prefixes and typos
+the agents produce.
+
+    python benchmarks/bench_coin_resolver.py [--coin-list storage/coins/coin_list.json]
+"""
+
+import json
+import os
+import random
+import statistics
+import string
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from coin_resolver import COIN_RESOLVER_PREFERRED, CoinIndex
+
+SYNTHETIC_COINS = 15000
+REPEATS = 200
+
+KNOWN_COINS = [
+    {"id": "bitcoin", "symbol": "btc", "name": "Bitcoin"},
+    {"id": "bitcoin-cash", "symbol": "bch", "name": "Bitcoin Cash"},
+    {"id": "wrapped-bitcoin", "symbol": "wbtc", "name": "Wrapped Bitcoin"},
+    {"id": "ethereum", "symbol": "eth", "name": "Ethereum"},
+    {"id": "bridged-ether", "symbol": "eth", "name": "Bridged Ether"},
+    {"id": "solana", "symbol": "sol", "name": "Solana"},
+    {"id": "dogecoin", "symbol": "doge", "name": "Dogecoin"},
+    {"id": "binance-peg-dogecoin", "symbol": "doge", "name": "Binance-Peg Dogecoin"},
+    {"id": "shiba-inu", "symbol": "shib", "name": "Shiba Inu"},
+    {"id": "pepe", "symbol": "pepe", "name": "Pepe"},
+    {"id": "pepe-2", "symbol": "pepe", "name": "Pepe 2.0"},
+    {"id": "based-pepe", "symbol": "pepe", "name": "Based Pepe"},
+    {"id": "dogwifcoin", "symbol": "wif", "name": "dogwifhat"},
+    {"id": "bonk", "symbol": "bonk", "name": "Bonk"},
+    {"id": "floki", "symbol": "floki", "name": "FLOKI"},
+    {"id": "popcat", "symbol": "popcat", "name": "Popcat (SOL)"},
+    {"id": "book-of-meme", "symbol": "bome", "name": "BOOK OF MEME"},
+    {"id": "cat-in-a-dogs-world", "symbol": "mew", "name": "cat in a dogs world"},
+]
+
+# (what an agent passes, the coin id it means)
+QUERIES = [
+    ("bitcoin", "bitcoin"),
+    ("BTC", "bitcoin"),
+    ("$BTC", "bitcoin"),
+    ("eth", "ethereum"),
+    ("Ethereum", "ethereum"),
+    ("etherium", "ethereum"),
+    ("doge", "dogecoin"),
+    ("$DOGE", "dogecoin"),
+    ("Shiba Inu", "shiba-inu"),
+    ("shib", "shiba-inu"),
+    ("$PEPE", "pepe"),
+    ("pepe", "pepe"),
+    ("WIF", "dogwifcoin"),
+    ("dogwifhat", "dogwifcoin"),
+    ("$BONK", "bonk"),
+    ("popcat", "popcat"),
+    ("book of meme", "book-of-meme"),
+    ("cat in a dog's world", "cat-in-a-dogs-world"),
+    ("bitcoin cash", "bitcoin-cash"),
+    ("solana", "solana"),
+    ("sol", "solana"),
+    ("dogecoinn", "dogecoin"),
+    ("shiba", "shiba-inu"),
+    ("not-a-real-coin-xyz", None),
+]
+
+
+def synthetic_coins(count, rng):
+    coins = list(KNOWN_COINS)
+    for i in range(count):
+        name = " ".join(
+            "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9)))
+            for _ in range(rng.randint(1, 3))
+        ).title()
+        symbol = "".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 6)))
+        coins.append(
+            {
+                "id": f"{name.lower().replace(' ', '-')}-{i}",
+                "symbol": symbol,
+                "name": name,
+            }
+        )
+    # Wrapped and bridged copies of popular coins, as on CoinGecko.
+    for coin in KNOWN_COINS:
+        for chain in ("bsc", "base", "arbitrum"):
+            coins.append(
+                {
+                    "id": f"{coin['id']}-{chain}",
+                    "symbol": coin["symbol"],
+                    "name": f"{coin['name']} ({chain})",
+                }
+            )
+    return coins
+
+
+def main():
+    if "--coin-list" in sys.argv:
+        with open(sys.argv[sys.argv.index("--coin-list") + 1]) as f:
+            coins = json.load(f)
+        source = "saved /coins/list"
+    else:
+        coins = synthetic_coins(SYNTHETIC_COINS, random.Random(3))
+        source = "synthetic list"
+
+    tracemalloc.start()
+    raw = json.loads(json.dumps(coins))
+    raw_bytes = tracemalloc.get_traced_memory()[0]
+    del raw
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    index = CoinIndex(coins, COIN_RESOLVER_PREFERRED)
+    index_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del index
+    start = time.perf_counter()
+    index = CoinIndex(coins, COIN_RESOLVER_PREFERRED)
+    build_ms = (time.perf_counter() - start) * 1000
+    print(
+        f"{len(index)} coins ({source}): index built in {build_ms:.0f} ms, "
+        f"{index_bytes / 2**20:.1f} MiB (the parsed list alone is "
+        f"{raw_bytes / 2**20:.1f} MiB)"
+    )
+
+    correct = 0
+    for query, expected in QUERIES:
+        latencies = []
+        for _ in range(REPEATS):
+            start = time.perf_counter()
+            coin_id = index.resolve(query)
+            latencies.append((time.perf_counter() - start) * 1e6)
+        correct += coin_id == expected
+        print(
+            f"  {query!r:>24} -> {coin_id or '-':<20} "
+            f"p50 {statistics.median(latencies):8.1f} us"
+            f"{'' if coin_id == expected else f'  (expected {expected})'}"
+        )
+    passthrough = sum(query == expected for query, expected in QUERIES)
+    print(
+        f"resolved {correct}/{len(QUERIES)} correctly; passed through as ids, "
+        f"only {passthrough} would have matched a CoinGecko coin"
+    )
+
+
+if __name__ == "__main__":
+    main()
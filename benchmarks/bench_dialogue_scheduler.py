@@ -0,0 +1,178 @@
+"""
+Time between bot posts and turns per second across many channels, with the
+old ping-pong (pause, then generate, then post) and with DialogueScheduler
+generating each turn during the previous turn's pause.
+
+Runs offline at a tenth of real time: channels pace PACE seconds apart with
+JITTER, and a fake agent takes between 40% and 140% of the pace per turn,
+like a gpt-4 ReAct turn against a 10-second pace. Agent turns run on a
+64-thread pool (AGENT_WORKERS=64). The recovery run makes some turns fail
+or stall past the turn timeout and some Discord sends raise.
+
+    python benchmarks/bench_dialogue_scheduler.py
+"""
+
+import asyncio
+import contextlib
+import io
+import os
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent_pool import AgentPool
+from dialogue_scheduler import DialogueChannel, DialogueScheduler, Persona
+from discord_stream import DiscordStreamer
+
+PACE = 1.0
+JITTER = 0.2
+GENERATION = (0.4, 1.4)
+RUN_SECONDS = 12
+DISCORD_LATENCY = 0.01
+WORKERS = 64
+CHANNEL_COUNTS = [1, 10, 40]
+# Recovery run: share of turns that raise, that stall, and of sends that raise.
+FAIL_RATE = 0.05
+STALL_RATE = 0.02
+SEND_FAIL_RATE = 0.02
+TURN_TIMEOUT = 3.0
+
+
+class FakeAgent:
+    def __init__(self, rng, fail_rate=0.0, stall_rate=0.0):
+        self.rng = rng
+        self.fail_rate = fail_rate
+        self.stall_rate = stall_rate
+
+    def chat(self, message):
+        roll = self.rng.random()
+        if roll < self.stall_rate:
+            time.sleep(TURN_TIMEOUT + 1)
+        time.sleep(self.rng.uniform(*GENERATION))
+        if roll > 1 - self.fail_rate:
+            raise RuntimeError("OpenAI API error")
+        return " ".join(f"{self.rng.getrandbits(32):08x}" for _ in range(8))
+
+
+class FakeChannel:
+    def __init__(self, rng, send_fail_rate=0.0):
+        self.rng = rng
+        self.send_fail_rate = send_fail_rate
+        self.posts = []
+
+    async def send(self, content):
+        await asyncio.sleep(DISCORD_LATENCY)
+        if self.rng.random() < self.send_fail_rate:
+            raise ConnectionError("Discord API error")
+        self.posts.append(time.monotonic())
+
+
+def build(count, executor, fail_rate=0.0, stall_rate=0.0, send_fail_rate=0.0):
+    rng = random.Random(24)
+    channels = {i: FakeChannel(rng, send_fail_rate) for i in range(count)}
+    pools = {
+        name: AgentPool(
+            lambda key: FakeAgent(rng, fail_rate, stall_rate), executor=executor
+        )
+        for name in ("bot1", "bot2")
+    }
+    return channels, pools
+
+
+async def ping_pong(channel_id, channel, pools, streamer):
+    """The old flow: every turn pauses, then generates, then posts."""
+    message, speaker = "which meme coin is bullish", "bot1"
+    await streamer.send(channel, message)
+    while True:
+        speaker = "bot2" if speaker == "bot1" else "bot1"
+        await asyncio.sleep(PACE + random.uniform(-JITTER, JITTER))
+        try:
+            message = str(
+                await pools[speaker].achat(f"{speaker}:{channel_id}", message)
+            )
+        except Exception:
+            message = "Let's continue our discussion about cryptocurrency."
+        await streamer.send(channel, message)
+
+
+def summarize(label, channels):
+    intervals = [
+        later - earlier
+        for channel in channels.values()
+        for earlier, later in zip(channel.posts, channel.posts[1:])
+    ]
+    turns = sum(len(channel.posts) for channel in channels.values())
+    print(
+        f"{label:<36} {turns / RUN_SECONDS:6.1f} posts/s  interval mean "
+        f"{statistics.mean(intervals):.2f}s  p95 "
+        f"{statistics.quantiles(intervals, n=20)[18]:.2f}s  fewest posts in a "
+        f"channel {min(len(channel.posts) for channel in channels.values())}"
+    )
+
+
+async def run_ping_pong(count, executor):
+    channels, pools = build(count, executor)
+    streamer = DiscordStreamer()
+    tasks = [
+        asyncio.create_task(ping_pong(i, channel, pools, streamer))
+        for i, channel in channels.items()
+    ]
+    await asyncio.sleep(RUN_SECONDS)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    summarize(f"ping-pong, {count} channels", channels)
+
+
+async def run_scheduler(count, executor, **faults):
+    channels, pools = build(count, executor, **faults)
+    scheduler = DialogueScheduler(
+        {name: Persona(name, pool, channels.get) for name, pool in pools.items()},
+        [DialogueChannel(i, ["bot1", "bot2"], PACE, JITTER) for i in channels],
+        turn_timeout=TURN_TIMEOUT,
+        restart_delay=0.5,
+    )
+    with contextlib.redirect_stdout(io.StringIO()):
+        scheduler.start()
+        await asyncio.sleep(RUN_SECONDS)
+        await scheduler.stop()
+    label = "scheduler" + (" with faults" if faults else "")
+    summarize(f"{label}, {count} channels", channels)
+    return scheduler.metrics()
+
+
+def main():
+    executor = ThreadPoolExecutor(max_workers=WORKERS)
+    print(
+        f"pace {PACE}s +/- {JITTER}s, generation {GENERATION[0]}-{GENERATION[1]}s, "
+        f"{RUN_SECONDS}s per run"
+    )
+    for count in CHANNEL_COUNTS:
+        asyncio.run(run_ping_pong(count, executor))
+        metrics = asyncio.run(run_scheduler(count, executor))
+        print(
+            f"{'':<36} generation mean {metrics['generation_avg_s']:.2f}s, "
+            f"overlapped with the pause"
+        )
+    metrics = asyncio.run(
+        run_scheduler(
+            CHANNEL_COUNTS[-1],
+            executor,
+            fail_rate=FAIL_RATE,
+            stall_rate=STALL_RATE,
+            send_fail_rate=SEND_FAIL_RATE,
+        )
+    )
+    print(
+        f"{'':<36} retries {metrics['retries']}, stalled {metrics['stalled']}, "
+        f"fallbacks {metrics['fallbacks']}, channel restarts {metrics['restarts']}"
+    )
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+if __name__ == "__main__":
+    main()
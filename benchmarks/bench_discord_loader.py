@@ -0,0 +1,59 @@
+"""
+Compare the Discord CSV loader against SimpleDirectoryReader on the raw exports.
+
+Counts the tokens that would be embedded, the number of nodes and the time to
+load and split Data/. No embedding calls are made.
+
+    python benchmarks/bench_discord_loader.py
+"""
+
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from llama_index.core import SimpleDirectoryReader
+from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core.schema import MetadataMode
+from llama_index.core.utils import get_tokenizer
+
+from discord_loader import DiscordChatReader
+
+DATA_DIR = os.path.join(ROOT, "Data")
+
+
+def measure(label, load):
+    tokenizer = get_tokenizer()
+    start = time.perf_counter()
+    documents = load()
+    nodes = SentenceSplitter(chunk_size=512, chunk_overlap=20).get_nodes_from_documents(
+        documents
+    )
+    elapsed = time.perf_counter() - start
+    tokens = sum(
+        len(tokenizer(n.get_content(metadata_mode=MetadataMode.EMBED))) for n in nodes
+    )
+    print(
+        f"{label:>22}: {len(documents):5d} documents  {len(nodes):5d} nodes  "
+        f"{tokens:8d} embedded tokens  {elapsed:6.2f}s"
+    )
+    return tokens
+
+
+def main():
+    raw = measure(
+        "SimpleDirectoryReader",
+        lambda: SimpleDirectoryReader(DATA_DIR, recursive=True).load_data(),
+    )
+    for mode in ("message", "window"):
+        tokens = measure(
+            f"DiscordChatReader/{mode}",
+            lambda: DiscordChatReader(mode=mode).load_data(DATA_DIR),
+        )
+        print(f"{'':>22}  {1 - tokens / raw:.0%} fewer tokens to embed")
+
+
+if __name__ == "__main__":
+    main()
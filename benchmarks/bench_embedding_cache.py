@@ -0,0 +1,97 @@
+"""
+Measure the embedding cache offline with a fake embedding model.
+
+Embeds the Data/ chat messages twice, as two ingestion runs would, then replays
+the bot-to-bot opener and near-identical variants as retrieval queries.
+
+    python benchmarks/bench_embedding_cache.py
+"""
+
+import csv
+import glob
+import os
+import sys
+import tempfile
+import time
+from typing import List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from llama_index.core.embeddings import MockEmbedding
+
+from embedding_cache import CachedEmbedding, EmbeddingCache
+
+# Simulated round-trip per batch sent to the embedding API.
+EMBED_LATENCY = 0.005
+
+QUERIES = [
+    "which meme coin i can buy tht is bullish in last 24hrs",
+    "which meme coin i can buy tht is bullish in last 24hrs ",
+    "which  meme coin i can buy tht is bullish in last 24hrs",
+    "what meme coins are pumping right now",
+    "What meme coins are pumping right now",
+    "what meme coins are pumping right now",
+]
+
+
+class CountingEmbedding(MockEmbedding):
+    calls: int = 0
+    texts: int = 0
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        self.texts += len(texts)
+        time.sleep(EMBED_LATENCY)
+        return super()._get_text_embeddings(texts)
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._get_text_embeddings([query])[0]
+
+
+def chat_messages():
+    messages = []
+    for path in sorted(glob.glob(os.path.join(ROOT, "Data", "*.csv"))):
+        with open(path, newline="", encoding="utf-8") as f:
+            messages.extend(
+                row["content"] for row in csv.DictReader(f) if row["content"]
+            )
+    return messages
+
+
+def main():
+    messages = chat_messages()
+    with tempfile.TemporaryDirectory() as tmp:
+        inner = CountingEmbedding(embed_dim=1536)
+        cache = EmbeddingCache(path=os.path.join(tmp, "cache.db"), max_entries=50000)
+        embed_model = CachedEmbedding(embed_model=inner, cache=cache)
+
+        for label in ("first ingestion", "second ingestion"):
+            start = time.perf_counter()
+            embed_model.get_text_embedding_batch(messages)
+            print(
+                f"{label:>16}: {len(messages)} texts, {inner.texts} embedded so far, "
+                f"{time.perf_counter() - start:.2f}s, cache {cache.stats()}"
+            )
+
+        embedded = inner.texts
+        for _ in range(10):
+            for query in QUERIES:
+                embed_model.get_query_embedding(query)
+        print(
+            f"{'queries':>16}: {10 * len(QUERIES)} queries, "
+            f"{inner.texts - embedded} embedded, cache {cache.stats()}"
+        )
+
+        # Entries outlive the process.
+        cache.close()
+        reopened = EmbeddingCache(path=os.path.join(tmp, "cache.db"))
+        hits = reopened.get_many(inner.model_name, QUERIES)
+        print(
+            f"{'after reopen':>16}: {sum(h is not None for h in hits)}/{len(QUERIES)} hits"
+        )
+        reopened.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Exercise the pooled HTTP client and CryptoTools against a local stub server.
+
+The stub serves CoinGecko and Binance shaped responses, a flaky endpoint that
+fails with 503 before succeeding, and a slow endpoint that exceeds the client
+timeout. Compares one-off requests.get calls, as CryptoTools used to make,
+with the pooled client, then checks retries, timeouts and the rate limiter.
+
+    python benchmarks/bench_http_client.py
+"""
+
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import requests
+from aiohttp import web
+
+from agent_tools import CryptoTools
+from http_client import AsyncHTTPClient, HTTPRequestError
+
+CALLS = 200
+RATE_LIMIT_PER_MINUTE = 120
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_stub_server(port, middlewares=()):
+    flaky_calls = {"count": 0}
+    # Prices random-walk from one request to the next.
+    prices = {}
+
+    def price(key):
+        prices[key] = prices.get(key, 1.0) * random.uniform(0.99, 1.01)
+        return prices[key]
+
+    async def markets(request):
+        ids = request.query.get("ids", "").split(",")
+        return web.json_response(
+            [{"id": coin_id, "current_price": price(coin_id)} for coin_id in ids]
+        )
+
+    async def ticker(request):
+        if "symbols" in request.query:
+            return web.json_response(
+                [
+                    {"symbol": symbol, "price": str(price(symbol))}
+                    for symbol in json.loads(request.query["symbols"])
+                ]
+            )
+        return web.json_response({"symbol": request.query["symbol"], "price": "1.0"})
+
+    async def flaky(request):
+        flaky_calls["count"] += 1
+        if flaky_calls["count"] % 3:
+            return web.Response(status=503)
+        return web.json_response({"ok": True})
+
+    async def slow(request):
+        await asyncio.sleep(5)
+        return web.json_response({"ok": True})
+
+    app = web.Application(middlewares=list(middlewares))
+    app.router.add_get("/api/v3/coins/markets", markets)
+    app.router.add_get("/api/v3/ticker/price", ticker)
+    app.router.add_get("/flaky", flaky)
+    app.router.add_get("/slow", slow)
+
+    loop = asyncio.new_event_loop()
+    runner = web.AppRunner(app, access_log=None)
+    loop.run_until_complete(runner.setup())
+    loop.run_until_complete(web.TCPSite(runner, "127.0.0.1", port).start())
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+
+
+def timed(fn, calls):
+    latencies = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return statistics.median(latencies), sum(latencies) / 1000
+
+
+def main():
+    port = free_port()
+    start_stub_server(port)
+    base_url = f"http://127.0.0.1:{port}"
+    http = AsyncHTTPClient(max_retries=3, backoff_base=0.05, timeout=1)
+    tools = CryptoTools(
+        http=http,
+        coingecko_base_url=f"{base_url}/api/v3",
+        binance_base_url=f"{base_url}/api/v3",
+    )
+
+    def one_off():
+        requests.get(
+            f"{base_url}/api/v3/coins/markets",
+            params={"vs_currency": "usd", "ids": "bitcoin"},
+        ).json()
+
+    p50, total = timed(one_off, CALLS)
+    print(f"requests.get, no session: p50 {p50:5.2f} ms  total {total:5.2f}s")
+    p50, total = timed(
+        lambda: http.run_sync(tools.afetch_coingecko_markets(["bitcoin"])), CALLS
+    )
+    print(f"pooled client (sync):     p50 {p50:5.2f} ms  total {total:5.2f}s")
+
+    async def concurrent():
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(tools.afetch_binance_price("BTCUSDT") for _ in range(CALLS))
+        )
+        return time.perf_counter() - start
+
+    print(f"pooled client, {CALLS} concurrent: {asyncio.run(concurrent()):5.2f}s")
+
+    before = dict(http.stats)
+    result = http.run_sync(http.get_json(f"{base_url}/flaky"))
+    print(
+        f"flaky endpoint: {result} after "
+        f"{http.stats['retries'] - before['retries']} retries"
+    )
+
+    start = time.perf_counter()
+    try:
+        http.run_sync(http.get_json(f"{base_url}/slow"))
+    except HTTPRequestError as e:
+        print(
+            f"slow endpoint: gave up after {time.perf_counter() - start:.1f}s "
+            f"({http.max_retries + 1} attempts with a {http.timeout:.0f}s timeout): "
+            f"{type(e).__name__}"
+        )
+
+    limited = AsyncHTTPClient(rate_limits={"127.0.0.1": RATE_LIMIT_PER_MINUTE})
+    extra = 10
+    start = time.perf_counter()
+    for _ in range(RATE_LIMIT_PER_MINUTE + extra):
+        limited.run_sync(limited.get_json(f"{base_url}/api/v3/ticker/price?symbol=X"))
+    print(
+        f"rate limit {RATE_LIMIT_PER_MINUTE}/min: {RATE_LIMIT_PER_MINUTE + extra} "
+        f"calls took {time.perf_counter() - start:.1f}s "
+        f"(burst of {RATE_LIMIT_PER_MINUTE}, then "
+        f"{60 / RATE_LIMIT_PER_MINUTE:.1f}s per call)"
+    )
+    limited.close()
+    http.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Latency and recall of hybrid BM25 + vector retrieval against vector-only retrieval.
+
+Ingests the conversation windows of Data/ into an in-memory Qdrant collection
+and an on-disk BM25 index, then runs the labeled queries of eval_chunking.py.
+Query embedding sleeps EMBED_LATENCY seconds to stand in for the embedding API
+call, which the BM25 lookup overlaps with.
+
+    python benchmarks/bench_hybrid_retrieval.py
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from llama_index.core import VectorStoreIndex
+from llama_index.core.retrievers import VectorIndexRetriever
+from llama_index.core.schema import QueryBundle
+from llama_index.vector_stores.qdrant import QdrantVectorStore
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, VectorParams
+
+from bm25_index import BM25Index, BM25IndexRetriever
+from chat_node_parser import ConversationWindowNodeParser
+from discord_loader import DiscordChatReader
+from eval_chunking import (
+    DATA_DIR,
+    EMBED_DIM,
+    LABELED_QUERIES,
+    BagOfWordsEmbedding,
+    message_contents,
+)
+from hybrid_retriever import HybridRetriever, reciprocal_rank_fusion
+from ingestion import IncrementalIngestion
+
+TOP_K = 8
+EMBED_LATENCY = 0.05
+ROUNDS = 5
+
+
+class SlowQueryEmbedding(BagOfWordsEmbedding):
+    def _get_query_embedding(self, query: str) -> List[float]:
+        time.sleep(EMBED_LATENCY)
+        return self._embed(query)
+
+
+class SequentialHybridRetriever(HybridRetriever):
+    def _retrieve(self, query_bundle):
+        vector_nodes = self.vector_retriever.retrieve(query_bundle)
+        bm25_nodes = self.bm25_retriever.retrieve(query_bundle)
+        return reciprocal_rank_fusion(
+            [vector_nodes, bm25_nodes], self.similarity_top_k, self.rrf_k
+        )
+
+
+def evaluate(retriever, contents):
+    latencies = []
+    hits = 0
+    for _ in range(ROUNDS):
+        for query, answer_ids in LABELED_QUERIES:
+            start = time.perf_counter()
+            # A fresh bundle per query so every lookup pays for its embedding.
+            results = retriever.retrieve(QueryBundle(query))
+            latencies.append(time.perf_counter() - start)
+            texts = [r.node.get_content() for r in results]
+            hits += any(contents[a][:60] in t for a in answer_ids for t in texts)
+    latencies.sort()
+    return {
+        "recall": hits / (ROUNDS * len(LABELED_QUERIES)),
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(0.95 * (len(latencies) - 1))] * 1000,
+    }
+
+
+def main():
+    contents = message_contents()
+    embed_model = SlowQueryEmbedding()
+    client = QdrantClient(location=":memory:")
+    client.create_collection(
+        "bench", vectors_config=VectorParams(size=EMBED_DIM, distance=Distance.COSINE)
+    )
+    vector_store = QdrantVectorStore(client=client, collection_name="bench")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bm25_path = os.path.join(tmp, "bench.db")
+        ingestion = IncrementalIngestion(
+            vector_store=vector_store,
+            embed_model=embed_model,
+            node_parser=ConversationWindowNodeParser(),
+            manifest_path=os.path.join(tmp, "bench.json"),
+            keyword_index=BM25Index(bm25_path),
+        )
+        documents = DiscordChatReader(mode="transcript").load_data(DATA_DIR)
+        stats = ingestion.run(documents)
+        print(f"ingested {stats['embedded']} nodes")
+
+        start = time.perf_counter()
+        bm25_index = BM25Index(bm25_path)
+        print(
+            f"BM25 index reloaded from disk in "
+            f"{(time.perf_counter() - start) * 1000:.1f} ms ({len(bm25_index)} nodes)"
+        )
+        rerun = ingestion.run(DiscordChatReader(mode="transcript").load_data(DATA_DIR))
+        print(
+            f"second ingestion run: embedded {rerun['embedded']}, "
+            f"keyword backfilled {rerun['keyword_backfilled']}"
+        )
+
+        vector_retriever = VectorIndexRetriever(
+            index=VectorStoreIndex.from_vector_store(
+                vector_store=vector_store, embed_model=embed_model
+            ),
+            similarity_top_k=TOP_K,
+        )
+        bm25_retriever = BM25IndexRetriever(bm25_index, similarity_top_k=TOP_K)
+        retrievers = {
+            "vector only": vector_retriever,
+            "bm25 only": bm25_retriever,
+            "hybrid sequential": SequentialHybridRetriever(
+                vector_retriever, bm25_retriever, similarity_top_k=TOP_K
+            ),
+            "hybrid concurrent": HybridRetriever(
+                vector_retriever, bm25_retriever, similarity_top_k=TOP_K
+            ),
+        }
+        print(
+            f"{len(LABELED_QUERIES)} labeled queries x {ROUNDS} rounds, top_k={TOP_K}, "
+            f"query embedding latency {EMBED_LATENCY * 1000:.0f} ms"
+        )
+        for label, retriever in retrievers.items():
+            result = evaluate(retriever, contents)
+            print(
+                f"{label:>18}: recall {result['recall']:.0%}  "
+                f"p50 {result['p50_ms']:6.1f} ms  p95 {result['p95_ms']:6.1f} ms"
+            )
+        bm25_index.close()
+        ingestion.keyword_index.close()
+
+
+if __name__ == "__main__":
+    main()
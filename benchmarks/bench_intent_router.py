@@ -0,0 +1,209 @@
+"""
+LLM calls and latency per message with every question going through the
+ReAct agent, and with the intent router answering simple price and news
+questions first.
+
+Replays a set of QA bot messages offline. CoinGecko is the stub server of
+bench_http_client, the coin list is bench_coin_resolver's KNOWN_COINS, and
+news comes from the fixture feeds of bench_news_ingestion indexed as in
+bench_news_index. A scripted LLM stands in for OpenAI, taking LLM_SECONDS per
+call: one call to pick a tool, one to answer.
+
+    python benchmarks/bench_intent_router.py
+"""
+
+import asyncio
+import glob
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from email.utils import formatdate
+from typing import Any
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("CRYPTOPANIC_API_KEY", "stub")
+
+from llama_index.core.agent import ReActAgent
+from llama_index.core.llms import CompletionResponse, CustomLLM, LLMMetadata
+from llama_index.core.llms.callbacks import llm_completion_callback
+from llama_index.core.tools import FunctionTool, QueryEngineTool, ToolMetadata
+from qdrant_client import QdrantClient
+
+from agent_pool import AgentPool
+from agent_tools import CryptoTools
+from bench_coin_resolver import KNOWN_COINS
+from bench_http_client import free_port, start_stub_server
+from bench_news_index import RETENTION_DAYS
+from bench_news_ingestion import FIXTURES_DIR, start_feed_server
+from eval_chunking import EMBED_DIM, BagOfWordsEmbedding
+from http_client import AsyncHTTPClient
+from intent_router import IntentRouter
+from news_index import NewsIndex, NewsIndexer
+
+# Seconds per LLM round-trip; gpt-4 class models take one to several seconds.
+LLM_SECONDS = 0.5
+ACTION_THOUGHT = "Thought: I need a tool to answer this."
+
+# (message, what the router should do with it)
+MESSAGES = [
+    ("price of $PEPE", "price"),
+    ("how much is btc right now", "price"),
+    ("$WIF $BONK?", "price"),
+    ("eth price?", "price"),
+    ("how is solana doing today", "price"),
+    ("what's dogecoin worth", "price"),
+    ("pepe and bonk volume", "price"),
+    ("$DOGE", "price"),
+    ("latest news on pepe", "news"),
+    ("any headlines about bitcoin etf inflows", "news"),
+    ("what's happening with dogwifhat", "news"),
+    ("crypto news today", "news"),
+    ("should I buy pepe now", "agent"),
+    ("which meme coin is bullish in the last 24hrs", "agent"),
+    ("explain what a rug pull is", "agent"),
+    ("compare bonk vs wif for a quick flip", "agent"),
+    ("gm degens", "agent"),
+    ("what do you think about the market", "agent"),
+    ("is it too late to ape into solana memes", "agent"),
+    ("tell me about the degen trader strategies people use", "agent"),
+]
+
+
+class CountingLLM(CustomLLM):
+    """Picks a tool on the first step and answers once it has an observation."""
+
+    calls: int = 0
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return LLMMetadata(model_name="scripted")
+
+    @llm_completion_callback()
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any):
+        self.calls += 1
+        time.sleep(LLM_SECONDS)
+        if ACTION_THOUGHT in prompt:
+            return CompletionResponse(
+                text="Thought: I can answer without using any more tools.\n"
+                "Answer: Here's the alpha, degen."
+            )
+        question = prompt.rsplit("user: ", 1)[-1].lower()
+        if "$" in question or "price" in question:
+            action, args = "fetch_coingecko_market_data", {"coin_ids": "pepe"}
+        else:
+            action, args = "crypto_news", {"input": question}
+        return CompletionResponse(
+            text=f"{ACTION_THOUGHT}\nAction: {action}\n"
+            f"Action Input: {json.dumps(args)}\n"
+        )
+
+    @llm_completion_callback()
+    def stream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any):
+        raise NotImplementedError
+
+
+async def replay(label, handle, llm):
+    latencies, calls = [], []
+    for message, _ in MESSAGES:
+        before = llm.calls
+        start = time.perf_counter()
+        await handle(message)
+        latencies.append(time.perf_counter() - start)
+        calls.append(llm.calls - before)
+    print(
+        f"{label:<16} LLM calls/message {statistics.mean(calls):4.2f}  "
+        f"latency p50 {statistics.median(latencies):5.2f}s  "
+        f"mean {statistics.mean(latencies):5.2f}s  total {sum(latencies):5.1f}s"
+    )
+
+
+def main():
+    port = free_port()
+    start_stub_server(port)
+    feeds = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.xml"))):
+        with open(path, "rb") as f:
+            feeds[os.path.basename(path)] = (f.read(), formatdate(usegmt=True))
+    feed_port = free_port()
+    start_feed_server(feed_port, feeds, {"bytes": 0, "not_modified": 0})
+    feed_url = f"http://127.0.0.1:{feed_port}"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        coin_list_path = os.path.join(tmp, "coin_list.json")
+        with open(coin_list_path, "w") as f:
+            json.dump(KNOWN_COINS, f)
+        tools = CryptoTools(
+            http=AsyncHTTPClient(),
+            coingecko_base_url=f"http://127.0.0.1:{port}/api/v3",
+            cryptopanic_base_url=f"{feed_url}/cryptopanic",
+            rss_feed_urls=[f"{feed_url}/feeds/{name}" for name in feeds],
+            news_store_path=os.path.join(tmp, "news.db"),
+            coin_list_path=coin_list_path,
+        )
+        index = NewsIndex(
+            QdrantClient(location=":memory:"),
+            BagOfWordsEmbedding(),
+            vector_size=EMBED_DIM,
+        )
+        indexer = NewsIndexer(tools, lambda: index, retention_days=RETENTION_DAYS)
+        tools.http.run_sync(indexer.index_once())
+        news_engine = index.as_query_engine(half_life_hours=0)
+
+        llm = CountingLLM()
+        agent_tools = [
+            FunctionTool.from_defaults(
+                fn=tools.fetch_coingecko_market_data,
+                async_fn=tools.afetch_coingecko_market_data,
+                name="fetch_coingecko_market_data",
+            ),
+            QueryEngineTool(
+                query_engine=news_engine,
+                metadata=ToolMetadata(name="crypto_news", description="Recent news."),
+            ),
+        ]
+        pool = AgentPool(lambda key: ReActAgent.from_tools(tools=agent_tools, llm=llm))
+        router = IntentRouter(tools, news_engine)
+
+        routed = {}
+        for message, expected in MESSAGES:
+            intent, _ = router.classify(message)
+            routed[message] = intent or "agent"
+        wrong = [m for m, expected in MESSAGES if routed[m] != expected]
+        print(
+            f"{len(MESSAGES)} messages: "
+            + ", ".join(
+                f"{sum(1 for i in routed.values() if i == kind)} {kind}"
+                for kind in ("price", "news", "agent")
+            )
+            + f"; {len(wrong)} routed differently than expected {wrong}"
+        )
+
+        async def agent_only(message):
+            await pool.achat("user", message)
+
+        async def with_router(message):
+            answer = await router.aroute(message)
+            if answer is None:
+                await pool.achat("user", message)
+
+        async def run():
+            await replay("agent only:", agent_only, llm)
+            await replay("router + agent:", with_router, llm)
+            print(
+                "\nrouted answers, e.g.:\n"
+                + (await router.aroute("price of $PEPE and $WIF"))
+                + "\n"
+                + (await router.aroute("latest news on pepe"))
+            )
+
+        asyncio.run(run())
+        print(f"\nrouter stats: {router.stats}")
+        tools.http.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Hit rate and upstream calls saved by the batched, cached market data fetch.
+
+Replays agent tool calls against a local CoinGecko stub: bursts of concurrent
+calls, each asking for a few coins drawn mostly from a small set of hot meme
+coins. Compares one upstream request per coin, as before, with the cache,
+then checks that cancelling a call joined to an in-flight fetch leaves the
+call that started it unaffected.
+
+    python benchmarks/bench_market_data.py
+"""
+
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from agent_tools import CryptoTools
+from bench_http_client import free_port, start_stub_server
+from http_client import AsyncHTTPClient
+from market_data import MarketDataCache
+
+HOT_COINS = ["pepe", "dogwifcoin", "bonk", "dogecoin", "shiba-inu", "popcat"]
+COLD_COINS = [f"coin-{i}" for i in range(500)]
+BURSTS = 100
+CALLS_PER_BURST = 8
+# Seconds between bursts; the cache TTL is scaled down by the same factor.
+BURST_INTERVAL = 0.05
+TTL = 1.0
+
+
+def tool_call_coins(rng):
+    coins = rng.sample(HOT_COINS, rng.randint(1, 3))
+    if rng.random() < 0.3:
+        coins.append(rng.choice(COLD_COINS))
+    return coins
+
+
+async def replay(fetch_call):
+    rng = random.Random(7)
+    start = time.perf_counter()
+    for _ in range(BURSTS):
+        await asyncio.gather(
+            *(fetch_call(tool_call_coins(rng)) for _ in range(CALLS_PER_BURST))
+        )
+        await asyncio.sleep(BURST_INTERVAL)
+    return time.perf_counter() - start
+
+
+async def cancel_joiner():
+    async def slow_fetch(coin_ids):
+        await asyncio.sleep(0.1)
+        return [{"id": coin_id} for coin_id in coin_ids]
+
+    cache = MarketDataCache(slow_fetch, ttl=TTL)
+    owner = asyncio.create_task(cache.get(["pepe"]))
+    await asyncio.sleep(0)
+    joiner = asyncio.create_task(cache.get(["pepe"]))
+    await asyncio.sleep(0)
+    joiner.cancel()
+    try:
+        markets = await owner
+    except asyncio.CancelledError:
+        return "owner cancelled with the joiner"
+    return f"owner got {[m['id'] for m in markets]}, joiner cancelled={joiner.cancelled()}"
+
+
+def main():
+    port = free_port()
+    start_stub_server(port)
+    # The stub has no coin list, so coin ids pass through the resolver as-is.
+    tools = CryptoTools(
+        http=AsyncHTTPClient(),
+        coingecko_base_url=f"http://127.0.0.1:{port}/api/v3",
+        coin_list_path=os.path.join(tempfile.mkdtemp(), "coin_list.json"),
+    )
+
+    uncached_calls = 0
+
+    async def one_request_per_coin(coins):
+        nonlocal uncached_calls
+        for coin_id in coins:
+            uncached_calls += 1
+            await tools.afetch_coingecko_markets([coin_id])
+
+    seconds = asyncio.run(replay(one_request_per_coin))
+    print(f"per-coin requests: {uncached_calls} upstream calls in {seconds:.1f}s")
+
+    tools.market_data = MarketDataCache(tools.afetch_coingecko_markets, ttl=TTL)
+    seconds = asyncio.run(replay(tools.afetch_coingecko_market_data))
+    stats = tools.market_data.stats()
+    print(
+        f"batched + cached:  {stats['upstream_calls']} upstream calls in "
+        f"{seconds:.1f}s for {stats['requested']} coin lookups"
+    )
+    print(
+        f"  hit rate {stats['hit_rate']:.0%}, {stats['joined_in_flight']} lookups "
+        f"joined an in-flight request, {stats['upstream_calls_saved']} calls saved"
+    )
+    # The replay compresses time by TTL / MARKET_DATA_TTL, so scale back to wall time.
+    scale = TTL / 60
+    print(
+        f"  ~{stats['upstream_calls_saved_per_hour'] * scale:.0f} upstream calls "
+        f"saved per hour at this call mix with a 60s TTL"
+    )
+    tools.http.close()
+    print(f"cancelled joiner: {asyncio.run(cancel_joiner())}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Tool latency with the background market poller against live fetches.
+
+Polls a local CoinGecko/Binance stub, whose responses are delayed like a real
+API round-trip, into a temporary snapshot store. Then times the
+fetch_coingecko_market_data tool served from the snapshot against a live
+fetch, answers a momentum question from the stored series, and reloads the
+store from disk.
+
+    python benchmarks/bench_market_poller.py
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from aiohttp import web
+
+from agent_tools import CryptoTools
+from bench_http_client import free_port, start_stub_server
+from http_client import AsyncHTTPClient
+from market_snapshot import (
+    MARKET_WATCHLIST_COINS,
+    MARKET_WATCHLIST_SYMBOLS,
+    MarketPoller,
+    MarketSnapshotStore,
+)
+
+POLLS = 200
+# Simulated upstream round-trip.
+UPSTREAM_LATENCY = 0.15
+CALLS = 50
+
+
+@web.middleware
+async def delay(request, handler):
+    await asyncio.sleep(UPSTREAM_LATENCY)
+    return await handler(request)
+
+
+def median_ms(fn):
+    latencies = []
+    for _ in range(CALLS):
+        start = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return statistics.median(latencies)
+
+
+def main():
+    port = free_port()
+    start_stub_server(port, middlewares=[delay])
+
+    base_url = f"http://127.0.0.1:{port}/api/v3"
+    with tempfile.TemporaryDirectory() as tmp:
+        store = MarketSnapshotStore(directory=tmp)
+        tools = CryptoTools(
+            http=AsyncHTTPClient(),
+            coingecko_base_url=base_url,
+            binance_base_url=base_url,
+            snapshot=store,
+            coin_list_path=os.path.join(tmp, "coin_list.json"),
+        )
+        poller = MarketPoller(tools, store, interval=0)
+
+        async def poll():
+            start = time.perf_counter()
+            for _ in range(POLLS):
+                await poller.poll_once()
+            return time.perf_counter() - start
+
+        seconds = asyncio.run(poll())
+        print(
+            f"{POLLS} polls of {len(MARKET_WATCHLIST_COINS)} coins and "
+            f"{len(MARKET_WATCHLIST_SYMBOLS)} symbols in {seconds:.1f}s, "
+            f"2 upstream requests each"
+        )
+
+        coins = MARKET_WATCHLIST_COINS[:3]
+        print(
+            f"tool from snapshot:  p50 "
+            f"{median_ms(lambda: tools.fetch_coingecko_market_data(coins)):7.3f} ms"
+        )
+        print(
+            f"live fetch:          p50 "
+            f"{median_ms(lambda: tools.http.run_sync(tools.afetch_coingecko_markets(coins))):7.3f} ms"
+        )
+        print(f"momentum answer: {tools.fetch_price_momentum(['pepe'], 60)[0]}")
+
+        size = sum(os.path.getsize(os.path.join(tmp, name)) for name in os.listdir(tmp))
+        start = time.perf_counter()
+        reloaded = MarketSnapshotStore(directory=tmp)
+        print(
+            f"on disk: {size / 1024:.0f} KiB; reloaded {len(reloaded.series)} series "
+            f"of {len(reloaded.series['coin:pepe'])} samples in "
+            f"{(time.perf_counter() - start) * 1000:.1f} ms"
+        )
+        tools.http.close()
+
+
+if __name__ == "__main__":
+    main()
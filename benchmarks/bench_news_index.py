@@ -0,0 +1,118 @@
+"""
+News vector index against Qdrant's in-memory mode.
+
+Aggregates the fixture feeds of bench_news_ingestion through NewsIndexer into
+a NewsIndex, embedded with the lexical stand-in embedding of eval_chunking.py,
+then asks the crypto_news query engine a few questions. Compares the tokens an
+agent handled when it passed article lists through process_news_articles with
+the headline list the query engine returns, and shows how recency decay
+reorders results.
+
+    python benchmarks/bench_news_index.py
+"""
+
+import glob
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from email.utils import formatdate
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from qdrant_client import QdrantClient
+
+os.environ.setdefault("CRYPTOPANIC_API_KEY", "stub")
+
+from agent_tools import CryptoTools
+from bench_http_client import free_port
+from bench_news_ingestion import FIXTURES_DIR, start_feed_server
+from eval_chunking import EMBED_DIM, BagOfWordsEmbedding
+from http_client import AsyncHTTPClient
+from news_index import NewsIndex, NewsIndexer
+
+QUESTIONS = [
+    "what is the latest news on PEPE",
+    "are bitcoin ETF inflows still growing",
+    "which meme coins are breaking out",
+    "any news about dogwifhat",
+]
+# The fixtures are dated March 2025; keep them all.
+RETENTION_DAYS = 10000
+
+
+def approx_tokens(text):
+    # About four characters per token for English; no tokenizer download needed.
+    return len(text) // 4
+
+
+def main():
+    feeds = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.xml"))):
+        with open(path, "rb") as f:
+            feeds[os.path.basename(path)] = (f.read(), formatdate(usegmt=True))
+    port = free_port()
+    start_feed_server(port, feeds, {"bytes": 0, "not_modified": 0})
+    base_url = f"http://127.0.0.1:{port}"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tools = CryptoTools(
+            http=AsyncHTTPClient(),
+            cryptopanic_base_url=f"{base_url}/cryptopanic",
+            rss_feed_urls=[f"{base_url}/feeds/{name}" for name in feeds],
+            news_store_path=os.path.join(tmp, "news.db"),
+            coin_list_path=os.path.join(tmp, "coin_list.json"),
+        )
+        index = NewsIndex(
+            QdrantClient(location=":memory:"),
+            BagOfWordsEmbedding(),
+            vector_size=EMBED_DIM,
+        )
+        indexer = NewsIndexer(tools, lambda: index, retention_days=RETENTION_DAYS)
+
+        start = time.perf_counter()
+        added = tools.http.run_sync(indexer.index_once())
+        print(
+            f"first cycle: embedded {added} articles in "
+            f"{time.perf_counter() - start:.2f}s; collection holds {len(index)}"
+        )
+        start = time.perf_counter()
+        added = tools.http.run_sync(indexer.index_once())
+        print(
+            f"second cycle: embedded {added} articles in "
+            f"{time.perf_counter() - start:.2f}s (feeds unchanged)"
+        )
+
+        # What the agent used to pass in and get back for the same questions
+        articles = tools.process_news_articles(tools.news.store.recent(limit=100))
+        article_tokens = 2 * approx_tokens(json.dumps(articles))
+
+        engine = index.as_query_engine()
+        flat = index.as_query_engine(half_life_hours=0)
+        latencies, tokens = [], []
+        for question in QUESTIONS:
+            start = time.perf_counter()
+            response = engine.query(question)
+            latencies.append((time.perf_counter() - start) * 1000)
+            tokens.append(approx_tokens(str(response)))
+            print(f"\n{question}\n{response}")
+            flat_titles = [
+                n.node.metadata["title"] for n in flat.query(question).source_nodes
+            ]
+            decayed_titles = [n.node.metadata["title"] for n in response.source_nodes]
+            if flat_titles != decayed_titles:
+                print(f"  (similarity alone would rank: {flat_titles[0]!r} first)")
+
+        print(
+            f"\nquery p50 {statistics.median(latencies):.1f} ms; "
+            f"~{statistics.mean(tokens):.0f} tokens per answer vs "
+            f"~{article_tokens} tokens of article lists through process_news_articles"
+        )
+        tools.http.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+News ingestion against local fixture feeds: concurrency, conditional requests,
+de-duplication and the incremental seen-article store.
+
+Serves benchmarks/fixtures/news/*.xml (two RSS feeds and one Atom feed, which
+share a story under different URLs and title casing) plus a CryptoPanic stub,
+with ETag and Last-Modified support and a simulated network delay. Compares
+the old sequential feedparser.parse loop with NewsIngestion over several
+cycles: a first full fetch, an unchanged cycle, a cycle after one feed gains
+items, and a restart on the same store.
+
+    python benchmarks/bench_news_ingestion.py
+"""
+
+import asyncio
+import glob
+import hashlib
+import os
+import sys
+import tempfile
+import threading
+import time
+from email.utils import formatdate
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import feedparser
+from aiohttp import web
+
+os.environ.setdefault("CRYPTOPANIC_API_KEY", "stub")
+
+from agent_tools import CryptoTools
+from bench_http_client import free_port
+from http_client import AsyncHTTPClient
+from news_feed import NewsIngestion, NewsStore
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "news")
+# Simulated round-trip to each feed host.
+FEED_LATENCY = 0.2
+
+NEW_ITEMS = """
+    <item>
+      <title>PEPE open interest doubles in a week</title>
+      <link>https://cointelegraph.com/news/pepe-open-interest-doubles</link>
+      <pubDate>Fri, 14 Mar 2025 13:05:00 +0000</pubDate>
+      <description>Derivatives traders piled into PEPE.</description>
+    </item>
+    <item>
+      <title>Bitcoin ETF inflows hit record, as meme coins rally</title>
+      <link>https://cointelegraph.com/news/etf-inflows-meme-rally-recap</link>
+      <pubDate>Fri, 14 Mar 2025 13:10:00 +0000</pubDate>
+      <description>A recap of a story other outlets already covered.</description>
+    </item>
+"""
+
+
+def start_feed_server(port, feeds, traffic):
+    async def feed(request):
+        await asyncio.sleep(FEED_LATENCY)
+        body, last_modified = feeds[request.match_info["name"]]
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        if request.headers.get("If-None-Match") == etag:
+            traffic["not_modified"] += 1
+            return web.Response(status=304)
+        traffic["bytes"] += len(body)
+        return web.Response(
+            body=body,
+            content_type="application/rss+xml",
+            headers={"ETag": etag, "Last-Modified": last_modified},
+        )
+
+    async def cryptopanic(request):
+        await asyncio.sleep(FEED_LATENCY)
+        return web.json_response(
+            {
+                "results": [
+                    {
+                        "title": "BITCOIN ETF inflows hit record as meme coins rally",
+                        "url": "https://cryptopanic.com/news/123/bitcoin-etf-inflows",
+                        "published_at": "2025-03-14T12:30:00Z",
+                    },
+                    {
+                        "title": "Solana DEX volume flips Ethereum",
+                        "url": "https://cryptopanic.com/news/124/solana-dex-volume",
+                        "published_at": "2025-03-14T12:45:00Z",
+                    },
+                ]
+            }
+        )
+
+    app = web.Application()
+    app.router.add_get("/feeds/{name}", feed)
+    app.router.add_get("/cryptopanic/posts/", cryptopanic)
+    loop = asyncio.new_event_loop()
+    runner = web.AppRunner(app, access_log=None)
+    loop.run_until_complete(runner.setup())
+    loop.run_until_complete(web.TCPSite(runner, "127.0.0.1", port).start())
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+
+
+def main():
+    feeds = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.xml"))):
+        with open(path, "rb") as f:
+            feeds[os.path.basename(path)] = (f.read(), formatdate(usegmt=True))
+    traffic = {"bytes": 0, "not_modified": 0}
+    port = free_port()
+    start_feed_server(port, feeds, traffic)
+    base_url = f"http://127.0.0.1:{port}"
+    feed_urls = [f"{base_url}/feeds/{name}" for name in feeds]
+
+    start = time.perf_counter()
+    articles = 0
+    for url in feed_urls:
+        articles += len(feedparser.parse(url).entries)
+    print(
+        f"sequential feedparser.parse: {articles} articles from {len(feed_urls)} "
+        f"feeds in {time.perf_counter() - start:.2f}s, every cycle"
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store_path = os.path.join(tmp, "news.db")
+        tools = CryptoTools(
+            http=AsyncHTTPClient(),
+            cryptopanic_base_url=f"{base_url}/cryptopanic",
+            rss_feed_urls=feed_urls,
+            news_store_path=store_path,
+            coin_list_path=os.path.join(tmp, "coin_list.json"),
+        )
+
+        def cycle(label, ingestion):
+            traffic.update(bytes=0, not_modified=0)
+            start = time.perf_counter()
+            fetched = ingestion.stats["articles_fetched"]
+            new = tools.http.run_sync(ingestion.collect())
+            print(
+                f"{label:<22} {time.perf_counter() - start:5.2f}s  "
+                f"{traffic['bytes'] / 1024:5.1f} KiB  "
+                f"{traffic['not_modified']} not modified  "
+                f"{ingestion.stats['articles_fetched'] - fetched:3d} fetched  "
+                f"{len(new):3d} new"
+            )
+            return new
+
+        new = cycle("first cycle:", tools.news)
+        titles = [a["title"] for a in new if "inflows hit record" in a["title"].lower()]
+        print(f"  the shared ETF story was kept once: {titles}")
+        cycle("unchanged feeds:", tools.news)
+
+        name = "cointelegraph.xml"
+        body = feeds[name][0].replace(
+            b"  </channel>", NEW_ITEMS.encode() + b"  </channel>"
+        )
+        feeds[name] = (body, formatdate(usegmt=True))
+        new = cycle("one feed updated:", tools.news)
+        print(f"  new: {[a['title'] for a in new]}")
+
+        restarted = NewsIngestion(tools.http, NewsStore(store_path), feed_urls)
+        cycle("after a restart:", restarted)
+
+        processed = tools.aggregate_and_process_news()
+        print(f"aggregate_and_process_news() returned {len(processed)} new articles")
+        tools.http.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Micro-benchmark of process_news_articles on 10k articles.
+
+Articles are built from the fixture feeds' stories with varied wording, about
+half of them repeats as in a feed polled all day, and ISO 8601 (CryptoPanic)
+or RFC 822 (RSS) timestamps. Compares the old per-article TextBlob call and
+strptime fallbacks with the batched, memoized sentiment stage and the one-pass
+timestamp parser, cold, on a repeated call, and on a process pool.
+
+    python benchmarks/bench_news_processing.py
+"""
+
+import glob
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import feedparser
+from textblob import TextBlob
+
+from sentiment import SentimentAnalyzer, parse_timestamp
+
+ARTICLES = 10000
+DISTINCT = 5000
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "news")
+
+
+def make_articles(rng):
+    stories = []
+    for path in glob.glob(os.path.join(FIXTURES_DIR, "*.xml")):
+        stories.extend(e.summary for e in feedparser.parse(path).entries)
+    tails = ["Analysts are cautious.", "Holders look thrilled.", "Volume was weak."]
+    distinct = [
+        f"{rng.choice(stories)} {rng.choice(tails)} ({i})" for i in range(DISTINCT)
+    ]
+    base = datetime(2025, 3, 14, tzinfo=timezone.utc)
+    articles = []
+    for i in range(ARTICLES):
+        published = base - timedelta(minutes=rng.randint(0, 60 * 24 * 7))
+        if rng.random() < 0.5:
+            published_at = published.strftime("%Y-%m-%dT%H:%M:%S%z")
+        else:
+            published_at = format_datetime(published)
+        content = distinct[i] if i < DISTINCT else rng.choice(distinct)
+        articles.append({"content": content, "published_at": published_at})
+    return articles
+
+
+def old_process(articles):
+    """process_news_articles as it was: TextBlob and strptime fallbacks per article."""
+    for article in articles:
+        polarity = TextBlob(article["content"]).sentiment.polarity
+        article["sentiment"] = (
+            "bullish" if polarity > 0 else "bearish" if polarity < 0 else "neutral"
+        )
+        try:
+            article["published_at"] = datetime.strptime(
+                article["published_at"], "%Y-%m-%dT%H:%M:%S%z"
+            ).strftime("%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            article["published_at"] = datetime.strptime(
+                article["published_at"], "%a, %d %b %Y %H:%M:%S %z"
+            ).strftime("%Y-%m-%d %H:%M:%S")
+    return articles
+
+
+def old_strptime(value):
+    try:
+        return datetime.strptime(value, "%Y-%m-%dT%H:%M:%S%z")
+    except ValueError:
+        return datetime.strptime(value, "%a, %d %b %Y %H:%M:%S %z")
+
+
+def new_process(analyzer, articles):
+    labels = analyzer.analyze_batch([a["content"] for a in articles])
+    for article, label in zip(articles, labels):
+        article["sentiment"] = label
+        article["published_at"] = parse_timestamp(article["published_at"])
+    return articles
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main():
+    articles = make_articles(random.Random(5))
+    copy = lambda: [dict(a) for a in articles]
+
+    old_seconds, expected = timed(lambda: old_process(copy()))
+    print(f"{ARTICLES} articles, {DISTINCT} distinct contents")
+    print(f"old per-article processing:  {old_seconds:6.2f}s")
+
+    analyzer = SentimentAnalyzer()
+    seconds, result = timed(lambda: new_process(analyzer, copy()))
+    assert result == expected
+    print(f"batched + memoized, cold:    {seconds:6.2f}s  (same output)")
+    seconds, _ = timed(lambda: new_process(analyzer, copy()))
+    print(f"batched + memoized, repeat:  {seconds:6.3f}s")
+
+    workers = max(2, os.cpu_count() or 1)
+    pooled = SentimentAnalyzer(pool_workers=workers, pool_min_batch=1)
+    # Start the workers before timing; they live for the bot's lifetime.
+    pooled.analyze_batch(["warm", "up"])
+    seconds, _ = timed(lambda: new_process(pooled, copy()))
+    print(
+        f"process pool ({workers} workers, "
+        f"{os.cpu_count()} CPUs), cold: {seconds:6.2f}s"
+    )
+    pooled.close()
+
+    timestamps = [a["published_at"] for a in articles]
+    old_seconds, _ = timed(lambda: [old_strptime(t) for t in timestamps])
+    seconds, _ = timed(lambda: [parse_timestamp(t) for t in timestamps])
+    print(
+        f"timestamps only: strptime fallbacks {old_seconds * 1000:5.1f} ms, "
+        f"one-pass parser {seconds * 1000:5.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Prompt size and formatting time of the QA agent's ReAct requests, with the
+stock ReActChatFormatter and with PromptBuilder's token budget.
+
+Replays a 30-turn conversation whose answers carry long tool output (market
+data and news lists), each turn taking three ReAct steps, against the real
+persona and tool set. History comes from a ChatMemoryBuffer with the bots'
+3000-token limit, as in the agents. Without a tiktoken download the token
+counts are estimated from text length.
+
+    python benchmarks/bench_prompt_builder.py
+"""
+
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+
+from llama_index.core.agent.react.formatter import ReActChatFormatter
+from llama_index.core.agent.react.types import (
+    ActionReasoningStep,
+    ObservationReasoningStep,
+)
+from llama_index.core.llms import ChatMessage, MessageRole
+from llama_index.core.memory import ChatMemoryBuffer
+
+from agents import discord_ai_agent_tools
+from prompt import discord_ai_agent_context
+from prompt_builder import PromptBuilder, count_tokens
+
+TURNS = 30
+STEPS = 3
+QUESTIONS = [
+    "which meme coin is bullish in the last 24hrs",
+    "what's the latest on PEPE",
+    "should I ape into WIF or BONK",
+    "how is BTC doing today",
+    "any rug pull warnings this week",
+]
+
+
+def market_rows(rng, n):
+    return [
+        {
+            "id": f"coin-{rng.randint(1, 999)}",
+            "current_price": round(rng.uniform(0.0001, 50), 6),
+            "price_change_percentage_24h": round(rng.uniform(-30, 60), 2),
+            "total_volume": rng.randint(10**5, 10**9),
+            "market_cap": rng.randint(10**6, 10**10),
+        }
+        for _ in range(n)
+    ]
+
+
+def tool_enriched_reply(rng):
+    return (
+        "Here's what the charts say right now. "
+        + json.dumps(market_rows(rng, rng.randint(8, 20)))
+        + " Not financial advice, degen responsibly."
+    )
+
+
+def reasoning_steps(rng, step):
+    steps = []
+    for _ in range(step):
+        steps.append(
+            ActionReasoningStep(
+                thought="I need current market data to answer.",
+                action="fetch_coingecko_market_data",
+                action_input={"coin_ids": "pepe,dogwifcoin,bonk"},
+            )
+        )
+        steps.append(
+            ObservationReasoningStep(observation=json.dumps(market_rows(rng, 5)))
+        )
+    return steps
+
+
+def main():
+    rng = random.Random(20)
+    context = discord_ai_agent_context.replace("{username}", "degen42")
+    tools = discord_ai_agent_tools
+    stock = ReActChatFormatter.from_defaults(context=context)
+    builder = PromptBuilder.from_context(context, name="user:degen42", log_tokens=False)
+    memory = ChatMemoryBuffer.from_defaults(
+        token_limit=3000, tokenizer_fn=lambda text: [0] * count_tokens(text)
+    )
+
+    def size(messages):
+        return sum(count_tokens(m.content or "") for m in messages)
+
+    stock_tokens, built_tokens, stock_ms, built_ms = [], [], [], []
+    for turn in range(TURNS):
+        question = ChatMessage(role=MessageRole.USER, content=rng.choice(QUESTIONS))
+        history = memory.get() + [question]
+        for step in range(STEPS):
+            reasoning = reasoning_steps(rng, step)
+            start = time.perf_counter()
+            messages = stock.format(tools, history, reasoning)
+            stock_ms.append((time.perf_counter() - start) * 1000)
+            stock_tokens.append(size(messages))
+            start = time.perf_counter()
+            messages = builder.format(tools, history, reasoning)
+            built_ms.append((time.perf_counter() - start) * 1000)
+            built_tokens.append(size(messages))
+        memory.put(question)
+        memory.put(
+            ChatMessage(role=MessageRole.ASSISTANT, content=tool_enriched_reply(rng))
+        )
+
+    header, sizes = builder.render_header(tools)
+    print(
+        f"{TURNS} turns x {STEPS} ReAct steps; persona {sizes['persona']} tokens, "
+        f"tools {sizes['tools']} tokens, budget {builder.token_budget}"
+    )
+    for label, tokens, ms in [
+        ("ReActChatFormatter", stock_tokens, stock_ms),
+        ("PromptBuilder", built_tokens, built_ms),
+    ]:
+        print(
+            f"{label:<19} tokens/request mean {statistics.mean(tokens):6.0f}  "
+            f"max {max(tokens):5d}  total {sum(tokens):7d}  "
+            f"format p50 {statistics.median(ms):.2f} ms"
+        )
+
+    print("\nlast request, as logged, with the full budget and with 2000 tokens:")
+    builder.log_tokens = True
+    builder.format(tools, history, reasoning)
+    builder.token_budget = 2000
+    messages = builder.format(tools, history, reasoning)
+    print(messages[0].content[len(header) :].strip())
+
+
+if __name__ == "__main__":
+    main()
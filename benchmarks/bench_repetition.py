@@ -0,0 +1,172 @@
+"""
+Check latency, memory per channel and accuracy of ConversationTracker's
+MinHash near-duplicate check, against exact Jaccard similarity over cached
+shingle sets of the same window.
+
+Replays a stream of bot-style replies (a cashtag, a take and a sign-off, the
+formula the trader bots fall into) where every other candidate reply is a
+lightly edited repeat of a message still in the window. The ground truth is
+the exact Jaccard similarity of the shingles at the tracker's threshold.
+
+    python benchmarks/bench_repetition.py
+"""
+
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from repetition import REPETITION_THRESHOLD, ConversationTracker, MinHasher
+
+MESSAGES = 2000
+WINDOWS = [20, 50, 200]
+
+COINS = ["PEPE", "WIF", "BONK", "DOGE", "SHIB", "FLOKI", "POPCAT", "MEW", "BRETT"]
+OPENERS = [
+    "Yo degens,",
+    "Listen up fam,",
+    "Not gonna lie,",
+    "Real talk,",
+    "Charts don't lie:",
+    "Hot take incoming,",
+    "Ser, hear me out,",
+]
+TAKES = [
+    "is pumping hard with volume up {n}% and whales loading bags",
+    "looks ready to break out after {n} hours of sideways chop",
+    "just flipped resistance and the socials are going parabolic",
+    "is bleeding {n}% today, paper hands are folding",
+    "has funding rates flipping positive, the longs are back",
+    "dropped {n}% on the news but smart money keeps buying the dip",
+    "is trending on CT with {n}k mentions in the last hour",
+]
+CLOSERS = [
+    "Ape in or stay poor. 🚀",
+    "NFA, but I'm watching that entry closely.",
+    "Set your stops and ride the wave.",
+    "Who's still holding? 💎🙌",
+    "Rug pull risk is real, size your bags.",
+    "This is where legends are made. LFG!",
+]
+EDITS = {
+    "pumping": "mooning",
+    "whales": "big wallets",
+    "degens": "frens",
+    "hard": "insanely",
+    "today": "right now",
+    "closely": "carefully",
+    "bags": "positions",
+}
+
+
+def compose(rng):
+    takes = rng.sample(TAKES, 2)
+    return (
+        f"{rng.choice(OPENERS)} ${rng.choice(COINS)} "
+        + f"{takes[0].format(n=rng.randint(5, 90))}, and ${rng.choice(COINS)} "
+        + f"{takes[1].format(n=rng.randint(5, 90))}. {rng.choice(CLOSERS)}"
+    )
+
+
+def edit(rng, message):
+    """A lightly reworded repeat: a synonym or two, a dropped word, new emoji."""
+    words = message.split()
+    for _ in range(rng.randint(1, 2)):
+        i = rng.randrange(len(words))
+        words[i] = EDITS.get(words[i].strip(",."), words[i])
+    del words[rng.randrange(len(words))]
+    return " ".join(words) + rng.choice(["", " 🔥", " fr fr", "!!"])
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b)
+
+
+def replay(window, hasher):
+    rng = random.Random(25)
+    tracker = ConversationTracker(window=window, hasher=hasher)
+    shingle_window = []
+    check_us, add_us, exact_us = [], [], []
+    counts = {"tp": 0, "fp": 0, "fn": 0, "tn": 0}
+    for step in range(MESSAGES):
+        recent = [m for m in tracker.discussion_history if m]
+        if recent and step % 2:
+            candidate = edit(rng, rng.choice(recent))
+        else:
+            candidate = compose(rng)
+
+        start = time.perf_counter()
+        match = tracker.check(candidate)
+        check_us.append((time.perf_counter() - start) * 1e6)
+
+        start = time.perf_counter()
+        shingles = set(hasher.shingles(candidate).tolist())
+        exact = max((jaccard(shingles, s) for s in shingle_window), default=0.0)
+        exact_us.append((time.perf_counter() - start) * 1e6)
+
+        actual = exact >= REPETITION_THRESHOLD
+        counts[
+            ("t" if (match is not None) == actual else "f")
+            + ("p" if match is not None else "n")
+        ] += 1
+
+        start = time.perf_counter()
+        tracker.add_message(candidate)
+        add_us.append((time.perf_counter() - start) * 1e6)
+        shingle_window = (shingle_window + [shingles])[-window:]
+    return check_us, add_us, exact_us, counts
+
+
+def channel_memory(window, hasher):
+    """Bytes one channel's tracker holds with a full window; the hasher is shared."""
+    rng = random.Random(1)
+    messages = [compose(rng) for _ in range(window)]
+    # Sketch outside the trace; the hasher's cache is shared by all channels
+    for message in messages:
+        hasher.signature(message)
+    tracemalloc.start()
+    tracker = ConversationTracker(window=window, hasher=hasher)
+    for message in messages:
+        tracker.add_message(message)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, tracker
+
+
+def main():
+    hasher = MinHasher()
+    print(
+        f"{MESSAGES} replies per channel, {hasher.num_perm} permutations, "
+        f"{hasher.shingle_size}-byte shingles, threshold {REPETITION_THRESHOLD}"
+    )
+    for window in WINDOWS:
+        check_us, add_us, exact_us, counts = replay(window, hasher)
+        size, _ = channel_memory(window, hasher)
+        repeats = counts["tp"] + counts["fn"]
+        print(
+            f"window {window:>3}: check p50 {statistics.median(check_us):5.1f} us  "
+            f"p95 {statistics.quantiles(check_us, n=20)[18]:5.1f} us  "
+            f"add p50 {statistics.median(add_us):5.1f} us  "
+            f"(exact Jaccard p50 {statistics.median(exact_us):6.1f} us)  "
+            f"memory/channel {size / 1024:5.1f} KiB"
+        )
+        print(
+            f"            caught {counts['tp']}/{repeats} repeats, "
+            f"{counts['fp']} false alarms in {counts['fp'] + counts['tn']} fresh replies"
+        )
+
+    _, tracker = channel_memory(50, hasher)
+    message = tracker.discussion_history[3]
+    match = tracker.check(edit(random.Random(2), message))
+    print(
+        f"\nrepeat {match[0]:.0%} similar, regenerated with:\n"
+        f"{tracker.topic_shift_hint(match[1])}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Latency and ranking agreement of the local reranker against Cohere.
+
+Candidates come from the hybrid retriever over the conversation windows of
+Data/, indexed with the lexical stand-in embedding of eval_chunking.py. Cohere
+rankings are recorded once with --record (needs COHERE_API_KEY) and replayed
+from benchmarks/rerank_recordings.json afterwards. Node ids are content
+addressed, so recordings stay valid while Data/ is unchanged.
+
+    python benchmarks/bench_rerank.py [--record]
+"""
+
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from llama_index.core import VectorStoreIndex
+from llama_index.core.retrievers import VectorIndexRetriever
+from llama_index.core.schema import QueryBundle
+from llama_index.vector_stores.qdrant import QdrantVectorStore
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, VectorParams
+
+from bm25_index import BM25Index, BM25IndexRetriever
+from chat_node_parser import ConversationWindowNodeParser
+from discord_loader import DiscordChatReader
+from eval_chunking import (
+    DATA_DIR,
+    EMBED_DIM,
+    LABELED_QUERIES,
+    BagOfWordsEmbedding,
+    message_contents,
+)
+from hybrid_retriever import HybridRetriever
+from ingestion import IncrementalIngestion
+from rerank import RERANK_CANDIDATES, RERANK_TOP_N, create_reranker
+
+RECORDINGS_PATH = os.path.join(os.path.dirname(__file__), "rerank_recordings.json")
+
+
+def build_retriever(tmp, embed_model):
+    client = QdrantClient(location=":memory:")
+    client.create_collection(
+        "bench", vectors_config=VectorParams(size=EMBED_DIM, distance=Distance.COSINE)
+    )
+    vector_store = QdrantVectorStore(client=client, collection_name="bench")
+    bm25_index = BM25Index(os.path.join(tmp, "bench.db"))
+    IncrementalIngestion(
+        vector_store=vector_store,
+        embed_model=embed_model,
+        node_parser=ConversationWindowNodeParser(),
+        manifest_path=os.path.join(tmp, "bench.json"),
+        keyword_index=bm25_index,
+    ).run(DiscordChatReader(mode="transcript").load_data(DATA_DIR))
+    return HybridRetriever(
+        VectorIndexRetriever(
+            index=VectorStoreIndex.from_vector_store(
+                vector_store=vector_store, embed_model=embed_model
+            ),
+            similarity_top_k=RERANK_CANDIDATES,
+        ),
+        BM25IndexRetriever(bm25_index, similarity_top_k=RERANK_CANDIDATES),
+        similarity_top_k=RERANK_CANDIDATES,
+    )
+
+
+def record(candidates):
+    from llama_index.postprocessor.cohere_rerank import CohereRerank
+
+    cohere = CohereRerank(api_key=os.environ["COHERE_API_KEY"], top_n=RERANK_TOP_N)
+    recordings = {}
+    for query, nodes in candidates.items():
+        start = time.perf_counter()
+        ranked = cohere.postprocess_nodes(nodes, QueryBundle(query))
+        recordings[query] = {
+            "node_ids": [n.node.node_id for n in ranked],
+            "seconds": time.perf_counter() - start,
+        }
+    with open(RECORDINGS_PATH, "w") as f:
+        json.dump(recordings, f, indent=2)
+    print(f"recorded Cohere rankings for {len(recordings)} queries")
+    return recordings
+
+
+def overlap(a, b, k):
+    return len(set(a[:k]) & set(b[:k])) / k
+
+
+def main():
+    contents = message_contents()
+    embed_model = BagOfWordsEmbedding()
+    with tempfile.TemporaryDirectory() as tmp:
+        retriever = build_retriever(tmp, embed_model)
+        candidates = {
+            query: retriever.retrieve(QueryBundle(query))
+            for query, _ in LABELED_QUERIES
+        }
+
+    if "--record" in sys.argv:
+        recordings = record(candidates)
+    elif os.path.exists(RECORDINGS_PATH):
+        with open(RECORDINGS_PATH) as f:
+            recordings = json.load(f)
+    else:
+        recordings = {}
+        print("no Cohere recordings, run with --record to compare rankings")
+
+    answers = dict(LABELED_QUERIES)
+    print(
+        f"{len(LABELED_QUERIES)} labeled queries, "
+        f"{RERANK_CANDIDATES} candidates -> top {RERANK_TOP_N}"
+    )
+    if recordings:
+        seconds = [r["seconds"] * 1000 for r in recordings.values()]
+        print(f"{'cohere (recorded)':>20}: p50 {statistics.median(seconds):7.2f} ms")
+    for backend in ("local", "none"):
+        reranker = create_reranker(embed_model=embed_model, backend=backend)
+        latencies, hits, top3, top8 = [], 0, [], []
+        for query, nodes in candidates.items():
+            start = time.perf_counter()
+            ranked = reranker.postprocess_nodes(list(nodes), QueryBundle(query))
+            latencies.append((time.perf_counter() - start) * 1000)
+            texts = [n.node.get_content() for n in ranked]
+            hits += any(contents[a][:60] in t for a in answers[query] for t in texts)
+            if query in recordings:
+                ids = [n.node.node_id for n in ranked]
+                top3.append(overlap(ids, recordings[query]["node_ids"], 3))
+                top8.append(overlap(ids, recordings[query]["node_ids"], RERANK_TOP_N))
+        stats = reranker.stats()
+        line = (
+            f"{backend:>20}: p50 {statistics.median(latencies):7.2f} ms  "
+            f"hit rate {hits / len(candidates):.0%}  "
+            f"skipped {stats['skipped']}/{len(candidates)}"
+        )
+        if top3:
+            line += (
+                f"  overlap with Cohere @3 {statistics.mean(top3):.0%} "
+                f"@{RERANK_TOP_N} {statistics.mean(top8):.0%}"
+            )
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Measure the semantic response cache over a replayed bot-to-bot transcript.
+
+The fake embedding model maps each query to a hashed bag of words, so reworded
+questions built from the same words land close together, and the fake query
+engine sleeps like retrieval + rerank + synthesis.
+
+    python benchmarks/bench_semantic_cache.py
+"""
+
+import hashlib
+import os
+import re
+import sys
+import time
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.query_engine import CustomQueryEngine
+
+from semantic_cache import SemanticCache, SemanticCacheQueryEngine
+
+QUERY_LATENCY = 0.05
+EMBED_DIM = 256
+
+TRANSCRIPT = [
+    "which meme coin i can buy tht is bullish in last 24hrs",
+    "which meme coin is bullish in the last 24hrs",
+    "what is the sentiment on PEPE right now",
+    "which meme coin is bullish",
+    "bullish meme coin in last 24hrs which one",
+    "is BONK pumping today",
+    "what is the sentiment on pepe right now?",
+    "which meme coins are degens aping into",
+    "is bonk pumping today",
+    "which meme coin i can buy that is bullish in last 24hrs",
+    "what are degens aping into, which meme coins",
+    "any rug pulls trending on telegram",
+] * 5
+
+
+class BagOfWordsEmbedding(BaseEmbedding):
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * EMBED_DIM
+        for word in re.findall(r"[a-z0-9]+", text.lower()):
+            digest = hashlib.md5(word.encode("utf-8")).digest()
+            vector[int.from_bytes(digest[:4], "little") % EMBED_DIM] += 1.0
+        return vector
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._embed(query)
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return self._embed(query)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+class SlowQueryEngine(CustomQueryEngine):
+    def custom_query(self, query_str: str) -> str:
+        time.sleep(QUERY_LATENCY)
+        return f"answer to: {query_str}"
+
+
+def replay(engine):
+    latencies = []
+    for query in TRANSCRIPT:
+        start = time.perf_counter()
+        engine.query(query)
+        latencies.append(time.perf_counter() - start)
+    return sum(latencies)
+
+
+def main():
+    embed_model = BagOfWordsEmbedding()
+    uncached = replay(SlowQueryEngine())
+    print(f"{len(TRANSCRIPT)} queries, uncached: {uncached:.2f}s")
+    for threshold in (0.99, 0.9, 0.8):
+        cache = SemanticCache(similarity_threshold=threshold, ttl=300)
+        engine = SemanticCacheQueryEngine(
+            query_engine=SlowQueryEngine(), embed_model=embed_model, cache=cache
+        )
+        elapsed = replay(engine)
+        stats = cache.stats()
+        print(
+            f"threshold {threshold}: {elapsed:.2f}s, hit rate {stats['hit_rate']:.0%}, "
+            f"saved {stats['seconds_saved']:.2f}s ({1 - elapsed / uncached:.0%})"
+        )
+
+
+if __name__ == "__main__":
+    main()
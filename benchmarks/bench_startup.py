@@ -0,0 +1,119 @@
+"""
+Startup time of the agents: import time and time to the first tool reply.
+
+Each measurement runs in a fresh interpreter so imports are cold. The child
+imports agents, then answers one question through the degen trader query
+engine tool, which builds the index, retriever, reranker and engine on demand.
+"eager" adds that build to the import, which is what startup cost before the
+components became lazy.
+
+Without --live, Qdrant runs in memory, embeddings and the LLM are mocked and
+the Cohere reranker is replaced by a pass-through, so only local work is timed.
+
+    python benchmarks/bench_startup.py [--live]
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+RUNS = 3
+QUESTION = "which meme coin is bullish in the last 24hrs"
+
+
+def use_offline_components():
+    from llama_index.core import Settings
+    from llama_index.core.embeddings import MockEmbedding
+    from llama_index.core.llms import MockLLM
+    from llama_index.core.postprocessor import SimilarityPostprocessor
+    from qdrant_client import QdrantClient
+
+    import degen_trader_agent
+    from components import registry
+
+    def offline_degen_trader():
+        degen_trader = degen_trader_agent.DegenTraderQueryEngine()
+        degen_trader.qdrant_client = QdrantClient(location=":memory:")
+        degen_trader.embed_model = MockEmbedding(embed_dim=1536)
+        return degen_trader
+
+    Settings.llm = MockLLM(max_tokens=64)
+    Settings.embed_model = MockEmbedding(embed_dim=1536)
+    registry.register("degen_trader", offline_degen_trader)
+    registry.register(
+        "reranker", lambda: SimilarityPostprocessor(similarity_cutoff=0.0)
+    )
+
+
+def child(live):
+    os.chdir(ROOT)
+    start = time.perf_counter()
+    import agents
+
+    import_seconds = time.perf_counter() - start
+    if not live:
+        use_offline_components()
+    start = time.perf_counter()
+    agents.degen_trader_query_engine_tool.call(QUESTION)
+    first_reply_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    agents.degen_trader_query_engine_tool.call(QUESTION + " today")
+    warm_reply_seconds = time.perf_counter() - start
+    print(
+        json.dumps(
+            {
+                "import": import_seconds,
+                "first_reply": first_reply_seconds,
+                "warm_reply": warm_reply_seconds,
+            }
+        )
+    )
+
+
+def main():
+    live = "--live" in sys.argv
+    env = dict(os.environ)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        if not live:
+            env.setdefault("OPENAI_API_KEY", "sk-offline")
+            env.setdefault("COHERE_API_KEY", "offline")
+        for run in range(RUNS):
+            if not live:
+                # A fresh store per run, so every first reply ingests Data/.
+                storage = os.path.join(tmp, str(run))
+                env["INGESTION_STORAGE_DIR"] = storage
+                env["BM25_INDEX_DIR"] = os.path.join(storage, "bm25")
+                env["EMBEDDING_CACHE_PATH"] = os.path.join(storage, "embeddings.db")
+            output = subprocess.run(
+                [sys.executable, "-W", "ignore", __file__, "--child"]
+                + (["--live"] if live else []),
+                env=env,
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout
+            results.append(json.loads(output.strip().splitlines()[-1]))
+
+    def avg(key):
+        return sum(r[key] for r in results) / len(results)
+
+    print(f"{'live' if live else 'offline'} services, average of {RUNS} cold starts")
+    print(f"  import agents (lazy):      {avg('import'):6.2f}s")
+    print(f"  first reply (builds index): {avg('first_reply'):6.2f}s")
+    # Offline, mocked embeddings make the second question a semantic cache hit.
+    print(f"  second reply:              {avg('warm_reply'):6.2f}s")
+    print(f"  eager import (before):     {avg('import') + avg('first_reply'):6.2f}s")
+
+
+if __name__ == "__main__":
+    if "--child" in sys.argv:
+        child("--live" in sys.argv)
+    else:
+        main()
@@ -0,0 +1,185 @@
+"""
+Time to first visible token of a Discord reply, sent when the agent is done
+versus streamed into an edited placeholder.
+
+Runs offline. A scripted LLM plays one ReAct turn at a realistic pace: it
+thinks for a while, calls a stub market data tool, then streams a final
+answer long enough to need two Discord messages. A fake channel adds a
+round-trip to every send and edit and records the edit rate.
+
+    python benchmarks/bench_streaming.py
+"""
+
+import asyncio
+import os
+import sys
+import time
+from typing import Any
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llama_index.core.agent import ReActAgent
+from llama_index.core.llms import (
+    CompletionResponse,
+    CompletionResponseGen,
+    CustomLLM,
+    LLMMetadata,
+)
+from llama_index.core.llms.callbacks import llm_completion_callback
+from llama_index.core.tools import FunctionTool
+
+from agent_pool import AgentPool
+from discord_stream import DISCORD_MESSAGE_LIMIT, DiscordStreamer
+
+# Seconds the LLM takes to decide on a tool call, and per streamed token.
+THINK_SECONDS = 1.5
+TOKEN_SECONDS = 0.004
+TOOL_SECONDS = 0.5
+# Round-trip of a Discord API call.
+DISCORD_LATENCY = 0.08
+
+ACTION = (
+    "Thought: I need current market data to answer.\n"
+    "Action: fetch_market_data\n"
+    'Action Input: {"coin_ids": "pepe,bonk"}\n'
+)
+ANSWER_LINE = (
+    "PEPE is up 12% on the day with volume climbing, BONK is flat, and the "
+    "funding rates say the degens are leaning long again. "
+)
+ANSWER = "".join(f"{ANSWER_LINE}({i})\n" for i in range(16))
+
+
+OBSERVATION = '[{"id": "pepe", "price_change_percentage_24h": 12.1}]'
+
+
+def fetch_market_data(coin_ids: str) -> str:
+    """Fetch market data for comma-separated CoinGecko ids."""
+    time.sleep(TOOL_SECONDS)
+    return OBSERVATION
+
+
+class ScriptedLLM(CustomLLM):
+    """Calls the tool on the first step and streams ANSWER once it has observed it."""
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return LLMMetadata(model_name="scripted")
+
+    def _script(self, prompt: str) -> str:
+        if OBSERVATION in prompt:
+            return (
+                "Thought: I can answer without using any more tools.\nAnswer: " + ANSWER
+            )
+        return ACTION
+
+    @llm_completion_callback()
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any):
+        text = self._script(prompt)
+        time.sleep(
+            THINK_SECONDS if text == ACTION else len(text.split()) * TOKEN_SECONDS
+        )
+        return CompletionResponse(text=text)
+
+    @llm_completion_callback()
+    def stream_complete(
+        self, prompt: str, formatted: bool = False, **kwargs: Any
+    ) -> CompletionResponseGen:
+        text = self._script(prompt)
+        if text == ACTION:
+            time.sleep(THINK_SECONDS)
+        so_far = ""
+        for word in text.split(" "):
+            time.sleep(TOKEN_SECONDS)
+            delta = word if not so_far else " " + word
+            so_far += delta
+            yield CompletionResponse(text=so_far, delta=delta)
+
+
+class FakeMessage:
+    def __init__(self, channel, content):
+        self.channel = channel
+        self.content = content
+
+    async def edit(self, content):
+        await asyncio.sleep(DISCORD_LATENCY)
+        self.channel.edits.append(time.monotonic())
+        self.content = content
+
+    async def delete(self):
+        self.channel.messages.remove(self)
+
+
+class FakeChannel:
+    def __init__(self):
+        self.messages = []
+        self.edits = []
+
+    async def send(self, content):
+        await asyncio.sleep(DISCORD_LATENCY)
+        message = FakeMessage(self, content)
+        self.messages.append(message)
+        return message
+
+    def max_edits_per(self, window):
+        return max(
+            (sum(1 for t in self.edits if s <= t < s + window) for s in self.edits),
+            default=0,
+        )
+
+
+def build_agent(key):
+    return ReActAgent.from_tools(
+        tools=[FunctionTool.from_defaults(fn=fetch_market_data)], llm=ScriptedLLM()
+    )
+
+
+async def blocking_turn(pool, channel, streamer):
+    start = time.monotonic()
+    response = await pool.achat("blocking", "how are PEPE and BONK doing")
+    await streamer.send(channel, response.response)
+    return time.monotonic() - start, response.response
+
+
+async def streamed_turn(pool, channel, streamer):
+    start = time.monotonic()
+    text = await streamer.stream(
+        channel, pool.astream_chat("streamed", "how are PEPE and BONK doing"), start
+    )
+    return time.monotonic() - start, text
+
+
+async def run():
+    pool = AgentPool(build_agent)
+    pool.get("blocking"), pool.get("streamed")
+
+    channel, streamer = FakeChannel(), DiscordStreamer()
+    seconds, text = await blocking_turn(pool, channel, streamer)
+    print(
+        f"send when done:  first visible {seconds:5.2f}s  complete {seconds:5.2f}s  "
+        f"{len(channel.messages)} messages for {len(text)} characters"
+    )
+
+    channel, streamer = FakeChannel(), DiscordStreamer()
+    seconds, text = await streamed_turn(pool, channel, streamer)
+    metrics = streamer.metrics()
+    assert "\n".join(m.content for m in channel.messages) == text
+    assert all(len(m.content) <= DISCORD_MESSAGE_LIMIT for m in channel.messages)
+    print(
+        f"streamed:        first visible {metrics['first_token_avg_s']:5.2f}s  "
+        f"complete {seconds:5.2f}s  {len(channel.messages)} messages for "
+        f"{len(text)} characters"
+    )
+    print(
+        f"  placeholder after {metrics['placeholder_avg_s']:.2f}s, "
+        f"{metrics['edits']} edits, at most {channel.max_edits_per(5.0)} "
+        f"in any 5 s (edit interval {streamer.edit_interval}s)"
+    )
+
+
+def main():
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+Wall-clock time of multi-part questions through the sub-question query
+engine, answering sub-questions one after another (SubQuestionQueryEngine with
+use_async=False) and concurrently with ParallelSubQuestionQueryEngine over
+SharedRetrievers.
+
+Runs offline. The degen trader tool retrieves conversation windows of Data/
+from a BM25 index, the news tool a handful of headlines; each lookup sleeps
+RETRIEVAL_SECONDS to stand in for the query embedding and Qdrant round-trip.
+A sleeping LLM stands in for OpenAI in every synthesis, and a scripted
+question generator returns fixed sub-questions after one LLM call, including
+sub-questions repeated within and across questions.
+
+    python benchmarks/bench_sub_questions.py
+"""
+
+import os
+import sys
+import threading
+import time
+from typing import Any, List, Sequence
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llama_index.core import get_response_synthesizer
+from llama_index.core.base.base_retriever import BaseRetriever
+from llama_index.core.llms import CompletionResponse, CustomLLM, LLMMetadata
+from llama_index.core.llms.callbacks import llm_completion_callback
+from llama_index.core.query_engine import RetrieverQueryEngine, SubQuestionQueryEngine
+from llama_index.core.question_gen.types import BaseQuestionGenerator, SubQuestion
+from llama_index.core.schema import QueryBundle, TextNode
+from llama_index.core.tools import QueryEngineTool, ToolMetadata
+
+from bm25_index import BM25Index, BM25IndexRetriever
+from chat_node_parser import ConversationWindowNodeParser
+from discord_loader import DiscordChatReader
+from eval_chunking import DATA_DIR
+from sub_question import ParallelSubQuestionQueryEngine, SharedRetriever
+
+# Seconds per LLM call and per retrieval.
+LLM_SECONDS = 0.5
+RETRIEVAL_SECONDS = 0.15
+TOP_K = 4
+
+HEADLINES = [
+    "PEPE open interest hits a record as memecoin traders pile in",
+    "BONK burns 1 trillion tokens after community vote",
+    "dogwifhat WIF listed on a major exchange, price jumps",
+    "Whale wallets accumulate PEPE and WIF ahead of the weekend",
+    "Dogecoin DOGE slides as Elon Musk stays quiet",
+    "Memecoin season: Solana meme tokens lead daily gainers",
+    "Analysts warn of rug pulls in new Solana meme launches",
+    "Bitcoin ETF inflows lift the whole market, memes follow",
+]
+
+DEGEN, NEWS = "degen_trader_query_engine", "crypto_news"
+SUB_QUESTIONS = {
+    "compare pepe and bonk, sentiment and news": [
+        (DEGEN, "What is the sentiment on PEPE?"),
+        (DEGEN, "What is the sentiment on BONK?"),
+        (NEWS, "Latest news on PEPE"),
+        (NEWS, "Latest news on BONK"),
+    ],
+    "is wif or pepe the better flip right now": [
+        (DEGEN, "What is the sentiment on WIF?"),
+        (DEGEN, "What is the sentiment on pepe"),
+        (DEGEN, "What are traders saying about flipping WIF vs PEPE?"),
+    ],
+    "what's moving in memes today and what are whales doing": [
+        (DEGEN, "Which meme coins are trending today?"),
+        (DEGEN, "What are whales buying?"),
+        (NEWS, "Meme coin news today"),
+        (NEWS, "Whale wallet news"),
+    ],
+    "bull and bear case for doge": [
+        (DEGEN, "What is the bull case for DOGE?"),
+        (DEGEN, "What is the bear case for DOGE?"),
+        (DEGEN, "What is the sentiment on DOGE?"),
+        (DEGEN, "what is the sentiment on doge"),
+        (NEWS, "Latest news on DOGE"),
+    ],
+}
+
+
+class SleepingLLM(CustomLLM):
+    """Answers every prompt after LLM_SECONDS, counting calls."""
+
+    calls: int = 0
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return LLMMetadata(model_name="sleeping")
+
+    @llm_completion_callback()
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any):
+        self.calls += 1
+        time.sleep(LLM_SECONDS)
+        return CompletionResponse(text="PEPE and WIF look strong, BONK is cooling.")
+
+    @llm_completion_callback()
+    def stream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any):
+        raise NotImplementedError
+
+
+class ScriptedQuestionGenerator(BaseQuestionGenerator):
+    """Returns SUB_QUESTIONS for the question after one LLM call."""
+
+    def __init__(self, llm: SleepingLLM):
+        self.llm = llm
+
+    def _get_prompts(self):
+        return {}
+
+    def _update_prompts(self, prompts) -> None:
+        pass
+
+    def generate(
+        self, tools: Sequence[ToolMetadata], query: QueryBundle
+    ) -> List[SubQuestion]:
+        self.llm.complete(query.query_str)
+        return [
+            SubQuestion(sub_question=question, tool_name=tool)
+            for tool, question in SUB_QUESTIONS[query.query_str]
+        ]
+
+    async def agenerate(self, tools, query):
+        return self.generate(tools, query)
+
+
+class SlowRetriever(BaseRetriever):
+    """A retriever taking RETRIEVAL_SECONDS longer, counting lookups."""
+
+    def __init__(self, retriever: BaseRetriever):
+        self.retriever = retriever
+        self.lookups = 0
+        self._lock = threading.Lock()
+        super().__init__()
+
+    def _retrieve(self, query_bundle: QueryBundle):
+        with self._lock:
+            self.lookups += 1
+        time.sleep(RETRIEVAL_SECONDS)
+        return self.retriever.retrieve(query_bundle)
+
+
+def build(engine_cls, indexes, shared, **kwargs):
+    llm = SleepingLLM()
+    retrievers = {
+        name: SlowRetriever(BM25IndexRetriever(index, similarity_top_k=TOP_K))
+        for name, index in indexes.items()
+    }
+    tools = [
+        QueryEngineTool(
+            query_engine=RetrieverQueryEngine.from_args(
+                SharedRetriever(retriever) if shared else retriever, llm=llm
+            ),
+            metadata=ToolMetadata(name=name, description=name),
+        )
+        for name, retriever in retrievers.items()
+    ]
+    engine = engine_cls(
+        ScriptedQuestionGenerator(llm),
+        get_response_synthesizer(llm=llm),
+        tools,
+        verbose=False,
+        **kwargs,
+    )
+    return engine, llm, retrievers
+
+
+def run(label, engine, llm, retrievers):
+    seconds, sources = [], 0
+    for question in SUB_QUESTIONS:
+        start = time.perf_counter()
+        response = engine.query(question)
+        seconds.append(time.perf_counter() - start)
+        sources += len(response.source_nodes)
+    lookups = sum(r.lookups for r in retrievers.values())
+    print(
+        f"{label:<24} "
+        + "  ".join(f"{s:5.2f}s" for s in seconds)
+        + f"  | total {sum(seconds):5.2f}s  LLM calls {llm.calls:2d}  "
+        f"retrievals {lookups:2d}  source nodes {sources:3d}"
+    )
+    return sum(seconds)
+
+
+def main():
+    documents = DiscordChatReader(mode="transcript").load_data(DATA_DIR)
+    nodes = ConversationWindowNodeParser().get_nodes_from_documents(documents)
+    degen_index, news_index = BM25Index(":memory:"), BM25Index(":memory:")
+    degen_index.add(nodes)
+    news_index.add([TextNode(text=headline) for headline in HEADLINES])
+    indexes = {DEGEN: degen_index, NEWS: news_index}
+
+    sub_questions = sum(len(subs) for subs in SUB_QUESTIONS.values())
+    print(
+        f"{len(SUB_QUESTIONS)} questions, {sub_questions} sub-questions; "
+        f"LLM {LLM_SECONDS}s per call, retrieval {RETRIEVAL_SECONDS}s; "
+        f"{len(nodes)} conversation windows, {len(HEADLINES)} headlines"
+    )
+    print(f"{'':<24} " + "  ".join(f"    Q{i + 1}" for i in range(len(SUB_QUESTIONS))))
+    sequential = run(
+        "sequential", *build(SubQuestionQueryEngine, indexes, False, use_async=False)
+    )
+    for concurrency in (2, 4):
+        engine, llm, retrievers = build(ParallelSubQuestionQueryEngine, indexes, True)
+        engine.max_concurrency = concurrency
+        total = run(f"parallel, {concurrency} at a time", engine, llm, retrievers)
+        shared = [engine._query_engines[name].retriever for name in indexes]
+        print(
+            f"{'':<24} {sequential / total:.1f}x faster; shared retrievals: "
+            f"{sum(s.hits for s in shared)} reused, "
+            f"{sum(s.joined for s in shared)} joined in flight"
+        )
+
+    degen_index.close()
+    news_index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Offline evaluation of chunking strategies for the chat exports.
+
+Builds an in-memory index of Data/ per strategy with a hashed bag-of-words
+embedding, then runs a labeled query set. A query is a hit when one of its
+labeled messages appears in the top-k retrieved chunks. Lexical embeddings are
+a stand-in for ada-002; they rank strategies, not absolute recall.
+
+    python benchmarks/eval_chunking.py
+"""
+
+import glob
+import hashlib
+import os
+import re
+import sys
+from typing import List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from llama_index.core import SimpleDirectoryReader, VectorStoreIndex
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.node_parser import SentenceSplitter
+
+from chat_node_parser import ConversationWindowNodeParser
+from discord_loader import DiscordChatReader, parse_discord_rows
+
+DATA_DIR = os.path.join(ROOT, "Data")
+EMBED_DIM = 1024
+SIMILARITY_TOP_K = 8
+
+# Questions paired with the message ids that answer them. Most answers are
+# replies, so they only help when kept next to the message they answer.
+LABELED_QUERIES = [
+    ("No buy going through on clout, is there a trick?", ["1332244987550629921"]),
+    (
+        "how is 4a7L9jwWtE8LiNhqrDnFPUNUgi4oDi8opuxn3yPopump sending",
+        ["1332244441557237793"],
+    ),
+    ("any opinion on UFD and MLG, both lagging", ["1332291228095484000"]),
+    ("haven't slept in 30 hrs, greatest opportunity ever", ["1332271868383854673"]),
+    ("Safe meta has begun, which coin", ["1332274449013145632"]),
+    ("you still in? wanted to exit", ["1332224904614908006"]),
+    (
+        "4aakZ3Yq11uRoAtCavzCpbbYd812q7wTuPmdEwvvdCCn is this real andy",
+        ["1332283281445748749"],
+    ),
+    (
+        "HUQVsp1nCf7uLSunuf4PBnJ2kHz5HKfA5di2J1iHpump thread on PF hella active",
+        ["1332240124167196765"],
+    ),
+    ("pasternak holders increasing", ["1332235728180088885"]),
+    ("if you dont sleep your brain wont function", ["1332272213155516548"]),
+]
+
+
+class BagOfWordsEmbedding(BaseEmbedding):
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * EMBED_DIM
+        for word in re.findall(r"[a-z0-9]+", text.lower()):
+            digest = hashlib.md5(word.encode("utf-8")).digest()
+            vector[int.from_bytes(digest[:4], "little") % EMBED_DIM] += 1.0
+        return vector
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._embed(query)
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return self._embed(query)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+def message_contents():
+    return {
+        m["message_id"]: m["content"]
+        for path in sorted(glob.glob(os.path.join(DATA_DIR, "*.csv")))
+        for m in parse_discord_rows(path)
+    }
+
+
+def strategies():
+    sentence_splitter = SentenceSplitter(chunk_size=512, chunk_overlap=20)
+    yield "raw csv + sentence", lambda: sentence_splitter.get_nodes_from_documents(
+        SimpleDirectoryReader(DATA_DIR, recursive=True).load_data()
+    )
+    yield "messages + sentence", lambda: sentence_splitter.get_nodes_from_documents(
+        DiscordChatReader(mode="message").load_data(DATA_DIR)
+    )
+    yield "windows + sentence", lambda: sentence_splitter.get_nodes_from_documents(
+        DiscordChatReader(mode="window").load_data(DATA_DIR)
+    )
+    yield "conversation windows", lambda: (
+        ConversationWindowNodeParser().get_nodes_from_documents(
+            DiscordChatReader(mode="transcript").load_data(DATA_DIR)
+        )
+    )
+
+
+def main():
+    contents = message_contents()
+    embed_model = BagOfWordsEmbedding()
+    print(f"{len(LABELED_QUERIES)} labeled queries, top_k={SIMILARITY_TOP_K}")
+    for label, build_nodes in strategies():
+        nodes = build_nodes()
+        retriever = VectorStoreIndex(nodes, embed_model=embed_model).as_retriever(
+            similarity_top_k=SIMILARITY_TOP_K
+        )
+        hits = 0
+        for query, answer_ids in LABELED_QUERIES:
+            texts = [n.node.get_content() for n in retriever.retrieve(query)]
+            if any(contents[a][:60] in text for a in answer_ids for text in texts):
+                hits += 1
+        print(
+            f"{label:>22}: {len(nodes):5d} chunks  "
+            f"hit rate {hits / len(LABELED_QUERIES):.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Load test the QA bot's message path against a fake Discord gateway.
+
+50 users post at the same time while a heartbeat task ticks on the event loop.
+The fake agent blocks its thread like the real OpenAI/Qdrant/Cohere round-trips
+do. The old path calls the agent directly on the loop; the new path goes through
+AgentPool.achat.
+
+    python benchmarks/load_test_gateway.py
+"""
+
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent_pool import AgentPool
+
+USERS = 50
+MESSAGES_PER_USER = 3
+AGENT_LATENCY = (0.02, 0.08)
+HEARTBEAT_INTERVAL = 0.05
+
+
+class FakeResponse:
+    def __init__(self, response: str):
+        self.response = response
+
+
+class FakeAgent:
+    def chat(self, message: str) -> FakeResponse:
+        time.sleep(random.uniform(*AGENT_LATENCY))
+        return FakeResponse(f"echo: {message}")
+
+
+class FakeGateway:
+    """Dispatches each message as its own task, the way discord.py does."""
+
+    def __init__(self, on_message):
+        self.on_message = on_message
+        self.latencies = []
+
+    async def user(self, username: str):
+        tasks = []
+        for i in range(MESSAGES_PER_USER):
+            await asyncio.sleep(random.uniform(0, 0.05))
+            sent_at = time.perf_counter()
+            tasks.append(
+                asyncio.create_task(self.deliver(username, f"msg {i}", sent_at))
+            )
+        await asyncio.gather(*tasks)
+
+    async def deliver(self, username: str, content: str, sent_at: float):
+        await self.on_message(username, content)
+        self.latencies.append(time.perf_counter() - sent_at)
+
+
+async def heartbeat(lags, stop):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+        lags.append(time.perf_counter() - start - HEARTBEAT_INTERVAL)
+
+
+async def run(mode: str):
+    pool = AgentPool(lambda username: FakeAgent())
+
+    async def on_message(username, content):
+        if mode == "blocking":
+            pool.chat(username, content)
+        else:
+            await pool.achat(username, content)
+
+    gateway = FakeGateway(on_message)
+    lags, stop = [], asyncio.Event()
+    beat = asyncio.create_task(heartbeat(lags, stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(gateway.user(f"user{i}") for i in range(USERS)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await beat
+    return gateway.latencies, lags, elapsed
+
+
+def report(mode, latencies, lags, elapsed):
+    cuts = statistics.quantiles(latencies, n=100)
+    print(
+        f"{mode:>9}: p50 {cuts[49] * 1000:7.1f} ms  p99 {cuts[98] * 1000:7.1f} ms  "
+        f"max heartbeat lag {max(lags, default=0) * 1000:7.1f} ms  "
+        f"wall {elapsed:.2f} s"
+    )
+
+
+def main():
+    print(f"{USERS} users x {MESSAGES_PER_USER} messages")
+    for mode in ("blocking", "executor"):
+        report(mode, *asyncio.run(run(mode)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Soak test the chat stores by replaying the Data/ chat exports.
+
+Every exported message is stored as a user turn plus an assistant reply under
+its author's key, several passes over. Traced memory is sampled at the end of
+every pass and must stay flat over the second half of the run, once the ring
+buffers and the LRU of users have filled up. The SQLite store is then reopened to check the conversations
+survived.
+
+    python benchmarks/soak_memory_store.py
+"""
+
+import csv
+import glob
+import os
+import sys
+import tempfile
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from llama_index.core.llms import ChatMessage
+
+from memory_store import BoundedChatStore, SQLiteChatStore
+
+PASSES = 8
+MAX_MESSAGES = 20
+MAX_KEYS = 32
+# Allowed growth between the middle and the end of the run.
+MAX_GROWTH = 0.10
+
+
+def replay_messages():
+    for path in sorted(glob.glob(os.path.join(ROOT, "Data", "*.csv"))):
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                if row["content"]:
+                    yield row["author.username"], row["content"]
+
+
+def soak(store):
+    samples = []
+    count = 0
+    tracemalloc.start()
+    for _ in range(PASSES):
+        for username, content in replay_messages():
+            store.add_message(username, ChatMessage(role="user", content=content))
+            store.add_message(
+                username, ChatMessage(role="assistant", content=content[::-1])
+            )
+            store.get_messages(username)
+            count += 1
+        samples.append(tracemalloc.get_traced_memory()[0])
+    tracemalloc.stop()
+    assert len(store._buffers) <= MAX_KEYS
+    assert all(len(buffer) <= MAX_MESSAGES for buffer in store._buffers.values())
+    return count, samples
+
+
+def report(name, count, samples):
+    # The first half fills the buffers; the second half must not add to it.
+    steady = samples[len(samples) // 2 - 1 :]
+    growth = (steady[-1] - steady[0]) / steady[0]
+    per_pass = ", ".join(f"{sample / 1024:.0f}" for sample in samples)
+    print(
+        f"{name:>8}: {count} turns, traced KiB per pass [{per_pass}] "
+        f"({growth * 100:+.1f}%)"
+    )
+    assert growth < MAX_GROWTH, f"{name} store memory grew by {growth * 100:.1f}%"
+
+
+def main():
+    store = BoundedChatStore(max_messages=MAX_MESSAGES, max_keys=MAX_KEYS)
+    report("memory", *soak(store))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "chat_store.db")
+        store = SQLiteChatStore(
+            db_path=db_path, max_messages=MAX_MESSAGES, max_keys=MAX_KEYS
+        )
+        report("sqlite", *soak(store))
+        keys = store.get_keys()
+        before = {key: store.get_messages(key) for key in keys}
+        store.close()
+
+        reopened = SQLiteChatStore(db_path=db_path, max_messages=MAX_MESSAGES)
+        assert all(reopened.get_messages(key) == before[key] for key in keys)
+        assert all(len(messages) <= MAX_MESSAGES for messages in before.values())
+        print(f"  sqlite: {len(keys)} conversations restored after reopen")
+        reopened.close()
+
+
+if __name__ == "__main__":
+    main()
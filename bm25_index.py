@@ -0,0 +1,206 @@
+import heapq
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Sequence
+
+from bm25s.stopwords import STOPWORDS_EN
+from decouple import config
+from llama_index.core.base.base_retriever import BaseRetriever
+from llama_index.core.schema import BaseNode, MetadataMode, NodeWithScore, QueryBundle
+from llama_index.core.vector_stores.utils import (
+    metadata_dict_to_node,
+    node_to_metadata_dict,
+)
+
+BM25_INDEX_DIR = config("BM25_INDEX_DIR", default=os.path.join("storage", "bm25"))
+BM25_K1 = config("BM25_K1", default=1.5, cast=float)
+BM25_B = config("BM25_B", default=0.75, cast=float)
+
+_STOPWORDS = frozenset(STOPWORDS_EN)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords; tickers and addresses stay whole."""
+    return [t for t in re.findall(r"[a-z0-9]+", text.lower()) if t not in _STOPWORDS]
+
+
+class BM25Index:
+    """
+    Okapi BM25 keyword index persisted in SQLite and updated node by node.
+    Postings and document lengths are kept in memory for scoring; node contents
+    stay on disk and are read only for the returned top-k.
+    :param path: Path of the SQLite database.
+    :param k1: Term frequency saturation.
+    :param b: Document length normalization.
+    """
+
+    def __init__(self, path: str, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS nodes (
+                node_id TEXT PRIMARY KEY,
+                length INTEGER NOT NULL,
+                node TEXT NOT NULL
+            )
+            """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS postings (
+                term TEXT NOT NULL,
+                node_id TEXT NOT NULL,
+                tf INTEGER NOT NULL,
+                PRIMARY KEY (term, node_id)
+            )
+            """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS postings_node_id ON postings (node_id)"
+        )
+        self._conn.commit()
+
+        self._postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self._lengths: Dict[str, int] = dict(
+            self._conn.execute("SELECT node_id, length FROM nodes")
+        )
+        for term, node_id, tf in self._conn.execute(
+            "SELECT term, node_id, tf FROM postings"
+        ):
+            self._postings[term][node_id] = tf
+        self._total_length = sum(self._lengths.values())
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def __contains__(self, node_id: str) -> bool:
+        return node_id in self._lengths
+
+    def add(self, nodes: Sequence[BaseNode]) -> None:
+        """Index nodes, replacing any already indexed under the same id."""
+        with self._lock:
+            self.delete([n.node_id for n in nodes if n.node_id in self._lengths])
+            node_rows = []
+            posting_rows = []
+            for node in nodes:
+                terms = Counter(
+                    tokenize(node.get_content(metadata_mode=MetadataMode.EMBED))
+                )
+                length = sum(terms.values())
+                record = node_to_metadata_dict(node, remove_text=False)
+                node_rows.append((node.node_id, length, json.dumps(record)))
+                for term, tf in terms.items():
+                    posting_rows.append((term, node.node_id, tf))
+                    self._postings[term][node.node_id] = tf
+                self._lengths[node.node_id] = length
+                self._total_length += length
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT INTO nodes (node_id, length, node) VALUES (?, ?, ?)",
+                    node_rows,
+                )
+                self._conn.executemany(
+                    "INSERT INTO postings (term, node_id, tf) VALUES (?, ?, ?)",
+                    posting_rows,
+                )
+
+    def delete(self, node_ids: Sequence[str]) -> None:
+        """Remove nodes from the index; unknown ids are ignored."""
+        with self._lock:
+            node_ids = [i for i in node_ids if i in self._lengths]
+            if not node_ids:
+                return
+            removed = set(node_ids)
+            for term, node_id in self._conn.execute(
+                f"SELECT term, node_id FROM postings WHERE node_id IN "
+                f"({','.join('?' * len(node_ids))})",
+                node_ids,
+            ).fetchall():
+                postings = self._postings.get(term)
+                if postings is not None:
+                    postings.pop(node_id, None)
+                    if not postings:
+                        del self._postings[term]
+            for node_id in removed:
+                self._total_length -= self._lengths.pop(node_id)
+            with self._conn:
+                self._conn.executemany(
+                    "DELETE FROM postings WHERE node_id = ?", [(i,) for i in removed]
+                )
+                self._conn.executemany(
+                    "DELETE FROM nodes WHERE node_id = ?", [(i,) for i in removed]
+                )
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM postings")
+            self._conn.execute("DELETE FROM nodes")
+            self._postings.clear()
+            self._lengths.clear()
+            self._total_length = 0
+
+    def _scores(self, query: str) -> Dict[str, float]:
+        n = len(self._lengths)
+        if not n:
+            return {}
+        avg_length = self._total_length / n
+        scores: Dict[str, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for node_id, tf in postings.items():
+                norm = self.k1 * (
+                    1 - self.b + self.b * self._lengths[node_id] / avg_length
+                )
+                scores[node_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return scores
+
+    def search(self, query: str, top_k: int) -> List[NodeWithScore]:
+        """Return the top_k nodes for a query, best first."""
+        with self._lock:
+            scores = self._scores(query)
+            top = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+            if not top:
+                return []
+            rows = dict(
+                self._conn.execute(
+                    f"SELECT node_id, node FROM nodes WHERE node_id IN "
+                    f"({','.join('?' * len(top))})",
+                    [node_id for node_id, _ in top],
+                ).fetchall()
+            )
+        return [
+            NodeWithScore(
+                node=metadata_dict_to_node(json.loads(rows[node_id])), score=score
+            )
+            for node_id, score in top
+        ]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class BM25IndexRetriever(BaseRetriever):
+    """
+    Retriever over a BM25Index.
+    :param index: The keyword index to search.
+    :param similarity_top_k: Number of nodes returned per query.
+    """
+
+    def __init__(self, index: BM25Index, similarity_top_k: int = 8, **kwargs: Any):
+        self.index = index
+        self.similarity_top_k = similarity_top_k
+        super().__init__(**kwargs)
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        return self.index.search(query_bundle.query_str, self.similarity_top_k)
@@ -0,0 +1,124 @@
+import json
+from datetime import timedelta
+from typing import Any, Dict, List, Sequence
+
+from decouple import config
+from llama_index.core.node_parser import NodeParser
+from llama_index.core.schema import BaseNode, NodeRelationship, TextNode
+from llama_index.core.utils import get_tqdm_iterable
+from pydantic import Field, model_validator
+
+from discord_loader import format_message, parse_timestamp
+
+# "conversation" groups chat messages into conversation windows,
+# "sentence" splits loaded documents with a SentenceSplitter.
+CHUNKING_STRATEGY = config("CHUNKING_STRATEGY", default="conversation")
+CHAT_WINDOW_MAX_MESSAGES = config("CHAT_WINDOW_MAX_MESSAGES", default=20, cast=int)
+CHAT_WINDOW_GAP_MINUTES = config("CHAT_WINDOW_GAP_MINUTES", default=30, cast=float)
+CHAT_WINDOW_OVERLAP = config("CHAT_WINDOW_OVERLAP", default=3, cast=int)
+
+
+class ConversationWindowNodeParser(NodeParser):
+    """
+    Groups chat messages into time- and reply-based conversation windows.
+    Takes the "transcript" Documents of DiscordChatReader. A window closes after
+    max_messages messages or a silence longer than max_gap_minutes; windows
+    closed for size share their last overlap messages with the next one. A reply
+    whose target sits in an earlier window gets the target quoted above it, so
+    replies are never separated from the messages they answer.
+    """
+
+    max_messages: int = Field(
+        default=CHAT_WINDOW_MAX_MESSAGES, description="Maximum messages per window."
+    )
+    max_gap_minutes: float = Field(
+        default=CHAT_WINDOW_GAP_MINUTES,
+        description="Silence in minutes that closes the current window.",
+    )
+    overlap: int = Field(
+        default=CHAT_WINDOW_OVERLAP,
+        description="Messages repeated at the start of the next window.",
+    )
+    max_reply_context: int = Field(
+        default=3, description="Maximum quoted reply targets per window."
+    )
+
+    @model_validator(mode="after")
+    def _check_overlap(self) -> "ConversationWindowNodeParser":
+        if self.overlap >= self.max_messages:
+            raise ValueError("overlap must be smaller than max_messages")
+        return self
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "ConversationWindowNodeParser"
+
+    def _windows(self, messages: List[Dict]) -> List[List[Dict]]:
+        max_gap = timedelta(minutes=self.max_gap_minutes)
+        windows = []
+        window: List[Dict] = []
+        last_time = None
+        for message in messages:
+            current_time = parse_timestamp(message["timestamp"])
+            gap = (
+                current_time is not None
+                and last_time is not None
+                and current_time - last_time > max_gap
+            )
+            if window and (gap or len(window) >= self.max_messages):
+                windows.append(window)
+                window = window[-self.overlap :] if self.overlap and not gap else []
+            window.append(message)
+            last_time = current_time or last_time
+        if window:
+            windows.append(window)
+        return windows
+
+    def _window_node(
+        self, window: List[Dict], by_id: Dict[str, Dict], document: BaseNode
+    ) -> TextNode:
+        ids = {m["message_id"] for m in window}
+        context = []
+        for message in window:
+            target = by_id.get(message.get("reply_to"))
+            if target is not None and target["message_id"] not in ids:
+                ids.add(target["message_id"])
+                context.append(target)
+                if len(context) >= self.max_reply_context:
+                    break
+        lines = [f"> {format_message(m)}" for m in context]
+        lines.extend(format_message(m) for m in window)
+        metadata = {
+            "start_time": window[0]["timestamp"],
+            "end_time": window[-1]["timestamp"],
+            "authors": ", ".join(dict.fromkeys(m["author"] for m in window)),
+            "message_count": len(window),
+            "first_message_id": window[0]["message_id"],
+            "last_message_id": window[-1]["message_id"],
+        }
+        return TextNode(
+            text="\n".join(lines),
+            metadata=metadata,
+            excluded_embed_metadata_keys=[*metadata, *document.metadata],
+            excluded_llm_metadata_keys=[
+                "first_message_id",
+                "last_message_id",
+                *document.metadata,
+            ],
+            relationships={NodeRelationship.SOURCE: document.as_related_node_info()},
+        )
+
+    def _parse_nodes(
+        self, nodes: Sequence[BaseNode], show_progress: bool = False, **kwargs: Any
+    ) -> List[BaseNode]:
+        all_nodes: List[BaseNode] = []
+        for node in get_tqdm_iterable(nodes, show_progress, "Parsing nodes"):
+            messages = [
+                json.loads(line) for line in node.get_content().splitlines() if line
+            ]
+            by_id = {m["message_id"]: m for m in messages}
+            all_nodes.extend(
+                self._window_node(window, by_id, node)
+                for window in self._windows(messages)
+            )
+        return all_nodes
@@ -0,0 +1,250 @@
+import asyncio
+import bisect
+import difflib
+import json
+import os
+import re
+import time
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from decouple import Csv, config
+
+from market_snapshot import MARKET_WATCHLIST_COINS
+
+COIN_LIST_PATH = config(
+    "COIN_LIST_PATH", default=os.path.join("storage", "coins", "coin_list.json")
+)
+# Seconds before the CoinGecko coin list is fetched again.
+COIN_LIST_REFRESH_INTERVAL = config(
+    "COIN_LIST_REFRESH_INTERVAL", default=24 * 3600, cast=float
+)
+# Minimum difflib similarity ratio for a fuzzy name match.
+COIN_RESOLVER_FUZZY_CUTOFF = config(
+    "COIN_RESOLVER_FUZZY_CUTOFF", default=0.85, cast=float
+)
+# Ids that win when a ticker or name is shared by several coins, on top of the
+# market watchlist.
+COIN_RESOLVER_PREFERRED = config(
+    "COIN_RESOLVER_PREFERRED",
+    default="bitcoin,ethereum,tether,binancecoin,solana,ripple,usd-coin,cardano,"
+    "dogecoin,tron,chainlink,avalanche-2,shiba-inu,pepe,dogwifcoin,bonk,floki",
+    cast=Csv(),
+)
+
+CoinListFetcher = Callable[[], Awaitable[Optional[List[Dict]]]]
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase a ticker, name or id and drop a leading $ of a cashtag."""
+    return query.strip().lower().lstrip("$").strip()
+
+
+def _compact(text: str) -> str:
+    return _NON_ALNUM.sub("", text)
+
+
+class CoinIndex:
+    """
+    In-memory lookup tables over the CoinGecko /coins/list entries.
+    Resolution tries, in order: an exact id, a ticker symbol, a name, a unique
+    prefix of a name or id, then a fuzzy match on names and ids.
+    When several coins share a ticker or name (wrapped and bridged tokens often
+    copy them), preferred ids win, then ids without a hyphen, then the shortest.
+    :param coins: Entries with "id", "symbol" and "name" keys.
+    :param preferred: Ids ranked first on ambiguous tickers and names.
+    """
+
+    def __init__(
+        self,
+        coins: Iterable[Dict],
+        preferred: Iterable[str] = (),
+        fuzzy_cutoff: float = COIN_RESOLVER_FUZZY_CUTOFF,
+    ):
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self._rank = {coin_id: i for i, coin_id in enumerate(preferred)}
+        self.ids = set()
+        symbols = defaultdict(list)
+        names = defaultdict(list)
+        for coin in coins:
+            coin_id = coin.get("id")
+            if not coin_id:
+                continue
+            self.ids.add(coin_id)
+            if coin.get("symbol"):
+                symbols[coin["symbol"].lower()].append(coin_id)
+            if coin.get("name"):
+                names[_compact(coin["name"].lower())].append(coin_id)
+
+        # One id per key; the losers are still reachable through their own id.
+        self.by_symbol: Dict[str, str] = {
+            s: self._best(ids) for s, ids in symbols.items()
+        }
+        self.by_name: Dict[str, str] = {n: self._best(ids) for n, ids in names.items()}
+        for coin_id in self.ids:
+            self.by_name.setdefault(_compact(coin_id), coin_id)
+        # Sorted keys for prefix search, and keys by first character and length
+        # for fuzzy search, so neither scans the whole list.
+        self._sorted_names = sorted(self.by_name)
+        self._names_by_shape: Dict[Tuple[str, int], List[str]] = defaultdict(list)
+        for name in self._sorted_names:
+            self._names_by_shape[name[0], len(name)].append(name)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _best(self, candidates: Iterable[str]) -> str:
+        unranked = len(self._rank)
+        return min(
+            candidates,
+            key=lambda c: (self._rank.get(c, unranked), "-" in c, len(c), c),
+        )
+
+    def _prefix(self, key: str) -> Optional[str]:
+        """A unique prefix match, or the preferred id among several."""
+        start = bisect.bisect_left(self._sorted_names, key)
+        end = bisect.bisect_left(self._sorted_names, key + "\x7f", lo=start)
+        matches = {self.by_name[n] for n in self._sorted_names[start:end]}
+        if len(matches) == 1:
+            return matches.pop()
+        preferred = [m for m in matches if m in self._rank]
+        return self._best(preferred) if preferred else None
+
+    def _fuzzy(self, key: str) -> Optional[str]:
+        # Above the cutoff, lengths can differ by at most this much.
+        slack = int(len(key) * (1 - self.fuzzy_cutoff) / self.fuzzy_cutoff) + 1
+        candidates = [
+            name
+            for length in range(len(key) - slack, len(key) + slack + 1)
+            for name in self._names_by_shape.get((key[0], length), ())
+        ]
+        close = difflib.get_close_matches(
+            key, candidates, n=1, cutoff=self.fuzzy_cutoff
+        )
+        return self.by_name[close[0]] if close else None
+
+    def resolve(self, query: str) -> Optional[str]:
+        """Return the CoinGecko id for a ticker, $cashtag, name or id, if any."""
+        query = normalize_query(query)
+        if not query:
+            return None
+        if query in self.ids:
+            return query
+        if query in self.by_symbol:
+            return self.by_symbol[query]
+        key = _compact(query)
+        if not key:
+            return None
+        if key in self.by_name:
+            return self.by_name[key]
+        if len(key) >= 3:
+            return self._prefix(key) or self._fuzzy(key)
+        return None
+
+
+class CoinResolver:
+    """
+    Resolves tickers, names and $cashtags to CoinGecko coin ids locally.
+    The coin list is cached on disk and refetched once it is older than
+    refresh_interval; lookups keep using the previous index meanwhile, and a
+    failed refresh keeps it too. Refreshes are confined to one event loop;
+    CryptoTools runs them on the HTTP client's loop.
+    :param fetch: Coroutine returning the CoinGecko /coins/list entries.
+    :param path: JSON file caching the coin list between restarts.
+    """
+
+    def __init__(
+        self,
+        fetch: CoinListFetcher,
+        path: str = COIN_LIST_PATH,
+        refresh_interval: float = COIN_LIST_REFRESH_INTERVAL,
+        preferred: Iterable[str] = (),
+    ):
+        self.fetch = fetch
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self.preferred = list(
+            dict.fromkeys(
+                list(preferred) + COIN_RESOLVER_PREFERRED + MARKET_WATCHLIST_COINS
+            )
+        )
+        self.index = CoinIndex([], self.preferred)
+        self.updated_at = 0.0
+        self._retry_at = 0.0
+        self._refreshing: Optional[asyncio.Task] = None
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                coins = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error loading coin list: {e}")
+            return
+        self.index = CoinIndex(coins, self.preferred)
+        self.updated_at = os.path.getmtime(self.path)
+
+    def _save(self, coins: List[Dict]) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(coins, f)
+        os.replace(tmp_path, self.path)
+
+    def is_stale(self) -> bool:
+        now = time.time()
+        return now - self.updated_at > self.refresh_interval and now >= self._retry_at
+
+    async def refresh(self) -> bool:
+        """Fetch the coin list and swap in a new index; False if the fetch failed."""
+        try:
+            coins = await self.fetch()
+        except Exception as e:
+            print(f"Error refreshing coin list: {e}")
+            coins = None
+        if not coins:
+            # Retry after a minute rather than a full interval, or every call.
+            self._retry_at = time.time() + 60
+            return False
+        # Building and saving the index takes tens of milliseconds.
+        self.index = await asyncio.to_thread(CoinIndex, coins, self.preferred)
+        self.updated_at = time.time()
+        await asyncio.to_thread(self._save, coins)
+        return True
+
+    async def ensure_fresh(self) -> None:
+        """
+        Refresh a stale coin list. Waits for it only when there is no index yet;
+        otherwise it refreshes in the background. Concurrent calls share one fetch.
+        """
+        if not self.is_stale():
+            return
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.create_task(self.refresh())
+        if not len(self.index):
+            await asyncio.shield(self._refreshing)
+
+    def resolve(self, query: str) -> Optional[str]:
+        return self.index.resolve(query)
+
+    def resolve_many(self, queries: Iterable[str]) -> Tuple[List[str], List[str]]:
+        """
+        Resolve several queries, de-duplicating the ids.
+        Without an index, queries are passed through as ids so the upstream can
+        still answer them.
+        :return: The resolved ids and the queries that matched no coin.
+        """
+        if not len(self.index):
+            return list(dict.fromkeys(normalize_query(q) for q in queries if q)), []
+        ids, unresolved = [], []
+        for query in queries:
+            coin_id = self.index.resolve(query)
+            if coin_id is None:
+                unresolved.append(query)
+            elif coin_id not in ids:
+                ids.append(coin_id)
+        return ids, unresolved
@@ -0,0 +1,96 @@
+import asyncio
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional, Set
+
+from llama_index.core.base.base_query_engine import BaseQueryEngine
+from llama_index.core.base.response.schema import RESPONSE_TYPE
+from llama_index.core.prompts.mixin import PromptMixinType
+from llama_index.core.schema import QueryBundle
+
+
+class ComponentRegistry:
+    """
+    Named components built on first use, each at most once.
+    A factory that raises is retried on the next get, so a component whose
+    backing service was down at startup recovers once the service is back.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._components: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self.build_seconds: Dict[str, float] = {}
+        # Keeps background warm-up tasks referenced until they finish.
+        self._warm_tasks: Set[asyncio.Task] = set()
+
+    def register(self, name: str, factory: Callable[[], Any]) -> None:
+        self._factories[name] = factory
+        self._locks[name] = threading.Lock()
+
+    def is_built(self, name: str) -> bool:
+        return name in self._components
+
+    def get(self, name: str) -> Any:
+        """Return the component, building it and its dependencies if needed."""
+        if name in self._components:
+            return self._components[name]
+        with self._locks[name]:
+            # Another thread may have finished building while this one waited.
+            if name not in self._components:
+                start = time.perf_counter()
+                self._components[name] = self._factories[name]()
+                self.build_seconds[name] = time.perf_counter() - start
+        return self._components[name]
+
+    async def warm(self, names: Iterable[str]) -> None:
+        """
+        Build components on a worker thread without blocking the event loop.
+        Failures are reported and left for the first real use to retry.
+        """
+        loop = asyncio.get_running_loop()
+        for name in names:
+            try:
+                await loop.run_in_executor(None, self.get, name)
+                print(f"Warmed {name} in {self.build_seconds[name]:.1f}s")
+            except Exception as e:
+                print(f"Error warming {name}: {e}")
+
+    def warm_in_background(self, names: Iterable[str]) -> asyncio.Task:
+        """Schedule warm on the running event loop and return its task."""
+        task = asyncio.create_task(self.warm(list(names)))
+        self._warm_tasks.add(task)
+        task.add_done_callback(self._warm_tasks.discard)
+        return task
+
+
+registry = ComponentRegistry()
+
+
+class LazyQueryEngine(BaseQueryEngine):
+    """
+    Query engine that resolves a registry component on its first query, so tools
+    can be defined at import time without building the engine behind them.
+    """
+
+    def __init__(self, name: str, components: Optional[ComponentRegistry] = None):
+        self.name = name
+        self.components = components or registry
+        super().__init__(callback_manager=None)
+
+    @property
+    def query_engine(self) -> BaseQueryEngine:
+        return self.components.get(self.name)
+
+    def _get_prompt_modules(self) -> PromptMixinType:
+        if not self.components.is_built(self.name):
+            return {}
+        return {"query_engine": self.query_engine}
+
+    def _query(self, query_bundle: QueryBundle) -> RESPONSE_TYPE:
+        return self.query_engine.query(query_bundle)
+
+    async def _aquery(self, query_bundle: QueryBundle) -> RESPONSE_TYPE:
+        # Building can block on network services, so it stays off the event loop.
+        query_engine = await asyncio.to_thread(self.components.get, self.name)
+        return await query_engine.aquery(query_bundle)
@@ -1,10 +1,12 @@
+import asyncio
 import logging
 import os
 import sys
-from typing import Tuple, Union
+from typing import Iterable, Tuple, Union
 
 from dotenv import load_dotenv
 from llama_index.core import (
+    Document,
     ServiceContext,
     Settings,
     SimpleDirectoryReader,
@@ -13,19 +15,27 @@ from llama_index.core import (
     load_index_from_storage,
     get_response_synthesizer,
 )
-from llama_index.core.node_parser import SentenceSplitter, SimpleNodeParser
-from llama_index.core.postprocessor import SimilarityPostprocessor
+from llama_index.core.node_parser import NodeParser, SentenceSplitter, SimpleNodeParser
 from llama_index.core.query_engine import RetrieverQueryEngine
-from llama_index.core.retrievers import BaseRetriever, VectorIndexRetriever
+from llama_index.core.retrievers import VectorIndexRetriever
 from llama_index.embeddings.openai import OpenAIEmbedding
 from llama_index.llms.openai import OpenAI
-from llama_index.postprocessor.cohere_rerank import CohereRerank
 from llama_index.vector_stores.qdrant import QdrantVectorStore
-from llama_index.retrievers.bm25 import BM25Retriever
 from qdrant_client import QdrantClient
 from qdrant_client.models import Distance, VectorParams
 from qdrant_client.http.exceptions import UnexpectedResponse
-from llama_parse import LlamaParse
+
+from bm25_index import BM25_INDEX_DIR, BM25Index, BM25IndexRetriever
+from chat_node_parser import CHUNKING_STRATEGY, ConversationWindowNodeParser
+from components import LazyQueryEngine, registry
+from discord_loader import DiscordChatReader
+from embedding_cache import CachedEmbedding, EmbeddingCache
+from hybrid_retriever import HybridRetriever
+from rerank import RERANK_BACKEND, RERANK_CANDIDATES, FastPathRerank, create_reranker
+from ingestion import INGESTION_STORAGE_DIR, IncrementalIngestion
+from news_index import HeadlineQueryEngine, NewsIndex, NewsIndexer
+from semantic_cache import SemanticCacheQueryEngine
+from sub_question import SharedRetriever
 
 
 logging.basicConfig(stream=sys.stdout, level=logging.INFO)
@@ -35,15 +45,24 @@ logging.getLogger().addHandler(logging.StreamHandler(stream=sys.stdout))
 # Load environment variables
 load_dotenv()
 
+# Shared by ingestion and retrieval so repeated texts are embedded only once
+embedding_cache = EmbeddingCache()
+
 Settings.llm = OpenAI(temperature=0.2, model="gpt-4-1106-preview")
-Settings.embed_model = OpenAIEmbedding(model="text-embedding-ada-002")
+Settings.embed_model = CachedEmbedding(
+    embed_model=OpenAIEmbedding(model="text-embedding-ada-002"),
+    cache=embedding_cache,
+)
 
 
 class DegenTraderQueryEngine:
     def __init__(self):
         self.openai_api_key: Union[str, None] = os.getenv("OPENAI_API_KEY")
         self.qdrant_client = QdrantClient(host="localhost", port=6333)
-        self.embed_model = OpenAIEmbedding(model="text-embedding-ada-002")
+        self.embed_model = CachedEmbedding(
+            embed_model=OpenAIEmbedding(model="text-embedding-ada-002"),
+            cache=embedding_cache,
+        )
         # self.llama_cloud_api_key: Union[str, None] = os.getenv("LLAMA_CLOUD_API_KEY")
         self.cohere_api_key: Union[str, None] = os.environ.get("COHERE_API_KEY")
 
@@ -54,115 +73,165 @@ class DegenTraderQueryEngine:
             [
                 self.openai_api_key,
                 # self.llama_cloud_api_key,
-                self.cohere_api_key
+                # Only the Cohere rerank backend needs a Cohere key
+                self.cohere_api_key or RERANK_BACKEND != "cohere",
             ]
         ):
             raise ValueError(
                 "One or more API keys are missing. List of api keys are: openai_api_key, llama_cloud_api_key, cohere_api_key"
             )
 
-    def create_qdrant_index(self) -> VectorStoreIndex:
+    def create_qdrant_collection(self, collection_name: str) -> None:
+        vector_size = 1536
+        vectors_config = VectorParams(
+            size=vector_size,
+            distance=Distance.COSINE,
+        )
+        self.qdrant_client.create_collection(
+            collection_name=collection_name, vectors_config=vectors_config
+        )
+
+    def load_chat_documents(
+        self, chunking_strategy: str
+    ) -> Tuple[Iterable[Document], NodeParser]:
+        # Streams only message content, author, timestamp and reply fields
+        if chunking_strategy == "conversation":
+            documents = DiscordChatReader(mode="transcript").lazy_load_data("Data")
+            return documents, ConversationWindowNodeParser()
+        if chunking_strategy == "sentence":
+            documents = DiscordChatReader().lazy_load_data("Data")
+            return documents, SentenceSplitter(chunk_size=512, chunk_overlap=20)
+        raise ValueError(
+            f"Unknown chunking strategy: {chunking_strategy}. "
+            "Supported strategies are: conversation, sentence"
+        )
+
+    def create_qdrant_index(
+        self, chunking_strategy: str = CHUNKING_STRATEGY
+    ) -> Tuple[VectorStoreIndex, BM25Index]:
         collection_name = "DegenTrader-index"
+        manifest_path = os.path.join(INGESTION_STORAGE_DIR, f"{collection_name}.json")
         try:
-            # Check if the collection exists before trying to recreate it
-            self.qdrant_client.get_collection(collection_name)
-            # If collection already exists, retrieve it
+            bm25_index = BM25Index(os.path.join(BM25_INDEX_DIR, f"{collection_name}.db"))
+            if not self.qdrant_client.collection_exists(collection_name):
+                print(f"Collection {collection_name} not found")
+                # Any manifest describes points that no longer exist
+                if os.path.exists(manifest_path):
+                    os.remove(manifest_path)
+                bm25_index.clear()
+                self.create_qdrant_collection(collection_name)
+            elif not os.path.exists(manifest_path):
+                # Without a manifest there is no telling whether it was fully built
+                print(f"Collection {collection_name} has no ingestion manifest, rebuilding")
+                self.qdrant_client.delete_collection(collection_name)
+                bm25_index.clear()
+                self.create_qdrant_collection(collection_name)
+
             vector_store = QdrantVectorStore(
                 client=self.qdrant_client, collection_name=collection_name
             )
+
+            # Embed only new or changed chunks and drop chunks whose source is gone
+            documents, node_parser = self.load_chat_documents(chunking_strategy)
+            ingestion = IncrementalIngestion(
+                vector_store=vector_store,
+                embed_model=self.embed_model,
+                node_parser=node_parser,
+                manifest_path=manifest_path,
+                keyword_index=bm25_index,
+            )
+            stats = ingestion.run(documents)
+            print(
+                f"Ingested {collection_name}: embedded {stats['embedded']} nodes, "
+                f"reused {stats['reused']}, deleted {stats['deleted']}, "
+                f"saved ~{stats['embed_seconds_saved']:.1f}s of embedding "
+                f"in {stats['seconds']:.1f}s"
+            )
+
             vector_index = VectorStoreIndex.from_vector_store(
                 vector_store=vector_store, embed_model=self.embed_model
             )
-
-        except UnexpectedResponse as e:
-            if e.status_code == 404:
-                print(f"Collection {collection_name} not found")
-                # If collection doesn't exist, recreate it
-                vector_size = 1536
-                vectors_config = VectorParams(
-                    size=vector_size,
-                    distance=Distance.COSINE,  
-                )
-                self.qdrant_client.create_collection(
-                    collection_name=collection_name, vectors_config=vectors_config
-                )
-                # Create vector store
-                vector_store = QdrantVectorStore(
-                    client=self.qdrant_client, collection_name=collection_name
-                )
-                storage_context = StorageContext.from_defaults(
-                    vector_store=vector_store
-                )
-
-                # Load documents and split them into nodes
-                documents = SimpleDirectoryReader(
-                    "Data", recursive=True, file_extractor=None
-                ).load_data()
-                splitter = SentenceSplitter(chunk_size=512, chunk_overlap=20)
-                nodes = splitter.get_nodes_from_documents(documents)
-
-                # Create the vector index
-                vector_index = VectorStoreIndex(
-                    storage_context=storage_context,
-                    embed_model=self.embed_model,
-                    show_progress=True,
-                    nodes=nodes,
-                )
         except Exception as e:
             # Handle any errors here
             print(f"Error: {e}")
             raise e
 
-        return vector_index
+        return vector_index, bm25_index
+
+
+def build_hybrid_retriever() -> SharedRetriever:
+    vector_index, bm25_index = registry.get("degen_trader_indexes")
+    # Retrieve more candidates than are kept, for the reranker to choose from
+    vector_retriever = VectorIndexRetriever(
+        index=vector_index, similarity_top_k=RERANK_CANDIDATES
+    )
+    bm25_retriever = BM25IndexRetriever(
+        bm25_index, similarity_top_k=RERANK_CANDIDATES
+    )
+    # Keyword matches catch tickers and contract addresses that embeddings blur
+    hybrid_retriever = HybridRetriever(
+        vector_retriever, bm25_retriever, similarity_top_k=RERANK_CANDIDATES
+    )
+    # Sub-questions answered at the same time share lookups of the same query
+    return SharedRetriever(hybrid_retriever)
+
+
+def build_reranker() -> FastPathRerank:
+    degen_trader = registry.get("degen_trader")
+    return create_reranker(
+        embed_model=degen_trader.embed_model,
+        cohere_api_key=degen_trader.cohere_api_key,
+    )
+
+
+def build_degen_trader_query_engine() -> SemanticCacheQueryEngine:
+    # Semantically equivalent questions reuse a recent answer instead of
+    # paying for retrieval, rerank and synthesis again
+    return SemanticCacheQueryEngine(
+        query_engine=RetrieverQueryEngine(
+            retriever=registry.get("degen_trader_retriever"),
+            response_synthesizer=get_response_synthesizer(),
+            node_postprocessors=[registry.get("reranker")],
+        ),
+        embed_model=registry.get("degen_trader").embed_model,
+    )
+
+
+def build_news_index() -> NewsIndex:
+    degen_trader = registry.get("degen_trader")
+    # A separate collection next to DegenTrader-index, on the same Qdrant
+    return NewsIndex(degen_trader.qdrant_client, degen_trader.embed_model)
+
+
+def build_news_query_engine() -> HeadlineQueryEngine:
+    return registry.get("news_index").as_query_engine()
+
+
+# Nothing below connects to Qdrant, embeds Data/ or creates API clients until
+# the query engine is first used or warmed
+registry.register("degen_trader", DegenTraderQueryEngine)
+registry.register(
+    "degen_trader_indexes", lambda: registry.get("degen_trader").create_qdrant_index()
+)
+registry.register("degen_trader_retriever", build_hybrid_retriever)
+registry.register("reranker", build_reranker)
+registry.register("degen_trader_query_engine", build_degen_trader_query_engine)
+registry.register("news_index", build_news_index)
+registry.register("news_query_engine", build_news_query_engine)
 
+degen_trader_query_engine = LazyQueryEngine("degen_trader_query_engine")
+news_query_engine = LazyQueryEngine("news_query_engine")
+
+
+def warm_degen_trader() -> asyncio.Task:
+    """Build the index and query engine in the background, e.g. once a bot is online."""
+    return registry.warm_in_background(["degen_trader_query_engine"])
+
+
+def create_news_indexer(tools) -> NewsIndexer:
+    """Indexer feeding the news collection from tools' aggregated news."""
+    return NewsIndexer(tools, lambda: registry.get("news_index"))
 
-    def create_BM25_and_vector_retriever(
-        self,
-    ) -> Tuple[BM25Retriever, VectorIndexRetriever]:
-        # load or create the pinecone vector store index
-        pinecone_vector_index = self.create_pinecone_index()
-        bm25_retriever = BM25Retriever.from_defaults(
-            index=pinecone_vector_index, similarity_top_k=8
-        )
-        vector_index_retriever = VectorIndexRetriever(
-            pinecone_vector_index, similarity_top_k=8
-        )
-        return bm25_retriever, vector_index_retriever
-
-
-class HybridRetriever(BaseRetriever):
-    def __init__(self, vector_index_retriever, bm25_retriever):
-        self.vector_index_retriever = vector_index_retriever
-        self.bm25_retriever = bm25_retriever
-
-    def _retrieve(self, query, **kwargs):
-        bm25_nodes = self.bm25_retriever.retrieve(query, **kwargs)
-        vector_nodes = self.vector_index_retriever.retrieve(query, **kwargs)
-        all_nodes = []
-        nodes_ids = set()
-        for n in bm25_nodes + vector_nodes:
-            if n.node.node_id not in nodes_ids:
-                all_nodes.append(n)
-                nodes_ids.add(n.node.node_id)
-        return all_nodes
-
-
-DegenTrader_query = DegenTraderQueryEngine()
-# bm25_retriever, vector_index_retriever = DegenTrader_query.create_BM25_and_vector_retriever()
-# hybrid_retriever = HybridRetriever(vector_index_retriever, bm25_retriever)
-vector_index = DegenTrader_query.create_qdrant_index()
-vector_retriever = VectorIndexRetriever(index=vector_index, similarity_top_k=8)
-
-cohere_rerank = CohereRerank(api_key=DegenTrader_query.cohere_api_key, top_n=8)
-
-# configure response synthesizer
-response_synthesizer = get_response_synthesizer()
-similarity_postprocessor = SimilarityPostprocessor(similarity_cutoff=0.5)
-degen_trader_query_engine = RetrieverQueryEngine(
-    retriever=vector_retriever,
-    response_synthesizer=response_synthesizer,
-    node_postprocessors=[cohere_rerank],
-)
 
 # response = degen_trader_query_engine.query("which coin is good to buy based on the available market sentiment and list top 10")
 # print(response)
@@ -0,0 +1,365 @@
+import asyncio
+import random
+import statistics
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from decouple import config
+
+from agent_pool import AgentPool
+from discord_stream import DiscordStreamer
+from repetition import (
+    REPETITION_CHECK,
+    REPETITION_MAX_REWRITES,
+    ConversationTracker,
+    MinHasher,
+)
+
+# Channels the bots talk in, separated by ";", each as
+# "<channel id>:<persona>,<persona>[,...][:<pace>[:<jitter>]]", e.g.
+# "123:bot1,bot2;456:bot2,bot1:20:5". Personas take turns in the listed order.
+DIALOGUE_CHANNELS = config("DIALOGUE_CHANNELS", default="")
+# Seconds between two posts in a channel, unless a channel sets its own.
+DIALOGUE_PACE = config("DIALOGUE_PACE", default=10, cast=float)
+# Each pause is the pace plus or minus up to this many seconds.
+DIALOGUE_JITTER = config("DIALOGUE_JITTER", default=0, cast=float)
+# A turn taking longer than this is abandoned, its agent rebuilt and the turn retried.
+DIALOGUE_TURN_TIMEOUT = config("DIALOGUE_TURN_TIMEOUT", default=120, cast=float)
+# Retries of a failed or stalled turn before the fallback message is posted.
+DIALOGUE_MAX_RETRIES = config("DIALOGUE_MAX_RETRIES", default=2, cast=int)
+# Seconds before a crashed channel is restarted, doubled per consecutive crash.
+DIALOGUE_RESTART_DELAY = config("DIALOGUE_RESTART_DELAY", default=5, cast=float)
+DIALOGUE_OPENING_MESSAGE = config(
+    "DIALOGUE_OPENING_MESSAGE",
+    default="which meme coin i can buy tht is bullish in last 24hrs",
+)
+
+FALLBACK_MESSAGE = "Let's continue our discussion about cryptocurrency."
+
+
+class Persona:
+    """
+    A bot taking turns in dialogues.
+    :param name: Name used in DIALOGUE_CHANNELS.
+    :param pool: Pool of the persona's agents, one session per channel.
+    :param get_channel: Returns the channel object the persona posts to by id,
+        e.g. the persona's discord.Client.get_channel.
+    """
+
+    def __init__(self, name: str, pool: AgentPool, get_channel: Callable[[int], Any]):
+        self.name = name
+        self.pool = pool
+        self.get_channel = get_channel
+
+    def session_key(self, channel_id: int) -> str:
+        return f"{self.name}:{channel_id}"
+
+
+class DialogueChannel:
+    """One channel's dialogue: who takes part, its pacing and where it stands."""
+
+    def __init__(
+        self,
+        channel_id: int,
+        personas: List[str],
+        pace: float = DIALOGUE_PACE,
+        jitter: float = DIALOGUE_JITTER,
+    ):
+        if len(personas) < 2:
+            raise ValueError(f"Channel {channel_id} needs at least two personas")
+        self.channel_id = channel_id
+        self.personas = personas
+        self.pace = pace
+        self.jitter = jitter
+        # The last posted message and the index of the persona replying to it
+        self.last_message: Optional[str] = None
+        self.speaker = 0
+        self.posted_at: Optional[float] = None
+        self.turns = 0
+        self.restarts = 0
+        # Recent posts, for catching replies that repeat them
+        self.tracker: Optional[ConversationTracker] = None
+
+    def next_pause(self) -> float:
+        return max(0.0, self.pace + random.uniform(-self.jitter, self.jitter))
+
+
+def parse_channels(
+    spec: str, pace: float = DIALOGUE_PACE, jitter: float = DIALOGUE_JITTER
+) -> List[DialogueChannel]:
+    """Parse DIALOGUE_CHANNELS; channels without a pace or jitter use the defaults."""
+    channels = []
+    for entry in filter(None, (part.strip() for part in spec.split(";"))):
+        fields = entry.split(":")
+        if not 2 <= len(fields) <= 4:
+            raise ValueError(f"Invalid dialogue channel {entry!r}")
+        channels.append(
+            DialogueChannel(
+                int(fields[0]),
+                [name.strip() for name in fields[1].split(",") if name.strip()],
+                pace=float(fields[2]) if len(fields) > 2 else pace,
+                jitter=float(fields[3]) if len(fields) > 3 else jitter,
+            )
+        )
+    return channels
+
+
+class DialogueScheduler:
+    """
+    Keeps bot dialogues going in many channels from one event loop.
+    Each channel runs its own task. A turn starts generating as soon as the
+    message it answers has been generated, while that message still waits
+    for its slot, so the pause between posts hides the LLM latency instead of
+    adding to it: posts are max(pause, generation time) apart.
+    A turn that fails or stalls past turn_timeout is retried, its agent
+    rebuilt after a stall, and replaced by FALLBACK_MESSAGE once retries run
+    out; a channel whose task crashes is restarted from its last posted message.
+    With check_repetition, a reply nearly repeating a recent message of its
+    channel is regenerated with a topic-shift hint before it is posted.
+    :param personas: Personas by name.
+    :param channels: Channels to run, e.g. from parse_channels.
+    :param streamer: Sends replies split at Discord's message limit.
+    :param turn_timeout: Seconds after which a turn counts as stalled.
+    :param max_retries: Retries of a failed or stalled turn.
+    :param restart_delay: Seconds before a crashed channel is restarted.
+    :param opening_message: Posted by a channel's first persona to start it.
+    :param check_repetition: Check replies against each channel's ConversationTracker.
+    :param rewrite: Takes (message, repeated reply, hint) and returns a new
+        reply, e.g. llm_rewriter; None reruns the agent's turn with the hint.
+    :param max_rewrites: Regenerations of a repeated reply before it is posted anyway.
+    """
+
+    def __init__(
+        self,
+        personas: Dict[str, Persona],
+        channels: List[DialogueChannel],
+        streamer: Optional[DiscordStreamer] = None,
+        turn_timeout: float = DIALOGUE_TURN_TIMEOUT,
+        max_retries: int = DIALOGUE_MAX_RETRIES,
+        restart_delay: float = DIALOGUE_RESTART_DELAY,
+        opening_message: str = DIALOGUE_OPENING_MESSAGE,
+        check_repetition: bool = REPETITION_CHECK,
+        rewrite: Optional[Callable[[str, str, str], Awaitable[str]]] = None,
+        max_rewrites: int = REPETITION_MAX_REWRITES,
+    ):
+        for channel in channels:
+            unknown = set(channel.personas) - set(personas)
+            if unknown:
+                raise ValueError(
+                    f"Channel {channel.channel_id} names unknown personas {unknown}"
+                )
+        self.personas = personas
+        self.channels = channels
+        self.streamer = streamer or DiscordStreamer()
+        self.turn_timeout = turn_timeout
+        self.max_retries = max_retries
+        self.restart_delay = restart_delay
+        self.opening_message = opening_message
+        self.rewrite = rewrite
+        self.max_rewrites = max_rewrites
+        if check_repetition:
+            hasher = MinHasher()
+            for channel in channels:
+                channel.tracker = ConversationTracker(hasher=hasher)
+        self._tasks: List[asyncio.Task] = []
+        self._intervals = deque(maxlen=1000)
+        self._generation_times = deque(maxlen=1000)
+        self.retries = 0
+        self.stalled = 0
+        self.fallbacks = 0
+        self.repeats = 0
+        self.rewrites = 0
+        self.repeats_posted = 0
+
+    def start(self) -> None:
+        """Start every channel's dialogue on the running loop; a no-op once started."""
+        if self._tasks:
+            return
+        for channel in self.channels:
+            self._tasks.append(asyncio.create_task(self._supervise(channel)))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _supervise(self, channel: DialogueChannel) -> None:
+        crashes = 0
+        while True:
+            turns = channel.turns
+            try:
+                await self._run(channel)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # A channel that made progress since its last crash starts over
+                crashes = 1 if channel.turns > turns else crashes + 1
+                channel.restarts += 1
+                delay = self.restart_delay * 2 ** (crashes - 1)
+                print(
+                    f"Error in dialogue of channel {channel.channel_id}: {e}; "
+                    f"restarting in {delay:.0f}s"
+                )
+                await asyncio.sleep(delay)
+
+    async def _run(self, channel: DialogueChannel) -> None:
+        if channel.last_message is None:
+            await self._post(channel, 0, self.opening_message)
+        speaker = turn_speaker = channel.speaker
+        turn = asyncio.create_task(
+            self._generate(channel, speaker, channel.last_message)
+        )
+        try:
+            while True:
+                reply = await turn
+                # The next persona answers this reply while it waits for its slot
+                following = turn_speaker = (speaker + 1) % len(channel.personas)
+                turn = asyncio.create_task(self._generate(channel, following, reply))
+                await self._wait_for_slot(channel)
+                await self._post(channel, speaker, reply)
+                speaker = following
+        finally:
+            # A cancel of _run while awaiting the turn has already cancelled it
+            if not turn.done() or turn.cancelled():
+                # Cancelling leaves the agent call running in its worker thread;
+                # drop its session so the late turn's memory writes are discarded
+                persona = self.personas[channel.personas[turn_speaker]]
+                persona.pool.abandon(persona.session_key(channel.channel_id))
+            turn.cancel()
+
+    async def _wait_for_slot(self, channel: DialogueChannel) -> None:
+        if channel.posted_at is not None:
+            delay = channel.posted_at + channel.next_pause() - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+    async def _post(self, channel: DialogueChannel, speaker: int, text: str) -> None:
+        persona = self.personas[channel.personas[speaker]]
+        target = persona.get_channel(channel.channel_id)
+        if target is None:
+            raise RuntimeError(f"{persona.name} cannot see the channel")
+        await self.streamer.send(target, text)
+        now = time.monotonic()
+        if channel.posted_at is not None:
+            self._intervals.append(now - channel.posted_at)
+        channel.posted_at = now
+        channel.last_message = text
+        channel.speaker = (speaker + 1) % len(channel.personas)
+        channel.turns += 1
+        if channel.tracker is not None:
+            channel.tracker.add_message(text)
+        print(f"{persona.name} in {channel.channel_id}: {text}")
+
+    async def _generate(
+        self, channel: DialogueChannel, speaker: int, message: str
+    ) -> str:
+        """The persona's reply to message, retried on failure, or FALLBACK_MESSAGE."""
+        persona = self.personas[channel.personas[speaker]]
+        key = persona.session_key(channel.channel_id)
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.retries += 1
+            start = time.monotonic()
+            try:
+                response = await asyncio.wait_for(
+                    persona.pool.achat(key, message), self.turn_timeout
+                )
+                self._generation_times.append(time.monotonic() - start)
+                return await self._avoid_repeat(
+                    channel, speaker, message, str(response)
+                )
+            except asyncio.TimeoutError:
+                # The stalled call keeps its worker thread; the retry gets a fresh
+                # agent, and whatever the stalled one writes to memory is dropped
+                self.stalled += 1
+                persona.pool.abandon(key)
+                print(f"{persona.name}'s turn in {channel.channel_id} stalled")
+            except Exception as e:
+                print(f"Error generating {persona.name}'s turn: {e}")
+        self.fallbacks += 1
+        return FALLBACK_MESSAGE
+
+    async def _avoid_repeat(
+        self, channel: DialogueChannel, speaker: int, message: str, reply: str
+    ) -> str:
+        """
+        Regenerate a reply that repeats a recent message of the channel. The
+        persona's memory is then made to show the reply that will be posted,
+        without the repeated draft or the hinted turns.
+        """
+        tracker = channel.tracker
+        if tracker is None:
+            return reply
+        persona = self.personas[channel.personas[speaker]]
+        key = persona.session_key(channel.channel_id)
+        draft, turns = reply, 1
+        for attempt in range(self.max_rewrites + 1):
+            # The message being answered may not be posted yet
+            match = tracker.check(reply, pending=[message])
+            if match is None:
+                break
+            if attempt == 0:
+                self.repeats += 1
+            if attempt == self.max_rewrites:
+                self.repeats_posted += 1
+                break
+            similarity, repeated = match
+            print(
+                f"{persona.name}'s reply in {channel.channel_id} repeats an earlier "
+                f"message ({similarity:.0%} similar), regenerating"
+            )
+            hint = tracker.topic_shift_hint(repeated)
+            try:
+                if self.rewrite is not None:
+                    reply = await self.rewrite(message, reply, hint)
+                else:
+                    response = await asyncio.wait_for(
+                        persona.pool.achat(key, f"{message}\n\n({hint})"),
+                        self.turn_timeout,
+                    )
+                    turns += 1
+                    reply = str(response)
+                self.rewrites += 1
+            except asyncio.TimeoutError:
+                # As in _generate, whatever the stalled turn writes is dropped
+                self.stalled += 1
+                persona.pool.abandon(key)
+                print(
+                    f"{persona.name}'s regenerated turn in {channel.channel_id} stalled"
+                )
+                self.repeats_posted += 1
+                break
+            except Exception as e:
+                print(f"Error regenerating {persona.name}'s repeated reply: {e}")
+                self.repeats_posted += 1
+                break
+        if reply != draft or turns > 1:
+            await persona.pool.aset_last_reply(key, reply, turns)
+        return reply
+
+    def metrics(self) -> Dict[str, float]:
+        """Return turn counters and the time between posts and per generation."""
+        metrics = {
+            "channels": len(self.channels),
+            "turns": sum(channel.turns for channel in self.channels),
+            "retries": self.retries,
+            "stalled": self.stalled,
+            "fallbacks": self.fallbacks,
+            "restarts": sum(channel.restarts for channel in self.channels),
+            "repeats": self.repeats,
+            "rewrites": self.rewrites,
+            "repeats_posted": self.repeats_posted,
+        }
+        for name, samples in [
+            ("interval", list(self._intervals)),
+            ("generation", list(self._generation_times)),
+        ]:
+            metrics[f"{name}_avg_s"] = statistics.fmean(samples) if samples else 0.0
+            metrics[f"{name}_p95_s"] = (
+                statistics.quantiles(samples, n=20, method="inclusive")[18]
+                if len(samples) > 1
+                else 0.0
+            )
+        return metrics
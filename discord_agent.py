@@ -1,20 +1,35 @@
 from decouple import config
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 import asyncio
-import random
-import re
-from datetime import datetime, timedelta
-from agents import bot1_tools, bot2_tools, llm
+from agents import bot1_tools, bot2_tools, llm, news_indexer
+from agent_pool import AgentPool
+from agent_tools import market_poller
+from degen_trader_agent import warm_degen_trader
+from dialogue_scheduler import (
+    DIALOGUE_CHANNELS,
+    DialogueChannel,
+    DialogueScheduler,
+    Persona,
+    parse_channels,
+)
+from memory_store import create_chat_store
+from repetition import REPETITION_REWRITE_MODEL, llm_rewriter
 from prompt import bot1_context, bot2_context
+from prompt_builder import PromptBuilder
 from llama_index.core.agent import ReActAgent
+from llama_index.core.memory import ChatMemoryBuffer
+from llama_index.llms.openai import OpenAI
 
 
 # Configuration
-channel_id = int(config("CHANNEL_ID"))
 bot1_token = config("BOT1_TOKEN")
 bot2_token = config("BOT2_TOKEN")
 openai_api_key = config("OPENAI_API_KEY")
+# Dialogues from DIALOGUE_CHANNELS, or the two bots talking in CHANNEL_ID
+dialogue_channels = parse_channels(DIALOGUE_CHANNELS) or [
+    DialogueChannel(config("CHANNEL_ID", cast=int), ["bot1", "bot2"])
+]
 
 # Intents setup
 intents = discord.Intents.default()
@@ -26,85 +41,50 @@ intents.message_content = True
 class SharedChannelBot(commands.Bot):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.target_channel_id = channel_id
         self.opponent = None
 
 
-# Create memory for each bot
-bot1_memory = []  # Stores Bot1's chat history
-bot2_memory = []  # Stores Bot2's chat history
-
-
-# Function to dynamically update chat history
-def format_chat_history(memory):
-    """Format chat history from memory."""
-    try:
-        # Extract the last 5 messages from memory
-        chat_history = memory[-10:]
-        formatted_history = []
-        for message in chat_history:
-            if message["role"] == "user":
-                formatted_history.append(f"User: {message['content']}")
-            elif message["role"] == "assistant":
-                formatted_history.append(f"Assistant: {message['content']}")
-        return "\n".join(formatted_history)
-    except Exception as e:
-        print(f"Error formatting chat history: {e}")
-        return "Chat history not available."
-
-
-# Bot1 agent with dynamic chat history
-# Bot1 agent with dynamic chat history
-def bot1_agent(message: str):
-    """Generate response for Bot1 using the predefined agent."""
-    # Append the user's message to Bot1's memory
-    bot1_memory.append({"role": "user", "content": message})
-
-    # Format the chat history
-    chat_history = format_chat_history(bot1_memory)
-
-    # Replace {chat_history} in context
-    updated_context = bot1_context.replace("{chat_history}", chat_history)
-    print("updated_context:", updated_context)
-    # Create the agent and generate a response
-    agent = ReActAgent.from_tools(
+# Token budget for the chat memory buffer kept by each bot's agent
+memory_token_limit = config("AGENT_MEMORY_TOKEN_LIMIT", default=3000, cast=int)
+# Bounded, persistent history shared by both bots' memory buffers
+chat_store = create_chat_store()
+
+
+def build_bot1_agent(session_id: str):
+    """Build one of Bot1's long-lived agents with its own chat memory."""
+    return ReActAgent.from_tools(
         tools=bot1_tools,
         verbose=True,
-        context=updated_context,
+        react_chat_formatter=PromptBuilder.from_context(bot1_context, name="bot1"),
+        memory=ChatMemoryBuffer.from_defaults(
+            llm=llm,
+            token_limit=memory_token_limit,
+            chat_store=chat_store,
+            chat_store_key=session_id,
+        ),
         llm=llm,
     )
-    response = agent.chat(message)
-
-    # Append Bot1's response to memory
-    bot1_memory.append({"role": "assistant", "content": response.response})
-    return response
-
 
-# Bot2 agent with dynamic chat history
-def bot2_agent(message: str):
-    """Generate response for Bot2 using the predefined agent."""
-    # Append the user's message to Bot2's memory
-    bot2_memory.append({"role": "user", "content": message})
 
-    # Format the chat history
-    chat_history = format_chat_history(bot2_memory)
-
-    # Replace {chat_history} in context
-    updated_context = bot2_context.replace("{chat_history}", chat_history)
-
-    # Create the agent and generate a response
-    print("updated_context:", updated_context)
-    agent = ReActAgent.from_tools(
+def build_bot2_agent(session_id: str):
+    """Build one of Bot2's long-lived agents with its own chat memory."""
+    return ReActAgent.from_tools(
         tools=bot2_tools,
         verbose=True,
-        context=updated_context,
+        react_chat_formatter=PromptBuilder.from_context(bot2_context, name="bot2"),
+        memory=ChatMemoryBuffer.from_defaults(
+            llm=llm,
+            token_limit=memory_token_limit,
+            chat_store=chat_store,
+            chat_store_key=session_id,
+        ),
         llm=llm,
     )
-    response = agent.chat(message)
 
-    # Append Bot2's response to memory
-    bot2_memory.append({"role": "assistant", "content": response.response})
-    return response
+
+# One agent per bot and channel, built once and reused for every turn
+bot1_pool = AgentPool(build_bot1_agent)
+bot2_pool = AgentPool(build_bot2_agent)
 
 
 # Bot instances
@@ -116,29 +96,6 @@ bot2 = SharedChannelBot(command_prefix="!", intents=intents)
 # bot2.opponent = bot1
 
 
-# Add a class to track conversation context
-# Add a class to track conversation context
-class ConversationTracker:
-    def __init__(self):
-        self.previous_topics = set()
-        self.discussion_history = []
-
-    def add_topic(self, topic):
-        self.previous_topics.add(topic)
-        if len(self.previous_topics) > 5:
-            self.previous_topics.pop()
-
-    def add_message(self, message):
-        self.discussion_history.append(message)
-        if len(self.discussion_history) > 10:
-            self.discussion_history.pop(0)
-
-
-# Create separate trackers for each bot
-bot1_tracker = ConversationTracker()
-bot2_tracker = ConversationTracker()
-
-
 # async def generate_response(agent_function, previous_message, tracker):
 #     """Generate a response using LangChain with context tracking."""
 #     try:
@@ -159,92 +116,57 @@ bot2_tracker = ConversationTracker()
 #         return "Let's continue our discussion about cryptocurrency."
 
 
-async def generate_response(agent_function, previous_message):
-    """Generate a response using LangChain with context tracking."""
-    try:
-        # Pass the message as a string to the agent function
-        response = agent_function(previous_message)  # Correctly handle as raw string
-        return response
-    except Exception as e:
-        print(f"Error generating response: {e}")
-        return "Let's continue our discussion about cryptocurrency."
-
-
-# Event handling for Bot1
-@bot1.event
-async def on_message(message):
-    # Ignore messages not in the target channel or from self
-    if message.channel.id != channel_id or message.author == bot1.user:
-        return
-
-    # Respond only to messages from bot2
-    if message.author == bot2.user:
-        # Add a slight delay to simulate real-time responses
-        await asyncio.sleep(10)
-        channel = bot1.get_channel(channel_id)
-
-        # Debugging: Check the message content
-        print(f"Bot1 received message: {message.content}")
-
-        # Generate response for Bot1 using context
-        response = await generate_response(bot1_agent, message.content)
-
-        # Debugging: Check the response from Bot1
-        print(f"Bot1's response: {response}")
-
-        # Send the response to Bot2
-        await channel.send(response)
-
-
-# Event handling for Bot2
-@bot2.event
-async def on_message(message):
-    # Ignore messages not in the target channel or from self
-    if message.channel.id != channel_id or message.author == bot2.user:
-        return
-
-    # Respond only to messages from bot1
-    if message.author == bot1.user:
-        # Add a slight delay to simulate real-time responses
-        await asyncio.sleep(10)
-        channel = bot2.get_channel(channel_id)
-
-        # Debugging: Check the message content
-        print(f"Bot2 received message: {message.content}")
-        print("Bot1 Memory:", bot1_memory)
-        print("Bot2 Memory:", bot2_memory)
-
-        # Generate response for Bot2 using context
-        response = await generate_response(bot2_agent, message.content)
-
-        # Debugging: Check the response from Bot2
-        print(f"Bot2's response: {response}")
+# Runs the dialogue of every configured channel, generating each turn while
+# the previous one waits out its channel's pace; replies repeating a recent
+# message are rewritten in one LLM call before they are posted
+scheduler = DialogueScheduler(
+    {
+        "bot1": Persona("bot1", bot1_pool, bot1.get_channel),
+        "bot2": Persona("bot2", bot2_pool, bot2.get_channel),
+    },
+    dialogue_channels,
+    rewrite=llm_rewriter(
+        OpenAI(model=REPETITION_REWRITE_MODEL, api_key=openai_api_key)
+        if REPETITION_REWRITE_MODEL
+        else llm
+    ),
+)
 
-        # Send the response to Bot1
-        await channel.send(response)
 
+@tasks.loop(seconds=60)
+async def log_dialogue_metrics():
+    """Log posting intervals, turn faults and repeats of the dialogues."""
+    print(f"Dialogue scheduler metrics: {scheduler.metrics()}")
+    print(f"Agent pools: bot1 {bot1_pool.stats()}, bot2 {bot2_pool.stats()}")
 
-async def start_conversation():
-    """Initiate the conversation by having Bot1 send the first message."""
-    channel = bot1.get_channel(channel_id)
 
-    # Bot1 starts the conversation
-    initial_message = "which meme coin i can buy tht is bullish in last 24hrs"
-    await channel.send(initial_message)
+def start_dialogues():
+    """Start the dialogues once both bots are online; later calls do nothing."""
+    if bot1.is_ready() and bot2.is_ready():
+        scheduler.start()
+        if not log_dialogue_metrics.is_running():
+            log_dialogue_metrics.start()
 
 
 # Event when Bot1 is ready
 @bot1.event
 async def on_ready():
     print(f"Trader 1 is online as {bot1.user}")
+    # Build the index and query engine while the conversation gets going
+    warm_degen_trader()
+    # Keep the watchlist's market snapshot fresh for the price tools
+    market_poller.start()
     await asyncio.sleep(5)
-    await start_conversation()
+    start_dialogues()
 
 
 # Event when Bot2 is ready
 @bot2.event
 async def on_ready():
     print(f"Trader 2 is online as {bot2.user}")
+    # Keep the news collection behind Trader 2's crypto_news tool current
+    news_indexer.start()
+    start_dialogues()
 
 
 # Main function to run both bots concurrently
@@ -0,0 +1,200 @@
+import csv
+import glob
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+from decouple import config
+from llama_index.core.readers.base import BaseReader
+from llama_index.core.schema import Document
+
+# "message" yields one Document per message, "window" one per conversation window
+# and "transcript" one per export for ConversationWindowNodeParser.
+DISCORD_LOADER_MODE = config("DISCORD_LOADER_MODE", default="window")
+DISCORD_WINDOW_SIZE = config("DISCORD_WINDOW_SIZE", default=20, cast=int)
+# A silence longer than this closes the current window.
+DISCORD_WINDOW_GAP_MINUTES = config(
+    "DISCORD_WINDOW_GAP_MINUTES", default=30, cast=float
+)
+
+# Exports inline large embeds into single cells.
+csv.field_size_limit(min(sys.maxsize, 2**31 - 1))
+
+
+def parse_discord_rows(path: str, seen: Optional[Set[str]] = None) -> Iterator[Dict]:
+    """
+    Stream the messages of a Discord CSV export, keeping only the fields worth
+    embedding. Rows are read one at a time, without loading the whole file.
+    :param seen: Message ids already read; repeated rows in the exports are skipped.
+    """
+    seen = set() if seen is None else seen
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            content = (row.get("content") or "").strip()
+            if not content or row.get("id") in seen:
+                continue
+            seen.add(row.get("id"))
+            yield {
+                "message_id": row.get("id"),
+                "author": row.get("author.global_name")
+                or row.get("author.username")
+                or row.get("userName"),
+                "timestamp": row.get("timestamp"),
+                "channel_id": row.get("channel_id"),
+                "reply_to": row.get("message_reference.message_id") or None,
+                "thread": row.get("thread") or None,
+                "content": content,
+            }
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def format_message(message: Dict) -> str:
+    return f"{message['author']}: {message['content']}"
+
+
+class DiscordChatReader(BaseReader):
+    """
+    Schema-aware reader for Discord chat CSV exports.
+    Keeps message content, author, timestamp and reply/thread fields and drops
+    the hundreds of flattened attachment, avatar and embed columns.
+    :param mode: "message" for one Document per message, "window" for one per
+        conversation window, "transcript" for one per export holding its messages
+        as JSON lines in chronological order.
+    :param window_size: Maximum number of messages in a window.
+    :param window_gap_minutes: Silence that closes the current window.
+    """
+
+    def __init__(
+        self,
+        mode: str = DISCORD_LOADER_MODE,
+        window_size: int = DISCORD_WINDOW_SIZE,
+        window_gap_minutes: float = DISCORD_WINDOW_GAP_MINUTES,
+    ):
+        if mode not in ("message", "window", "transcript"):
+            raise ValueError(
+                f"Unknown loader mode: {mode}. "
+                "Supported modes are: message, window, transcript"
+            )
+        self.mode = mode
+        self.window_size = window_size
+        self.window_gap = timedelta(minutes=window_gap_minutes)
+
+    def _message_document(self, message: Dict, file_name: str) -> Document:
+        metadata = {
+            "message_id": message["message_id"],
+            "author": message["author"],
+            "timestamp": message["timestamp"],
+            "channel_id": message["channel_id"],
+            "reply_to": message["reply_to"],
+            "thread": message["thread"],
+            "file_name": file_name,
+        }
+        return Document(
+            id_=f"discord-message-{message['message_id']}",
+            text=format_message(message),
+            metadata=metadata,
+            # The author is already part of the text.
+            excluded_embed_metadata_keys=list(metadata),
+            excluded_llm_metadata_keys=[
+                "message_id",
+                "channel_id",
+                "reply_to",
+                "thread",
+                "file_name",
+            ],
+        )
+
+    def _window_document(self, window: List[Dict], file_name: str) -> Document:
+        # Exports list the newest message first.
+        window = sorted(window, key=lambda m: m["timestamp"] or "")
+        metadata = {
+            "start_time": window[0]["timestamp"],
+            "end_time": window[-1]["timestamp"],
+            "authors": ", ".join(dict.fromkeys(m["author"] for m in window)),
+            "message_count": len(window),
+            "channel_id": window[0]["channel_id"],
+            "first_message_id": window[0]["message_id"],
+            "last_message_id": window[-1]["message_id"],
+            "file_name": file_name,
+        }
+        return Document(
+            id_=f"discord-window-{window[0]['message_id']}",
+            text="\n".join(format_message(m) for m in window),
+            metadata=metadata,
+            excluded_embed_metadata_keys=list(metadata),
+            excluded_llm_metadata_keys=[
+                "channel_id",
+                "first_message_id",
+                "last_message_id",
+                "file_name",
+            ],
+        )
+
+    def _transcript_document(self, messages: List[Dict], file_name: str) -> Document:
+        # Exports list the newest message first.
+        messages = sorted(messages, key=lambda m: m["timestamp"] or "")
+        metadata = {"file_name": file_name}
+        return Document(
+            id_=f"discord-transcript-{file_name}",
+            text="\n".join(
+                json.dumps(
+                    {k: v for k, v in m.items() if k != "channel_id"},
+                    ensure_ascii=False,
+                )
+                for m in messages
+            ),
+            metadata=metadata,
+            excluded_embed_metadata_keys=list(metadata),
+            excluded_llm_metadata_keys=list(metadata),
+        )
+
+    def _windows(self, messages: Iterable[Dict]) -> Iterator[List[Dict]]:
+        window: List[Dict] = []
+        last_time = None
+        for message in messages:
+            current_time = parse_timestamp(message["timestamp"])
+            gap = (
+                current_time is not None
+                and last_time is not None
+                and abs(current_time - last_time) > self.window_gap
+            )
+            if window and (len(window) >= self.window_size or gap):
+                yield window
+                window = []
+            window.append(message)
+            last_time = current_time or last_time
+        if window:
+            yield window
+
+    def lazy_load_data(self, input_dir: str = "Data") -> Iterable[Document]:
+        """Yield Documents for every CSV export under input_dir."""
+        paths = sorted(
+            glob.glob(os.path.join(input_dir, "**", "*.csv"), recursive=True)
+        )
+        seen: Set[str] = set()
+        for path in paths:
+            file_name = os.path.basename(path)
+            messages = parse_discord_rows(path, seen)
+            if self.mode == "message":
+                for message in messages:
+                    yield self._message_document(message, file_name)
+            elif self.mode == "transcript":
+                # Only the kept fields of one export are held in memory.
+                yield self._transcript_document(list(messages), file_name)
+            else:
+                for window in self._windows(messages):
+                    yield self._window_document(window, file_name)
+
+    def load_data(self, input_dir: str = "Data") -> List[Document]:
+        """Load Documents for every CSV export under input_dir."""
+        return list(self.lazy_load_data(input_dir))
@@ -2,9 +2,20 @@ from decouple import config
 import discord
 from discord.ext import commands, tasks
 import asyncio
-from agents import llm, discord_ai_agent_tools
+import time
+from functools import partial
+from agents import llm, discord_ai_agent_tools, intent_router, news_indexer
+from agent_pool import AgentPool
+from agent_tools import crypto_tools, market_poller
+from degen_trader_agent import warm_degen_trader
+from discord_stream import STREAM_REPLIES, DiscordStreamer
+from intent_router import INTENT_ROUTER_ENABLED
+from memory_store import create_chat_store
+from request_queue import UserRequestQueue
 from prompt import discord_ai_agent_context
+from prompt_builder import PromptBuilder
 from llama_index.core.agent import ReActAgent
+from llama_index.core.memory import ChatMemoryBuffer
 
 # Configuration
 channel_id = int(config("DISCORD-BOT-CHANNEL-ID"))
@@ -16,56 +27,94 @@ intents = discord.Intents.default()
 intents.messages = True
 intents.message_content = True
 
-# Memory to track individual user conversations
-user_memory = {}
+# Token budget for the chat memory buffer kept by each user's agent
+memory_token_limit = config("AGENT_MEMORY_TOKEN_LIMIT", default=3000, cast=int)
+# Bounded, persistent history so conversations survive restarts and eviction
+chat_store = create_chat_store()
 
 
-# Function to format chat history for each user
-def format_chat_history(username):
-    """Format chat history from memory based on the username."""
-    chat_history = user_memory.get(username, [])
-    formatted_history = []
-    for message in chat_history[-10:]:  # Limit to last 10 messages
-        role = "User" if message["role"] == "user" else "Assistant"
-        formatted_history.append(f"{role}: {message['content']}")
-    return "\n".join(formatted_history)
-
-
-def bot_agent(message: str, username: str):
-    """Generate a response for a user using the predefined agent."""
-    # Add the user's message to memory
-    if username not in user_memory:
-        user_memory[username] = []
-    user_memory[username].append({"role": "user", "content": message})
-
-    # Format chat history for the given username
-    chat_history = format_chat_history(username)
-
-    # Replace {chat_history} and {username} in context
-    updated_context = discord_ai_agent_context.replace("{chat_history}", chat_history)
-    updated_context = updated_context.replace("{username}", username)
-
-    # Create the agent and generate a response
-    agent = ReActAgent.from_tools(
+def build_user_agent(username: str):
+    """Build a long-lived agent for one user with its own chat memory."""
+    return ReActAgent.from_tools(
         tools=discord_ai_agent_tools,
         verbose=True,
-        context=updated_context,
+        react_chat_formatter=PromptBuilder.from_context(
+            discord_ai_agent_context.replace("{username}", username),
+            name=f"user:{username}",
+        ),
+        memory=ChatMemoryBuffer.from_defaults(
+            llm=llm,
+            token_limit=memory_token_limit,
+            chat_store=chat_store,
+            chat_store_key=f"user:{username}",
+        ),
         llm=llm,
     )
-    response = agent.chat(message)
 
-    # Add the assistant's response to memory
-    user_memory[username].append({"role": "assistant", "content": response.response})
+
+# One agent per user, built on their first message and evicted when idle
+user_agents = AgentPool(build_user_agent)
+
+
+async def bot_agent(message: str, username: str):
+    """Generate a response for a user using their pooled agent."""
+    if INTENT_ROUTER_ENABLED:
+        # Simple price and news questions skip the ReAct loop
+        answer = await intent_router.aroute(message)
+        if answer is not None:
+            # Keep the turn in the user's history for the agent's next answer
+            await user_agents.aadd_turn(username, message, answer)
+            return answer
+    if STREAM_REPLIES:
+        return user_agents.astream_chat(username, message)
+    response = await user_agents.achat(username, message)
     return response.response
 
 
+# Splits long replies and streams answers into edited messages
+streamer = DiscordStreamer()
+
+
+async def send_reply(channel, received_at: float, response):
+    """Send a finished reply, or stream one whose pieces are still arriving."""
+    if isinstance(response, str):
+        await streamer.send(channel, response)
+    else:
+        await streamer.stream(channel, response, received_at)
+
+
+# Per-user turns: quick follow-ups are merged and excess load is turned away
+request_queue = UserRequestQueue(lambda username, message: bot_agent(message, username))
+
 # Bot setup
 bot = commands.Bot(command_prefix="!", intents=intents)
 
 
+@tasks.loop(seconds=60)
+async def log_queue_metrics():
+    """Log request queue and market data cache metrics for sizing the deployment."""
+    print(f"Request queue metrics: {request_queue.metrics()}")
+    print(f"Reply streaming metrics: {streamer.metrics()}")
+    print(f"Intent router: {intent_router.stats}")
+    print(f"Market data cache: {crypto_tools.market_data.stats()}")
+
+
+@bot.event
+async def on_ready():
+    print(f"Discord AI agent is online as {bot.user}")
+    # Build the index and query engine before the first question needs them
+    warm_degen_trader()
+    # Keep the watchlist's market snapshot fresh for the price tools
+    market_poller.start()
+    # Aggregate and embed news for the crypto_news tool
+    news_indexer.start()
+    if not log_queue_metrics.is_running():
+        log_queue_metrics.start()
+
+
 @bot.event
 async def on_message(message):
-    """Handle new messages and generate responses based on user input."""
+    """Handle new messages and queue a response based on user input."""
     # Ignore messages from the bot or not in the correct channel
     if message.channel.id != channel_id or message.author == bot.user:
         return
@@ -73,11 +122,14 @@ async def on_message(message):
     # Retrieve the username
     username = message.author.name
 
-    # Generate response
-    response = bot_agent(message.content, username)
-
-    # Send the generated response to the same channel
-    await message.channel.send(response)
+    # Queue the message; the response is sent to the same channel when ready.
+    # Time to first token is measured from the latest message of a merged turn.
+    reply = partial(send_reply, message.channel, time.monotonic())
+    if not request_queue.submit(username, message.content, reply):
+        await message.channel.send(
+            f"{message.author.mention} I'm answering a lot of questions right now, "
+            "please try again in a minute."
+        )
 
 
 # Start the bot
@@ -0,0 +1,181 @@
+import statistics
+import time
+from collections import deque
+from typing import AsyncIterator, Dict, List, Optional
+
+from decouple import config
+
+# Discord rejects messages longer than this.
+DISCORD_MESSAGE_LIMIT = 2000
+# Stream agent replies into an edited message instead of sending them when done.
+STREAM_REPLIES = config("STREAM_REPLIES", default=True, cast=bool)
+# Minimum seconds between edits of a streamed message; Discord allows about
+# five edits per five seconds per channel.
+STREAM_EDIT_INTERVAL = config("STREAM_EDIT_INTERVAL", default=1.2, cast=float)
+# Posted as soon as a turn starts and replaced by the reply as it streams in.
+STREAM_PLACEHOLDER = config("STREAM_PLACEHOLDER", default="Thinking...")
+
+
+def split_point(text: str, limit: int = DISCORD_MESSAGE_LIMIT) -> int:
+    """Where to cut text so the head fits in one message, preferring a line break, then a space."""
+    if len(text) <= limit:
+        return len(text)
+    for separator in ("\n", " "):
+        cut = text.rfind(separator, limit // 2, limit)
+        if cut != -1:
+            return cut + 1
+    return limit
+
+
+def split_message(text: str, limit: int = DISCORD_MESSAGE_LIMIT) -> List[str]:
+    """Split text into parts of at most limit characters."""
+    parts = []
+    while text:
+        cut = split_point(text, limit)
+        if text[:cut].strip():
+            parts.append(text[:cut].strip())
+        text = text[cut:]
+    return parts
+
+
+class _StreamedReply:
+    """The messages one streamed reply occupies and the text shown in each."""
+
+    def __init__(self, streamer: "DiscordStreamer", channel):
+        self.streamer = streamer
+        self.channel = channel
+        self.messages = []
+        self.shown: List[str] = []
+        self.text = ""
+        # Characters of text already frozen into earlier, full messages
+        self.offset = 0
+
+    @property
+    def visible(self) -> bool:
+        return self.offset > 0 or bool(self.text.strip())
+
+    async def post_placeholder(self) -> None:
+        self.messages.append(await self.channel.send(self.streamer.placeholder))
+        self.shown.append(self.streamer.placeholder)
+        self.streamer.messages += 1
+
+    async def show(self, content: str) -> None:
+        content = content.strip()
+        if content and content != self.shown[-1]:
+            await self.messages[-1].edit(content=content)
+            self.shown[-1] = content
+            self.streamer.edits += 1
+
+    async def flush(self) -> None:
+        limit = self.streamer.limit
+        while len(self.text) - self.offset > limit:
+            cut = self.offset + split_point(self.text[self.offset :], limit)
+            await self.show(self.text[self.offset : cut])
+            self.offset = cut
+            await self.post_placeholder()
+        await self.show(self.text[self.offset :])
+
+    async def discard(self) -> None:
+        for message in self.messages:
+            try:
+                await message.delete()
+            except Exception as e:
+                print(f"Error deleting placeholder message: {e}")
+
+
+class DiscordStreamer:
+    """
+    Sends agent replies to a Discord channel, split at the 2000-character limit.
+    A streamed reply posts a placeholder right away and edits it in place as
+    the answer arrives, at most once per edit_interval; when it outgrows one
+    message the rest continues in a new one. Tracks the time from the user's
+    message to the first visible token.
+    :param edit_interval: Minimum seconds between edits of a message.
+    :param placeholder: Text shown until the first token arrives.
+    """
+
+    def __init__(
+        self,
+        edit_interval: float = STREAM_EDIT_INTERVAL,
+        placeholder: str = STREAM_PLACEHOLDER,
+        limit: int = DISCORD_MESSAGE_LIMIT,
+    ):
+        self.edit_interval = edit_interval
+        self.placeholder = placeholder
+        self.limit = limit
+        self._first_token_times = deque(maxlen=1000)
+        self._placeholder_times = deque(maxlen=1000)
+        self.replies = 0
+        self.failed = 0
+        self.messages = 0
+        self.edits = 0
+
+    async def send(self, channel, text: str) -> None:
+        """Send a finished reply, split into as many messages as it needs."""
+        for part in split_message(text, self.limit):
+            await channel.send(part)
+            self.messages += 1
+
+    async def stream(
+        self,
+        channel,
+        deltas: AsyncIterator[str],
+        started_at: Optional[float] = None,
+    ) -> str:
+        """
+        Stream a reply into the channel.
+        :param deltas: Pieces of the reply, e.g. AgentPool.astream_chat.
+        :param started_at: time.monotonic() when the user's message arrived;
+            defaults to now.
+        :return: The full reply. If deltas raises, whatever was shown is kept
+            (placeholders alone are deleted) and the error is re-raised.
+        """
+        started_at = time.monotonic() if started_at is None else started_at
+        reply = _StreamedReply(self, channel)
+        await reply.post_placeholder()
+        self._placeholder_times.append(time.monotonic() - started_at)
+        first_token_at = None
+        # The first token is shown as soon as it arrives
+        last_edit = 0.0
+        try:
+            async for delta in deltas:
+                reply.text += delta
+                if time.monotonic() - last_edit >= self.edit_interval:
+                    await reply.flush()
+                    last_edit = time.monotonic()
+                    if first_token_at is None and reply.visible:
+                        first_token_at = last_edit
+            await reply.flush()
+        except Exception:
+            self.failed += 1
+            if reply.visible:
+                await reply.flush()
+            else:
+                await reply.discard()
+            raise
+        finally:
+            if reply.visible:
+                first_token_at = first_token_at or time.monotonic()
+                self._first_token_times.append(first_token_at - started_at)
+        self.replies += 1
+        return reply.text.strip()
+
+    def metrics(self) -> Dict[str, float]:
+        """Return reply counters and time-to-placeholder/first-token latencies."""
+        metrics = {
+            "replies": self.replies,
+            "failed": self.failed,
+            "messages": self.messages,
+            "edits": self.edits,
+        }
+        for name, samples in [
+            ("placeholder", list(self._placeholder_times)),
+            ("first_token", list(self._first_token_times)),
+        ]:
+            metrics[f"{name}_avg_s"] = statistics.fmean(samples) if samples else 0.0
+            metrics[f"{name}_p95_s"] = (
+                statistics.quantiles(samples, n=20, method="inclusive")[18]
+                if len(samples) > 1
+                else 0.0
+            )
+        return metrics
@@ -0,0 +1,212 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from typing import Any, Dict, List, Optional
+
+from decouple import config
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from pydantic import Field, PrivateAttr
+
+EMBEDDING_CACHE_PATH = config(
+    "EMBEDDING_CACHE_PATH", default=os.path.join("storage", "embedding_cache.db")
+)
+# Entries kept on disk; the least recently used ones are evicted first.
+EMBEDDING_CACHE_MAX_ENTRIES = config(
+    "EMBEDDING_CACHE_MAX_ENTRIES", default=20000, cast=int
+)
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text so trivially different strings share a cache entry."""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", text)).strip()
+
+
+class EmbeddingCache:
+    """
+    Disk-backed embedding cache keyed by (model, normalized text), with LRU eviction.
+    :param path: Path of the SQLite database.
+    :param max_entries: Maximum number of cached embeddings.
+    """
+
+    def __init__(
+        self,
+        path: str = EMBEDDING_CACHE_PATH,
+        max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES,
+    ):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)"
+        )
+        self._conn.commit()
+        self._size = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    @staticmethod
+    def key(model_name: str, text: str) -> str:
+        return hashlib.sha256(
+            f"{model_name}\0{normalize_text(text)}".encode("utf-8")
+        ).hexdigest()
+
+    def get_many(self, model_name: str, texts: List[str]) -> List[Optional[Embedding]]:
+        """Look up a batch of texts, returning None for every miss."""
+        keys = [self.key(model_name, text) for text in texts]
+        found: Dict[str, Embedding] = {}
+        with self._lock:
+            # Stay well below SQLite's bound parameter limit.
+            for start in range(0, len(keys), 500):
+                chunk = keys[start : start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN "
+                    f"({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+            if found:
+                with self._conn:
+                    self._conn.executemany(
+                        "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                        [(time.time(), key) for key in found],
+                    )
+            results = [found.get(key) for key in keys]
+            hits = sum(result is not None for result in results)
+            self.hits += hits
+            self.misses += len(results) - hits
+        return results
+
+    def put_many(
+        self, model_name: str, texts: List[str], embeddings: List[Embedding]
+    ) -> None:
+        """Store a batch of embeddings, evicting the least recently used if full."""
+        now = time.time()
+        rows = [
+            (self.key(model_name, text), array("f", embedding).tobytes(), now)
+            for text, embedding in zip(texts, embeddings)
+        ]
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                rows,
+            )
+            self._size += self._conn.total_changes - before
+            if self._size > self.max_entries:
+                # Evict down to 90% so eviction is not paid on every insert.
+                excess = self._size - int(self.max_entries * 0.9)
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN "
+                    "(SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                    (excess,),
+                )
+                self._size -= excess
+
+    def __len__(self) -> int:
+        return self._size
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the current size."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": self._size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class CachedEmbedding(BaseEmbedding):
+    """
+    Wraps an embedding model with an EmbeddingCache, for ingestion and retrieval.
+    Queries and documents share cache entries, so the wrapped model must embed
+    both the same way, as text-embedding-ada-002 does.
+    """
+
+    embed_model: BaseEmbedding = Field(description="The wrapped embedding model.")
+
+    _cache: EmbeddingCache = PrivateAttr()
+
+    def __init__(self, embed_model: BaseEmbedding, cache: EmbeddingCache, **kwargs):
+        kwargs.setdefault("model_name", embed_model.model_name)
+        kwargs.setdefault("embed_batch_size", embed_model.embed_batch_size)
+        super().__init__(embed_model=embed_model, **kwargs)
+        self._cache = cache
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedEmbedding"
+
+    @property
+    def cache(self) -> EmbeddingCache:
+        return self._cache
+
+    def _split_misses(self, texts: List[str]):
+        cached = self._cache.get_many(self.model_name, texts)
+        # Embed each distinct missing text once, even if repeated in the batch.
+        missing = list(
+            dict.fromkeys(t for t, e in zip(texts, cached) if e is None).keys()
+        )
+        return cached, missing
+
+    def _merge(
+        self,
+        texts: List[str],
+        cached: List[Optional[Embedding]],
+        missing: List[str],
+        embeddings: List[Embedding],
+    ) -> List[Embedding]:
+        if missing:
+            self._cache.put_many(self.model_name, missing, embeddings)
+        fresh = dict(zip(missing, embeddings))
+        return [e if e is not None else fresh[t] for t, e in zip(texts, cached)]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        cached, missing = self._split_misses(texts)
+        embeddings = (
+            self.embed_model.get_text_embedding_batch(missing) if missing else []
+        )
+        return self._merge(texts, cached, missing, embeddings)
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        cached, missing = self._split_misses(texts)
+        embeddings = (
+            await self.embed_model.aget_text_embedding_batch(missing) if missing else []
+        )
+        return self._merge(texts, cached, missing, embeddings)
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return self._get_text_embeddings([text])[0]
+
+    async def _aget_text_embedding(self, text: str) -> Embedding:
+        return (await self._aget_text_embeddings([text]))[0]
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        cached, missing = self._split_misses([query])
+        embeddings = [self.embed_model.get_query_embedding(q) for q in missing]
+        return self._merge([query], cached, missing, embeddings)[0]
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        cached, missing = self._split_misses([query])
+        embeddings = [await self.embed_model.aget_query_embedding(q) for q in missing]
+        return self._merge([query], cached, missing, embeddings)[0]
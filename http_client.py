@@ -0,0 +1,255 @@
+import asyncio
+import json
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Coroutine, Dict, Mapping, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+from decouple import config
+
+# Total seconds allowed per attempt, and for establishing the connection.
+HTTP_TIMEOUT = config("HTTP_TIMEOUT", default=10, cast=float)
+HTTP_CONNECT_TIMEOUT = config("HTTP_CONNECT_TIMEOUT", default=5, cast=float)
+HTTP_MAX_RETRIES = config("HTTP_MAX_RETRIES", default=3, cast=int)
+# Retries sleep a random time up to min(backoff_max, backoff_base * 2**attempt).
+HTTP_BACKOFF_BASE = config("HTTP_BACKOFF_BASE", default=0.5, cast=float)
+HTTP_BACKOFF_MAX = config("HTTP_BACKOFF_MAX", default=8, cast=float)
+# Seconds a request may spend waiting between retries, Retry-After included. A
+# Retry-After beyond what is left fails the request instead of retrying early.
+HTTP_RETRY_BUDGET = config("HTTP_RETRY_BUDGET", default=90, cast=float)
+# Keep-alive connections held open per host.
+HTTP_POOL_SIZE = config("HTTP_POOL_SIZE", default=10, cast=int)
+# CoinGecko's public API allows roughly 30 calls per minute.
+COINGECKO_CALLS_PER_MINUTE = config("COINGECKO_CALLS_PER_MINUTE", default=30, cast=int)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class HTTPRequestError(Exception):
+    """Raised when a request still fails after all retries."""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class HTTPResponse:
+    def __init__(self, status: int, headers: Mapping[str, str], body: bytes):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+
+class RateLimiter:
+    """
+    Token bucket allowing bursts of up to `rate` calls, refilled at rate / per
+    calls per second. Only used from the client's event loop.
+    """
+
+    def __init__(self, rate: int, per: float = 60.0):
+        self.rate = rate
+        self.per = per
+        self._tokens = float(rate)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+        self.waited_seconds = 0.0
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.rate,
+                    self._tokens + (now - self._updated) * self.rate / self.per,
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) * self.per / self.rate
+                self.waited_seconds += wait
+                await asyncio.sleep(wait)
+
+
+class AsyncHTTPClient:
+    """
+    Pooled keep-alive HTTP client with timeouts, jittered retries and per-host
+    rate limits.
+    Requests run on a private event loop thread that owns the aiohttp session,
+    so async callers on any loop and sync callers on any thread share one
+    connection pool.
+    :param retry_budget: Seconds one request may wait between retries; a
+        Retry-After is honoured as given as long as it fits.
+    :param rate_limits: Calls per minute allowed per host name.
+    """
+
+    def __init__(
+        self,
+        timeout: float = HTTP_TIMEOUT,
+        connect_timeout: float = HTTP_CONNECT_TIMEOUT,
+        max_retries: int = HTTP_MAX_RETRIES,
+        backoff_base: float = HTTP_BACKOFF_BASE,
+        backoff_max: float = HTTP_BACKOFF_MAX,
+        retry_budget: float = HTTP_RETRY_BUDGET,
+        pool_size: int = HTTP_POOL_SIZE,
+        rate_limits: Optional[Dict[str, int]] = None,
+    ):
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_budget = retry_budget
+        self.pool_size = pool_size
+        self.rate_limits = dict(rate_limits or {})
+        self._limiters: Dict[str, RateLimiter] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._start_lock = threading.Lock()
+        self.stats = {"requests": 0, "retries": 0, "failures": 0}
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=loop.run_forever, name="http-client", daemon=True
+                ).start()
+                self._loop = loop
+        return self._loop
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit_per_host=self.pool_size, keepalive_timeout=60
+                ),
+                timeout=aiohttp.ClientTimeout(
+                    total=self.timeout, connect=self.connect_timeout
+                ),
+            )
+        return self._session
+
+    def _backoff(self, attempt: int, retry_after: Optional[str]) -> float:
+        """Seconds before the next attempt: the server's Retry-After, else jitter."""
+        if retry_after:
+            retry_after = retry_after.strip()
+            if retry_after.isdigit():
+                return float(retry_after)
+            try:
+                return max(
+                    0.0, parsedate_to_datetime(retry_after).timestamp() - time.time()
+                )
+            except (TypeError, ValueError):
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+    async def _request(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Mapping[str, Any]],
+        headers: Optional[Mapping[str, str]],
+    ) -> HTTPResponse:
+        host = urlsplit(url).hostname or ""
+        limiter = self._limiters.get(host)
+        if limiter is None and host in self.rate_limits:
+            limiter = self._limiters[host] = RateLimiter(self.rate_limits[host])
+        session = self._get_session()
+        budget = self.retry_budget
+        for attempt in range(self.max_retries + 1):
+            if limiter is not None:
+                await limiter.acquire()
+            self.stats["requests"] += 1
+            retry_after = None
+            try:
+                async with session.request(
+                    method, url, params=params, headers=headers
+                ) as response:
+                    body = await response.read()
+                    if response.status not in RETRY_STATUSES:
+                        return HTTPResponse(response.status, response.headers, body)
+                    error = HTTPRequestError(
+                        f"{method} {url} returned {response.status}", response.status
+                    )
+                    retry_after = response.headers.get("Retry-After")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = HTTPRequestError(f"{method} {url} failed: {e!r}")
+            if attempt == self.max_retries:
+                break
+            delay = self._backoff(attempt, retry_after)
+            if delay > budget:
+                # Retrying before the server allows it only burns rate limit
+                break
+            budget -= delay
+            self.stats["retries"] += 1
+            await asyncio.sleep(delay)
+        self.stats["failures"] += 1
+        raise error
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Mapping[str, Any]] = None,
+        headers: Optional[Mapping[str, str]] = None,
+    ) -> HTTPResponse:
+        """
+        Send a request, retrying connection errors, timeouts, 429 and 5xx,
+        after the response's Retry-After if it has one.
+        Other statuses are returned to the caller.
+        :raises HTTPRequestError: If the last attempt still failed.
+        """
+        return await self.submit(self._request(method, url, params, headers))
+
+    async def get_json(
+        self,
+        url: str,
+        params: Optional[Mapping[str, Any]] = None,
+        headers: Optional[Mapping[str, str]] = None,
+    ) -> Any:
+        """
+        GET a URL and decode its JSON body.
+        :raises HTTPRequestError: On failure or a non-2xx status.
+        """
+        response = await self.request("GET", url, params=params, headers=headers)
+        if not 200 <= response.status < 300:
+            raise HTTPRequestError(
+                f"GET {url} returned {response.status}", response.status
+            )
+        return response.json()
+
+    async def submit(self, coro: Coroutine) -> Any:
+        """Run a coroutine on the client's loop and await it from any loop."""
+        loop = self._ensure_loop()
+        if asyncio.get_running_loop() is loop:
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+    def run_sync(self, coro: Coroutine) -> Any:
+        """Run a coroutine on the client's loop from synchronous code and wait."""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop()).result()
+
+    async def _close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def close(self) -> None:
+        """Close pooled connections and stop the client's loop."""
+        with self._start_lock:
+            loop, self._loop = self._loop, None
+        if loop is not None:
+            asyncio.run_coroutine_threadsafe(self._close(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+
+
+http_client = AsyncHTTPClient(
+    rate_limits={"api.coingecko.com": COINGECKO_CALLS_PER_MINUTE}
+)
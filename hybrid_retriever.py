@@ -0,0 +1,104 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from decouple import config
+from llama_index.core.base.base_retriever import BaseRetriever
+from llama_index.core.schema import NodeWithScore, QueryBundle
+
+HYBRID_TOP_K = config("HYBRID_TOP_K", default=8, cast=int)
+# Rank offset of reciprocal rank fusion; larger values flatten the rank curve.
+HYBRID_RRF_K = config("HYBRID_RRF_K", default=60, cast=int)
+
+# Metadata key keeping a node's vector similarity once its score is the fused one.
+VECTOR_SCORE_KEY = "vector_score"
+
+# Runs the keyword and vector lookups of a query side by side.
+retrieval_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="retrieval")
+
+
+def reciprocal_rank_fusion(
+    result_lists: List[List[NodeWithScore]], top_k: int, k: int = HYBRID_RRF_K
+) -> List[NodeWithScore]:
+    """
+    Fuse ranked result lists: each node scores sum(1 / (k + rank)) over the lists
+    it appears in, so nodes found by both retrievers rise to the top.
+    """
+    fused: Dict[str, float] = {}
+    nodes: Dict[str, NodeWithScore] = {}
+    for results in result_lists:
+        for rank, result in enumerate(results, start=1):
+            node_id = result.node.node_id
+            fused[node_id] = fused.get(node_id, 0.0) + 1.0 / (k + rank)
+            nodes.setdefault(node_id, result)
+    ranked = sorted(fused, key=fused.get, reverse=True)[:top_k]
+    return [NodeWithScore(node=nodes[i].node, score=fused[i]) for i in ranked]
+
+
+def keep_vector_scores(nodes: List[NodeWithScore]) -> List[NodeWithScore]:
+    """
+    Store each node's vector similarity in its metadata, hidden from the LLM
+    and the embedding, so it survives fusion for the rerank stage.
+    """
+    for result in nodes:
+        node = result.node
+        node.metadata[VECTOR_SCORE_KEY] = result.score
+        for excluded in (
+            node.excluded_embed_metadata_keys,
+            node.excluded_llm_metadata_keys,
+        ):
+            if VECTOR_SCORE_KEY not in excluded:
+                excluded.append(VECTOR_SCORE_KEY)
+    return nodes
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Runs a vector and a BM25 retriever concurrently and fuses their results by
+    reciprocal rank. Fused nodes keep their vector similarity in metadata under
+    VECTOR_SCORE_KEY.
+    :param vector_retriever: Dense retriever, usually over the Qdrant index.
+    :param bm25_retriever: Keyword retriever, usually a BM25IndexRetriever.
+    :param similarity_top_k: Number of fused nodes returned.
+    :param rrf_k: Rank offset of reciprocal rank fusion.
+    """
+
+    def __init__(
+        self,
+        vector_retriever: BaseRetriever,
+        bm25_retriever: BaseRetriever,
+        similarity_top_k: int = HYBRID_TOP_K,
+        rrf_k: int = HYBRID_RRF_K,
+    ):
+        self.vector_retriever = vector_retriever
+        self.bm25_retriever = bm25_retriever
+        self.similarity_top_k = similarity_top_k
+        self.rrf_k = rrf_k
+        super().__init__(callback_manager=vector_retriever.callback_manager)
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        bm25_future = retrieval_executor.submit(
+            self.bm25_retriever.retrieve, query_bundle
+        )
+        vector_nodes = keep_vector_scores(self.vector_retriever.retrieve(query_bundle))
+        return reciprocal_rank_fusion(
+            [vector_nodes, bm25_future.result()], self.similarity_top_k, self.rrf_k
+        )
+
+    async def _aretrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        # The Qdrant store is built without an async client, so both lookups
+        # run on the executor rather than through aretrieve.
+        loop = asyncio.get_running_loop()
+        vector_nodes, bm25_nodes = await asyncio.gather(
+            loop.run_in_executor(
+                retrieval_executor, self.vector_retriever.retrieve, query_bundle
+            ),
+            loop.run_in_executor(
+                retrieval_executor, self.bm25_retriever.retrieve, query_bundle
+            ),
+        )
+        return reciprocal_rank_fusion(
+            [keep_vector_scores(vector_nodes), bm25_nodes],
+            self.similarity_top_k,
+            self.rrf_k,
+        )
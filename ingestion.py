@@ -0,0 +1,197 @@
+import hashlib
+import json
+import os
+import time
+import uuid
+from typing import Dict, Iterable, List, Optional
+
+from decouple import config
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.node_parser import NodeParser
+from llama_index.core.schema import BaseNode, Document, MetadataMode
+from llama_index.core.vector_stores.types import BasePydanticVectorStore
+
+from bm25_index import BM25Index
+
+
+# Directory holding the per-collection ingestion manifests.
+INGESTION_STORAGE_DIR = config("INGESTION_STORAGE_DIR", default="storage")
+# Nodes embedded and upserted per batch; the manifest is checkpointed after each.
+INGESTION_BATCH_SIZE = config("INGESTION_BATCH_SIZE", default=64, cast=int)
+
+# Namespace for the content-addressed node ids, which Qdrant needs to be UUIDs.
+NODE_ID_NAMESPACE = uuid.UUID("5b0c2e1a-8f0e-4a47-9d7e-0f3c4f6f2d11")
+
+
+class IngestionManifest:
+    """
+    Records, per document, its content hash and the ids of the nodes already in
+    the vector store. Saved atomically after every batch so a crashed run resumes.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.documents: Dict[str, Dict] = {}
+        self.embed_seconds_per_node = 0.0
+        if os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            self.documents = data.get("documents", {})
+            self.embed_seconds_per_node = data.get("embed_seconds_per_node", 0.0)
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {
+                    "documents": self.documents,
+                    "embed_seconds_per_node": self.embed_seconds_per_node,
+                },
+                f,
+            )
+        os.replace(tmp_path, self.path)
+
+
+class IncrementalIngestion:
+    """
+    Content-hashed, resumable ingestion into a vector store.
+    Node ids are derived from the document id and the node's embedded text, so an
+    unchanged chunk keeps its id and is never embedded twice. Documents whose
+    source is gone have their nodes deleted.
+    An optional keyword index is kept in step with the vector store.
+    :param vector_store: Vector store the nodes are upserted into.
+    :param embed_model: Embedding model used for new or changed nodes.
+    :param node_parser: Parser splitting documents into nodes.
+    :param manifest_path: Path of the JSON manifest for this collection.
+    :param batch_size: Number of nodes embedded and upserted per checkpoint.
+    :param keyword_index: BM25 index receiving the same nodes as the vector store.
+    """
+
+    def __init__(
+        self,
+        vector_store: BasePydanticVectorStore,
+        embed_model: BaseEmbedding,
+        node_parser: NodeParser,
+        manifest_path: str,
+        batch_size: int = INGESTION_BATCH_SIZE,
+        keyword_index: Optional[BM25Index] = None,
+    ):
+        self.vector_store = vector_store
+        self.embed_model = embed_model
+        self.node_parser = node_parser
+        self.manifest = IngestionManifest(manifest_path)
+        self.batch_size = batch_size
+        self.keyword_index = keyword_index
+
+    @staticmethod
+    def node_id(doc_id: str, node: BaseNode) -> str:
+        """Return the content-addressed id for a node of a document."""
+        text = node.get_content(metadata_mode=MetadataMode.EMBED)
+        digest = hashlib.sha256(f"{doc_id}\0{text}".encode("utf-8")).hexdigest()
+        return str(uuid.uuid5(NODE_ID_NAMESPACE, digest))
+
+    def _parse(self, document: Document) -> List[BaseNode]:
+        nodes = {}
+        for node in self.node_parser.get_nodes_from_documents([document]):
+            node.id_ = self.node_id(document.doc_id, node)
+            # Identical chunks within a document collapse into one point.
+            nodes.setdefault(node.id_, node)
+        return list(nodes.values())
+
+    def _embed_and_add(self, nodes: List[BaseNode], entry: Dict, stats: Dict) -> None:
+        for start in range(0, len(nodes), self.batch_size):
+            batch = nodes[start : start + self.batch_size]
+            embed_start = time.perf_counter()
+            embeddings = self.embed_model.get_text_embedding_batch(
+                [n.get_content(metadata_mode=MetadataMode.EMBED) for n in batch]
+            )
+            stats["embed_seconds"] += time.perf_counter() - embed_start
+            for node, embedding in zip(batch, embeddings):
+                node.embedding = embedding
+            self.vector_store.add(batch)
+            if self.keyword_index is not None:
+                self.keyword_index.add(batch)
+            entry["nodes"].extend(n.node_id for n in batch)
+            stats["embedded"] += len(batch)
+            self.manifest.save()
+
+    def _delete_nodes(self, node_ids: List[str], stats: Dict) -> None:
+        if node_ids:
+            self.vector_store.delete_nodes(node_ids=node_ids)
+            if self.keyword_index is not None:
+                self.keyword_index.delete(node_ids)
+            stats["deleted"] += len(node_ids)
+
+    def _backfill_keyword_index(self, node_ids: List[str], stats: Dict) -> None:
+        # Nodes stored before the keyword index existed are read back from the
+        # vector store instead of being parsed and embedded again.
+        if self.keyword_index is None:
+            return
+        missing = [i for i in node_ids if i not in self.keyword_index]
+        if missing:
+            self.keyword_index.add(self.vector_store.get_nodes(node_ids=missing))
+            stats["keyword_backfilled"] += len(missing)
+
+    def run(self, documents: Iterable[Document]) -> Dict:
+        """
+        Sync the vector store with the given documents, which must be the complete
+        set: documents missing from it are removed from the store.
+        :return: Counts of embedded, reused and deleted nodes plus timings.
+        """
+        start = time.perf_counter()
+        stats = {
+            "documents": 0,
+            "documents_skipped": 0,
+            "embedded": 0,
+            "reused": 0,
+            "deleted": 0,
+            "keyword_backfilled": 0,
+            "embed_seconds": 0.0,
+        }
+        seen = set()
+        for document in documents:
+            doc_id = document.doc_id
+            seen.add(doc_id)
+            stats["documents"] += 1
+            entry = self.manifest.documents.get(doc_id)
+            if entry and entry["complete"] and entry["hash"] == document.hash:
+                stats["documents_skipped"] += 1
+                stats["reused"] += len(entry["nodes"])
+                self._backfill_keyword_index(entry["nodes"], stats)
+                continue
+
+            nodes = self._parse(document)
+            new_ids = {n.node_id for n in nodes}
+            # Nodes from a previous version or an interrupted run.
+            old_ids = set(entry["nodes"]) if entry else set()
+            self._delete_nodes(sorted(old_ids - new_ids), stats)
+            kept = [n.node_id for n in nodes if n.node_id in old_ids]
+            stats["reused"] += len(kept)
+            self._backfill_keyword_index(kept, stats)
+
+            entry = {"hash": document.hash, "nodes": kept, "complete": False}
+            self.manifest.documents[doc_id] = entry
+            self.manifest.save()
+            self._embed_and_add(
+                [n for n in nodes if n.node_id not in old_ids], entry, stats
+            )
+            entry["complete"] = True
+            self.manifest.save()
+
+        for doc_id in [d for d in self.manifest.documents if d not in seen]:
+            self._delete_nodes(self.manifest.documents.pop(doc_id)["nodes"], stats)
+        if stats["embedded"]:
+            self.manifest.embed_seconds_per_node = (
+                stats["embed_seconds"] / stats["embedded"]
+            )
+        self.manifest.save()
+
+        stats["seconds"] = time.perf_counter() - start
+        stats["embed_seconds_saved"] = (
+            stats["reused"] * self.manifest.embed_seconds_per_node
+        )
+        return stats
@@ -0,0 +1,222 @@
+import re
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from decouple import config
+from llama_index.core.base.base_query_engine import BaseQueryEngine
+from llama_index.core.llms import LLM
+
+from coin_resolver import CoinIndex
+
+# Answer simple price and news questions without the ReAct agent.
+INTENT_ROUTER_ENABLED = config("INTENT_ROUTER_ENABLED", default=True, cast=bool)
+# Longer messages always go to the agent.
+INTENT_ROUTER_MAX_WORDS = config("INTENT_ROUTER_MAX_WORDS", default=16, cast=int)
+# Phrase routed answers with one LLM call instead of a template.
+INTENT_ROUTER_LLM_ANSWERS = config(
+    "INTENT_ROUTER_LLM_ANSWERS", default=False, cast=bool
+)
+# Small model asked "price, news or other" when a message names a coin but no
+# intent; empty leaves those messages to the agent.
+INTENT_CLASSIFIER_MODEL = config("INTENT_CLASSIFIER_MODEL", default="")
+
+PRICE = "price"
+NEWS = "news"
+
+_CASHTAG = re.compile(r"\$([a-z][a-z0-9]{1,14})\b")
+_WORD = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+_PRICE_WORDS = re.compile(
+    r"\b(price|prices|worth|cost|trading at|how much|market cap|mcap|volume|"
+    r"pumping|dumping|up or down|doing)\b"
+)
+_NEWS_WORDS = re.compile(
+    r"\b(news|headlines?|latest on|what'?s happening|what happened|updates? on)\b"
+)
+# Advice, opinions and comparisons need the agent's reasoning and tools.
+_AGENT_WORDS = re.compile(
+    r"\b(should|buy|sell|ape|hold|predict\w*|why|compare|vs|versus|better|best|"
+    r"recommend\w*|strategy|entry|target|explain|think|opinion|if)\b"
+)
+# Tickers of preferred coins that are also everyday words.
+_COMMON_WORDS = {"link"}
+
+ANSWER_PROMPT = (
+    "You are a degen crypto trader answering on Discord. Answer the question in "
+    "one or two short sentences using only this data.\n"
+    "Data:\n{data}\n"
+    "Question: {question}\n"
+    "Answer: "
+)
+CLASSIFIER_PROMPT = (
+    "Is this crypto chat message asking for a coin's current price or market "
+    "data (price), for recent news (news), or something else (other)? Reply "
+    "with one word.\nMessage: {message}\nIntent: "
+)
+
+
+def format_usd(value: Optional[float]) -> Optional[str]:
+    if value is None:
+        return None
+    if abs(value) >= 1:
+        return f"${value:,.2f}"
+    return "$" + f"{value:.10f}".rstrip("0").rstrip(".")
+
+
+def format_market(market: Dict) -> str:
+    """One line per coin from a CoinGecko /coins/markets entry."""
+    if "error" in market:
+        return f"- {market.get('query')}: no coin matches this ticker or name"
+    name = market.get("name") or market["id"]
+    symbol = (market.get("symbol") or "").upper()
+    parts = [
+        f"- **{symbol or name}** ({name}): {format_usd(market.get('current_price'))}"
+    ]
+    change = market.get("price_change_percentage_24h")
+    if change is not None:
+        parts.append(f"24h {change:+.2f}%")
+    for label, key in [("volume", "total_volume"), ("market cap", "market_cap")]:
+        if market.get(key):
+            parts.append(f"{label} {format_usd(market[key])}")
+    return ", ".join(parts)
+
+
+class IntentRouter:
+    """
+    Routes simple price and news questions straight to the tools, skipping
+    the ReAct agent's Thought/Action round-trips.
+    Cashtags and the tickers, names and ids of preferred coins mark coins;
+    keyword rules pick the intent, and an optional classifier decides when
+    a message names coins but no intent. Anything else, including advice,
+    comparisons and long messages, returns None for the agent to answer.
+    :param tools: CryptoTools fetching market data and resolving coins.
+    :param news_engine: Query engine answering with recent headlines.
+    :param llm: Phrases routed answers in one call; None uses templates.
+    :param classifier: Returns PRICE, NEWS or None for an ambiguous message.
+    """
+
+    def __init__(
+        self,
+        tools,
+        news_engine: BaseQueryEngine,
+        llm: Optional[LLM] = None,
+        classifier: Optional[Callable[[str], Awaitable[Optional[str]]]] = None,
+        max_words: int = INTENT_ROUTER_MAX_WORDS,
+    ):
+        self.tools = tools
+        self.news_engine = news_engine
+        self.llm = llm
+        self.classifier = classifier
+        self.max_words = max_words
+        self.preferred = set(tools.coin_resolver.preferred)
+        self._known: Dict[str, str] = {}
+        self._known_index: Optional[CoinIndex] = None
+        self.stats = {"messages": 0, PRICE: 0, NEWS: 0, "agent": 0, "llm_calls": 0}
+
+    def _known_coins(self) -> Dict[str, str]:
+        """Ids, tickers and compact names of the preferred coins, by the index in use."""
+        index = self.tools.coin_resolver.index
+        if index is not self._known_index:
+            known = {coin_id: coin_id for coin_id in self.preferred}
+            for table in (index.by_symbol, index.by_name):
+                for key, coin_id in table.items():
+                    if coin_id in self.preferred and key not in _COMMON_WORDS:
+                        known[key] = coin_id
+            self._known, self._known_index = known, index
+        return self._known
+
+    def _mentions(self, text: str) -> Tuple[List[str], List[str]]:
+        coins = [f"${tag}" for tag in _CASHTAG.findall(text)]
+        known = self._known_coins()
+        words = _WORD.findall(_CASHTAG.sub(" ", text))
+        other = []
+        for word in words:
+            coin_id = known.get(word)
+            if coin_id is None:
+                other.append(word)
+            elif coin_id not in coins:
+                coins.append(coin_id)
+        # Two-word names such as "shiba inu" are indexed without the space
+        for pair in zip(words, words[1:]):
+            coin_id = known.get("".join(pair))
+            if coin_id and coin_id not in coins:
+                coins.append(coin_id)
+        return coins, other
+
+    def classify(self, message: str) -> Tuple[Optional[str], List[str]]:
+        """
+        Pick the intent with the keyword rules.
+        :return: PRICE or NEWS and the coins mentioned; None and no coins if
+            the agent should answer; None and the coins if only the classifier
+            can tell.
+        """
+        text = message.lower()
+        if len(text.split()) > self.max_words or _AGENT_WORDS.search(text):
+            return None, []
+        coins, other = self._mentions(text)
+        price, news = bool(_PRICE_WORDS.search(text)), bool(_NEWS_WORDS.search(text))
+        if news and not price:
+            return NEWS, coins
+        if not coins or (price and news):
+            return None, []
+        # A bare list of coins, e.g. "$PEPE $WIF?", asks for prices too
+        if price or not other:
+            return PRICE, coins
+        return None, coins
+
+    async def _price(self, coins: List[str]) -> Optional[str]:
+        markets = await self.tools.afetch_coingecko_market_data(coins)
+        if not markets or all("error" in m for m in markets):
+            return None
+        return "\n".join(format_market(m) for m in markets)
+
+    async def _news(self, message: str) -> Optional[str]:
+        response = await self.news_engine.aquery(message)
+        return str(response) if response.source_nodes else None
+
+    async def aroute(self, message: str) -> Optional[str]:
+        """Answer a simple price or news question, or return None for the agent."""
+        self.stats["messages"] += 1
+        intent, coins = self.classify(message)
+        if intent is None and coins and self.classifier is not None:
+            self.stats["llm_calls"] += 1
+            try:
+                intent = await self.classifier(message)
+            except Exception as e:
+                print(f"Error classifying message, leaving it to the agent: {e}")
+        data = None
+        try:
+            if intent == PRICE:
+                data = await self._price(coins)
+            elif intent == NEWS:
+                data = await self._news(message)
+        except Exception as e:
+            print(f"Error answering routed {intent} question: {e}")
+        if data is None:
+            self.stats["agent"] += 1
+            return None
+        self.stats[intent] += 1
+        heading = (
+            "Here's the market right now:" if intent == PRICE else "Latest headlines:"
+        )
+        templated = f"{heading}\n{data}"
+        if self.llm is None:
+            return templated
+        self.stats["llm_calls"] += 1
+        try:
+            response = await self.llm.acomplete(
+                ANSWER_PROMPT.format(data=data, question=message)
+            )
+        except Exception as e:
+            print(f"Error phrasing routed {intent} answer: {e}")
+            return templated
+        return response.text.strip()
+
+
+def llm_classifier(llm: LLM) -> Callable[[str], Awaitable[Optional[str]]]:
+    """A classifier asking a small model for the intent in one short completion."""
+
+    async def classify(message: str) -> Optional[str]:
+        response = await llm.acomplete(CLASSIFIER_PROMPT.format(message=message))
+        label = response.text.strip().lower()
+        return label if label in (PRICE, NEWS) else None
+
+    return classify
@@ -0,0 +1,130 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from decouple import config
+
+# Seconds a coin's market data is served from the cache.
+MARKET_DATA_TTL = config("MARKET_DATA_TTL", default=60, cast=float)
+MARKET_DATA_MAX_ENTRIES = config("MARKET_DATA_MAX_ENTRIES", default=2000, cast=int)
+# CoinGecko returns at most 250 coins per /coins/markets page.
+MARKET_DATA_BATCH_SIZE = config("MARKET_DATA_BATCH_SIZE", default=250, cast=int)
+
+MarketsFetcher = Callable[[List[str]], Awaitable[Optional[List[Dict]]]]
+
+
+def normalize_coin_ids(coin_ids: Iterable[str]) -> List[str]:
+    """Lowercase, strip and de-duplicate ids; comma-separated strings are split."""
+    ids = []
+    for coin_id in coin_ids:
+        ids.extend(part.strip().lower() for part in coin_id.split(","))
+    return list(dict.fromkeys(i for i in ids if i))
+
+
+class MarketDataCache:
+    """
+    TTL cache in front of a batched /coins/markets fetcher.
+    Misses of one call are fetched in one upstream request, and concurrent calls
+    wanting the same coin share one in-flight request. Coins the upstream does
+    not know are cached as missing too, so a bad id is not refetched every call.
+    Confined to one event loop; CryptoTools runs it on the HTTP client's loop.
+    :param fetch: Coroutine fetching market data for a list of coin ids.
+    """
+
+    def __init__(
+        self,
+        fetch: MarketsFetcher,
+        ttl: float = MARKET_DATA_TTL,
+        max_entries: int = MARKET_DATA_MAX_ENTRIES,
+        batch_size: int = MARKET_DATA_BATCH_SIZE,
+    ):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.batch_size = batch_size
+        self._entries: "OrderedDict[str, Tuple[float, Optional[Dict]]]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._started = time.monotonic()
+        self.requested = 0
+        self.hits = 0
+        self.joined = 0
+        self.upstream_calls = 0
+
+    def _fresh(self, coin_id: str) -> bool:
+        entry = self._entries.get(coin_id)
+        return entry is not None and time.monotonic() - entry[0] < self.ttl
+
+    def _store(self, coin_id: str, data: Optional[Dict]) -> None:
+        self._entries[coin_id] = (time.monotonic(), data)
+        self._entries.move_to_end(coin_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def _fetch_batch(self, coin_ids: List[str]) -> None:
+        self.upstream_calls += 1
+        results = None
+        try:
+            results = await self.fetch(coin_ids)
+        except Exception as e:
+            print(f"Error fetching market data: {e}")
+        finally:
+            by_id = {market["id"]: market for market in results or []}
+            for coin_id in coin_ids:
+                # A failed fetch is not cached, so the next call retries it.
+                if results is not None:
+                    self._store(coin_id, by_id.get(coin_id))
+                future = self._in_flight.pop(coin_id)
+                if not future.done():
+                    future.set_result(by_id.get(coin_id))
+
+    async def get(self, coin_ids: Iterable[str]) -> List[Dict]:
+        """
+        Return market data for the coins in the order given, skipping unknown
+        coins and coins whose fetch failed.
+        """
+        coin_ids = normalize_coin_ids(coin_ids)
+        self.requested += len(coin_ids)
+        loop = asyncio.get_running_loop()
+        pending: Dict[str, asyncio.Future] = {}
+        missing = []
+        for coin_id in coin_ids:
+            if self._fresh(coin_id):
+                self.hits += 1
+            elif coin_id in self._in_flight:
+                self.joined += 1
+                pending[coin_id] = self._in_flight[coin_id]
+            else:
+                missing.append(coin_id)
+                pending[coin_id] = self._in_flight[coin_id] = loop.create_future()
+        await asyncio.gather(
+            *(
+                self._fetch_batch(missing[i : i + self.batch_size])
+                for i in range(0, len(missing), self.batch_size)
+            )
+        )
+        markets = []
+        for coin_id in coin_ids:
+            if coin_id in pending:
+                # Shielded so a cancelled joiner does not cancel the fetch it shares.
+                data = await asyncio.shield(pending[coin_id])
+            else:
+                data = self._entries.get(coin_id, (0.0, None))[1]
+            if data is not None:
+                markets.append(data)
+        return markets
+
+    def stats(self) -> Dict[str, float]:
+        """Return hit rate and how many upstream calls batching and caching saved."""
+        hours = max(time.monotonic() - self._started, 1e-9) / 3600
+        # Without the cache every requested coin would be one upstream call.
+        saved = self.requested - self.upstream_calls
+        return {
+            "entries": len(self._entries),
+            "requested": self.requested,
+            "hit_rate": self.hits / self.requested if self.requested else 0.0,
+            "joined_in_flight": self.joined,
+            "upstream_calls": self.upstream_calls,
+            "upstream_calls_saved": saved,
+            "upstream_calls_saved_per_hour": saved / hours,
+        }
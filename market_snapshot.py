@@ -0,0 +1,311 @@
+import asyncio
+import bisect
+import json
+import os
+import random
+import threading
+import time
+from array import array
+from typing import Any, Dict, List, Optional
+
+from decouple import Csv, config
+
+MARKET_WATCHLIST_COINS = config(
+    "MARKET_WATCHLIST_COINS",
+    default="bitcoin,ethereum,solana,dogecoin,shiba-inu,pepe,dogwifcoin,bonk",
+    cast=Csv(),
+)
+MARKET_WATCHLIST_SYMBOLS = config(
+    "MARKET_WATCHLIST_SYMBOLS",
+    default="BTCUSDT,ETHUSDT,SOLUSDT,DOGEUSDT,PEPEUSDT",
+    cast=Csv(),
+)
+MARKET_POLL_INTERVAL = config("MARKET_POLL_INTERVAL", default=60, cast=float)
+# Samples kept per coin or symbol; a day at the default poll interval.
+MARKET_SERIES_LENGTH = config("MARKET_SERIES_LENGTH", default=1440, cast=int)
+MARKET_SNAPSHOT_DIR = config(
+    "MARKET_SNAPSHOT_DIR", default=os.path.join("storage", "market")
+)
+# Snapshot entries older than this are not served; the tools fetch live instead.
+MARKET_SNAPSHOT_MAX_AGE = config(
+    "MARKET_SNAPSHOT_MAX_AGE", default=2 * MARKET_POLL_INTERVAL, cast=float
+)
+
+
+class PriceSeries:
+    """
+    Rolling (timestamp, price) series in two flat float arrays.
+    Trimmed in bulk once it holds twice max_length samples, so appends stay O(1)
+    amortized.
+    """
+
+    def __init__(self, max_length: int = MARKET_SERIES_LENGTH):
+        self.max_length = max_length
+        self.timestamps = array("d")
+        self.prices = array("d")
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def append(self, timestamp: float, price: float) -> None:
+        self.timestamps.append(timestamp)
+        self.prices.append(price)
+        if len(self.timestamps) >= 2 * self.max_length:
+            del self.timestamps[: -self.max_length]
+            del self.prices[: -self.max_length]
+
+    def latest(self) -> Optional[float]:
+        return self.prices[-1] if self.prices else None
+
+    def window(self, seconds: float) -> array:
+        """Return the prices of the last `seconds`, oldest first."""
+        start = bisect.bisect_left(self.timestamps, time.time() - seconds)
+        return self.prices[start:]
+
+    def to_bytes(self) -> bytes:
+        interleaved = array("d")
+        for timestamp, price in zip(self.timestamps, self.prices):
+            interleaved.extend((timestamp, price))
+        return interleaved.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes, max_length: int) -> "PriceSeries":
+        interleaved = array("d")
+        # Ignore a partly written trailing sample.
+        interleaved.frombytes(data[: len(data) - len(data) % 16])
+        series = cls(max_length)
+        series.timestamps = interleaved[0::2][-max_length:]
+        series.prices = interleaved[1::2][-max_length:]
+        return series
+
+
+class MarketSnapshotStore:
+    """
+    Latest market data per CoinGecko coin id and Binance symbol, plus a rolling
+    price series for each, in memory and on disk.
+    Lookups are dict reads. Each entry keeps when it was last fetched, so one
+    source failing lets its entries go stale while the other stays fresh.
+    Each series is an append-only file of packed (timestamp, price) doubles,
+    rewritten when it grows past twice its length.
+    :param directory: Where snapshot.json and the series files are kept.
+    :param series_length: Samples kept per series.
+    """
+
+    def __init__(
+        self,
+        directory: str = MARKET_SNAPSHOT_DIR,
+        series_length: int = MARKET_SERIES_LENGTH,
+    ):
+        self.directory = directory
+        self.series_length = series_length
+        self._lock = threading.Lock()
+        self.coins: Dict[str, Dict] = {}
+        self.symbols: Dict[str, Dict] = {}
+        self.updated_at = 0.0
+        # Fetch time per "coin:<id>" and "symbol:<SYMBOL>", like the series keys
+        self.fetched_at: Dict[str, float] = {}
+        self.series: Dict[str, PriceSeries] = {}
+        self._load()
+
+    def _series_path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key.replace(':', '-')}.bin")
+
+    def _load(self) -> None:
+        snapshot_path = os.path.join(self.directory, "snapshot.json")
+        if not os.path.exists(snapshot_path):
+            return
+        with open(snapshot_path) as f:
+            data = json.load(f)
+        self.coins = data.get("coins", {})
+        self.symbols = data.get("symbols", {})
+        self.updated_at = data.get("updated_at", 0.0)
+        # Snapshots written before per-entry times date everything to the last poll
+        self.fetched_at = data.get("fetched_at") or {
+            key: self.updated_at
+            for key in [f"coin:{c}" for c in self.coins]
+            + [f"symbol:{s}" for s in self.symbols]
+        }
+        for key in [f"coin:{c}" for c in self.coins] + [
+            f"symbol:{s}" for s in self.symbols
+        ]:
+            path = self._series_path(key)
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    self.series[key] = PriceSeries.from_bytes(
+                        f.read(), self.series_length
+                    )
+
+    def get_coin(
+        self, coin_id: str, max_age: float = MARKET_SNAPSHOT_MAX_AGE
+    ) -> Optional[Dict]:
+        """Return the latest market data of a coin, if fetched within max_age."""
+        if self.age(f"coin:{coin_id}") > max_age:
+            return None
+        return self.coins.get(coin_id)
+
+    def get_symbol(
+        self, symbol: str, max_age: float = MARKET_SNAPSHOT_MAX_AGE
+    ) -> Optional[Dict]:
+        """Return the latest ticker of a symbol, if fetched within max_age."""
+        if self.age(f"symbol:{symbol}") > max_age:
+            return None
+        return self.symbols.get(symbol)
+
+    def age(self, key: Optional[str] = None) -> float:
+        """
+        Seconds since the last update, or since the entry under key, "coin:<id>"
+        or "symbol:<SYMBOL>", was fetched.
+        """
+        if key is None:
+            return time.time() - self.updated_at
+        return time.time() - self.fetched_at.get(key, 0.0)
+
+    def update(
+        self,
+        coins: List[Dict],
+        symbols: List[Dict],
+        timestamp: Optional[float] = None,
+    ) -> None:
+        """
+        Record a poll: CoinGecko /coins/markets entries and Binance ticker prices.
+        Only the entries passed are marked fresh; pass an empty list for a source
+        whose fetch failed.
+        """
+        timestamp = timestamp or time.time()
+        samples = {}
+        with self._lock:
+            for market in coins:
+                self.coins[market["id"]] = market
+                self.fetched_at[f"coin:{market['id']}"] = timestamp
+                if market.get("current_price") is not None:
+                    samples[f"coin:{market['id']}"] = float(market["current_price"])
+            for ticker in symbols:
+                self.symbols[ticker["symbol"]] = ticker
+                self.fetched_at[f"symbol:{ticker['symbol']}"] = timestamp
+                samples[f"symbol:{ticker['symbol']}"] = float(ticker["price"])
+            for key, price in samples.items():
+                series = self.series.setdefault(key, PriceSeries(self.series_length))
+                series.append(timestamp, price)
+            self.updated_at = timestamp
+        self._save(samples, timestamp)
+
+    def _save(self, samples: Dict[str, float], timestamp: float) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        for key, price in samples.items():
+            path = self._series_path(key)
+            series = self.series[key]
+            if len(series) == 1 or len(series) == self.series_length:
+                # First sample, or the series was just trimmed: rewrite the file.
+                with open(path, "wb") as f:
+                    f.write(series.to_bytes())
+            else:
+                with open(path, "ab") as f:
+                    f.write(array("d", (timestamp, price)).tobytes())
+        snapshot_path = os.path.join(self.directory, "snapshot.json")
+        tmp_path = f"{snapshot_path}.tmp"
+        with self._lock:
+            data = {
+                "coins": self.coins,
+                "symbols": self.symbols,
+                "updated_at": self.updated_at,
+                "fetched_at": self.fetched_at,
+            }
+            with open(tmp_path, "w") as f:
+                json.dump(data, f)
+        os.replace(tmp_path, snapshot_path)
+
+    def momentum(self, key: str, window_minutes: float) -> Optional[Dict[str, Any]]:
+        """
+        Summarize a series over the last window_minutes: first and last price,
+        percent change, high and low. key is "coin:<id>" or "symbol:<SYMBOL>".
+        """
+        series = self.series.get(key)
+        if series is None:
+            return None
+        with self._lock:
+            prices = series.window(window_minutes * 60)
+        if not prices:
+            return None
+        first, last = prices[0], prices[-1]
+        return {
+            "key": key,
+            "window_minutes": window_minutes,
+            "samples": len(prices),
+            "first_price": first,
+            "last_price": last,
+            "change_pct": (last - first) / first * 100 if first else None,
+            "high": max(prices),
+            "low": min(prices),
+        }
+
+
+class MarketPoller:
+    """
+    Background asyncio task refreshing a watchlist into a MarketSnapshotStore.
+    Each poll makes one CoinGecko /coins/markets request for all coins and one
+    Binance request for all symbols.
+    :param tools: CryptoTools providing the async fetchers.
+    """
+
+    def __init__(
+        self,
+        tools,
+        store: MarketSnapshotStore,
+        coins: List[str] = MARKET_WATCHLIST_COINS,
+        symbols: List[str] = MARKET_WATCHLIST_SYMBOLS,
+        interval: float = MARKET_POLL_INTERVAL,
+    ):
+        self.tools = tools
+        self.store = store
+        self.coins = list(coins)
+        self.symbols = list(symbols)
+        self.interval = interval
+        self.polls = 0
+        self.failures = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def poll_once(self) -> None:
+        async def nothing():
+            return []
+
+        coins, symbols = await asyncio.gather(
+            (
+                self.tools.afetch_coingecko_markets(self.coins)
+                if self.coins
+                else nothing()
+            ),
+            (
+                self.tools.afetch_binance_prices(self.symbols)
+                if self.symbols
+                else nothing()
+            ),
+        )
+        if coins is None and symbols is None:
+            self.failures += 1
+            return
+        # File writes stay off the event loop. A failed source contributes no
+        # entries, so its cached ones age out instead of being served as live.
+        await asyncio.to_thread(self.store.update, coins or [], symbols or [])
+        self.polls += 1
+        # Keeps the ticker and name resolver's coin list fresh between tool calls.
+        await self.tools.http.submit(self.tools.coin_resolver.ensure_fresh())
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self.poll_once()
+            except Exception as e:
+                self.failures += 1
+                print(f"Error polling market data: {e}")
+            # Jitter keeps several processes from polling in lockstep.
+            await asyncio.sleep(self.interval * random.uniform(0.9, 1.1))
+
+    def start(self) -> asyncio.Task:
+        """Start polling on the running loop; calling it again is a no-op."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
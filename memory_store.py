@@ -0,0 +1,210 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Deque, List, Optional
+
+from decouple import config
+from llama_index.core.llms import ChatMessage
+from llama_index.core.storage.chat_store.base import BaseChatStore
+from pydantic import Field, PrivateAttr
+
+# "sqlite" keeps conversations across restarts, "memory" keeps them in-process only.
+CHAT_STORE_BACKEND = config("CHAT_STORE_BACKEND", default="sqlite")
+CHAT_STORE_PATH = config("CHAT_STORE_PATH", default="chat_store.db")
+# Messages kept per user; older ones fall off the ring buffer.
+CHAT_STORE_MAX_MESSAGES = config("CHAT_STORE_MAX_MESSAGES", default=50, cast=int)
+# Users kept in process memory; the least recently active one is evicted first.
+CHAT_STORE_MAX_KEYS = config("CHAT_STORE_MAX_KEYS", default=256, cast=int)
+
+
+class BoundedChatStore(BaseChatStore):
+    """
+    In-process chat store with a ring buffer per key and LRU eviction of keys.
+    Memory use is capped at max_keys * max_messages messages.
+    """
+
+    max_messages: int = Field(default=CHAT_STORE_MAX_MESSAGES)
+    max_keys: int = Field(default=CHAT_STORE_MAX_KEYS)
+
+    _buffers: "OrderedDict[str, Deque[ChatMessage]]" = PrivateAttr(
+        default_factory=OrderedDict
+    )
+    _lock: threading.RLock = PrivateAttr(default_factory=threading.RLock)
+
+    @classmethod
+    def class_name(cls) -> str:
+        """Get class name."""
+        return "BoundedChatStore"
+
+    def _buffer(self, key: str) -> Deque[ChatMessage]:
+        buffer = self._buffers.get(key)
+        if buffer is not None:
+            self._buffers.move_to_end(key)
+            return buffer
+        buffer = deque(self._load(key), maxlen=self.max_messages)
+        self._buffers[key] = buffer
+        while len(self._buffers) > self.max_keys:
+            self._buffers.popitem(last=False)
+        return buffer
+
+    # Persistence hooks, no-ops for the in-process store.
+    def _load(self, key: str) -> List[ChatMessage]:
+        return []
+
+    def _save(self, key: str, messages: List[ChatMessage]) -> None:
+        pass
+
+    def _append(self, key: str, message: ChatMessage) -> None:
+        pass
+
+    def _delete(self, key: str) -> None:
+        pass
+
+    def set_messages(self, key: str, messages: List[ChatMessage]) -> None:
+        """Set messages for a key."""
+        with self._lock:
+            buffer = self._buffer(key)
+            buffer.clear()
+            buffer.extend(messages)
+            self._save(key, list(buffer))
+
+    def get_messages(self, key: str) -> List[ChatMessage]:
+        """Get messages for a key."""
+        with self._lock:
+            return list(self._buffer(key))
+
+    def add_message(self, key: str, message: ChatMessage) -> None:
+        """Add a message for a key."""
+        with self._lock:
+            self._buffer(key).append(message)
+            self._append(key, message)
+
+    def delete_messages(self, key: str) -> Optional[List[ChatMessage]]:
+        """Delete messages for a key."""
+        with self._lock:
+            messages = list(self._buffer(key))
+            del self._buffers[key]
+            self._delete(key)
+            return messages or None
+
+    def delete_message(self, key: str, idx: int) -> Optional[ChatMessage]:
+        """Delete specific message for a key."""
+        with self._lock:
+            buffer = self._buffer(key)
+            if idx >= len(buffer):
+                return None
+            message = buffer[idx]
+            del buffer[idx]
+            self._save(key, list(buffer))
+            return message
+
+    def delete_last_message(self, key: str) -> Optional[ChatMessage]:
+        """Delete last message for a key."""
+        with self._lock:
+            buffer = self._buffer(key)
+            if not buffer:
+                return None
+            message = buffer.pop()
+            self._save(key, list(buffer))
+            return message
+
+    def get_keys(self) -> List[str]:
+        """Get all keys."""
+        with self._lock:
+            return list(self._buffers)
+
+
+class SQLiteChatStore(BoundedChatStore):
+    """
+    Chat store persisted to SQLite so conversations survive restarts.
+    The on-disk history is trimmed to the same ring size as the in-process
+    buffers, which act as an LRU cache of recently active users.
+    """
+
+    db_path: str = Field(default=CHAT_STORE_PATH)
+
+    _conn: sqlite3.Connection = PrivateAttr()
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # Agent turns run on executor threads, access is serialized by _lock.
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS chat_messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                key TEXT NOT NULL,
+                message TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS chat_messages_key ON chat_messages (key, id)"
+        )
+        self._conn.commit()
+
+    @classmethod
+    def class_name(cls) -> str:
+        """Get class name."""
+        return "SQLiteChatStore"
+
+    def _load(self, key: str) -> List[ChatMessage]:
+        rows = self._conn.execute(
+            "SELECT message FROM chat_messages WHERE key = ? ORDER BY id DESC LIMIT ?",
+            (key, self.max_messages),
+        ).fetchall()
+        return [ChatMessage.model_validate_json(row[0]) for row in reversed(rows)]
+
+    def _save(self, key: str, messages: List[ChatMessage]) -> None:
+        with self._conn:
+            self._conn.execute("DELETE FROM chat_messages WHERE key = ?", (key,))
+            self._conn.executemany(
+                "INSERT INTO chat_messages (key, message, created_at) VALUES (?, ?, ?)",
+                [(key, m.model_dump_json(), time.time()) for m in messages],
+            )
+
+    def _append(self, key: str, message: ChatMessage) -> None:
+        with self._conn:
+            self._conn.execute(
+                "INSERT INTO chat_messages (key, message, created_at) VALUES (?, ?, ?)",
+                (key, message.model_dump_json(), time.time()),
+            )
+            # Keep the on-disk history to the same ring size as the buffer.
+            self._conn.execute(
+                """
+                DELETE FROM chat_messages WHERE key = ? AND id <= (
+                    SELECT id FROM chat_messages WHERE key = ?
+                    ORDER BY id DESC LIMIT 1 OFFSET ?
+                )
+                """,
+                (key, key, self.max_messages),
+            )
+
+    def _delete(self, key: str) -> None:
+        with self._conn:
+            self._conn.execute("DELETE FROM chat_messages WHERE key = ?", (key,))
+
+    def get_keys(self) -> List[str]:
+        """Get all keys."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT key FROM chat_messages"
+            ).fetchall()
+            return [row[0] for row in rows]
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+def create_chat_store(backend: str = CHAT_STORE_BACKEND) -> BoundedChatStore:
+    """Create the chat store selected by CHAT_STORE_BACKEND."""
+    if backend == "sqlite":
+        return SQLiteChatStore()
+    if backend == "memory":
+        return BoundedChatStore()
+    raise ValueError(
+        f"Unknown chat store backend: {backend}. Supported backends are: sqlite, memory"
+    )
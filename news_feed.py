@@ -0,0 +1,297 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import feedparser
+from decouple import config
+
+from http_client import AsyncHTTPClient, HTTPRequestError
+
+NEWS_STORE_PATH = config(
+    "NEWS_STORE_PATH", default=os.path.join("storage", "news", "news.db")
+)
+# Days an article is remembered as seen; older ones are pruned each cycle.
+NEWS_RETENTION_DAYS = config("NEWS_RETENTION_DAYS", default=30, cast=float)
+
+# Query parameters that only track where a click came from.
+TRACKING_PARAMS = {"fbclid", "gclid", "ref", "ref_src", "source", "mc_cid", "mc_eid"}
+
+ArticlesFetcher = Callable[[], Awaitable[List[Dict]]]
+
+
+def normalize_url(url: str) -> str:
+    """
+    Canonical form of an article URL: https, lowercase host without www, no
+    fragment, tracking parameters or trailing slash, remaining parameters sorted.
+    """
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.startswith("utm_") and key not in TRACKING_PARAMS
+    )
+    return urlunsplit(
+        ("https", host, parts.path.rstrip("/") or "/", urlencode(query), "")
+    )
+
+
+def title_hash(title: str) -> Optional[str]:
+    """Hash of a title's lowercase words, so case and punctuation do not matter."""
+    words = re.findall(r"[a-z0-9]+", (title or "").lower())
+    if not words:
+        return None
+    return hashlib.sha1(" ".join(words).encode()).hexdigest()[:16]
+
+
+class NewsStore:
+    """
+    Articles already seen, and the ETag and Last-Modified of each feed, in SQLite.
+    URL keys and title hashes are also kept in memory, so filtering a batch
+    for new articles does not query the database.
+    :param path: Path of the SQLite database.
+    """
+
+    def __init__(self, path: str = NEWS_STORE_PATH):
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS feeds (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT
+            )
+            """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS articles (
+                url_key TEXT PRIMARY KEY,
+                title_hash TEXT,
+                seen_at REAL NOT NULL,
+                article TEXT NOT NULL
+            )
+            """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS articles_seen_at ON articles (seen_at)"
+        )
+        self._conn.commit()
+        self._url_keys = set()
+        self._title_hashes = set()
+        for url_key, hashed in self._conn.execute(
+            "SELECT url_key, title_hash FROM articles"
+        ):
+            self._url_keys.add(url_key)
+            if hashed:
+                self._title_hashes.add(hashed)
+
+    def __len__(self) -> int:
+        return len(self._url_keys)
+
+    def get_validators(self, feed_url: str) -> Tuple[Optional[str], Optional[str]]:
+        """Return the ETag and Last-Modified last served for a feed."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified FROM feeds WHERE url = ?", (feed_url,)
+            ).fetchone()
+        return row or (None, None)
+
+    def set_validators(
+        self, feed_url: str, etag: Optional[str], last_modified: Optional[str]
+    ) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO feeds (url, etag, last_modified) VALUES (?, ?, ?)",
+                (feed_url, etag, last_modified),
+            )
+            self._conn.commit()
+
+    def add_new(self, articles: List[Dict]) -> List[Dict]:
+        """
+        Record articles and return those not seen before, in order. An article
+        is a duplicate if its normalized URL or its title hash was seen, in this
+        batch or an earlier one.
+        """
+        new, rows = [], []
+        now = time.time()
+        with self._lock:
+            for article in articles:
+                url_key = normalize_url(article["url"]) if article.get("url") else None
+                hashed = title_hash(article.get("title"))
+                url_key = url_key or hashed
+                if url_key is None:
+                    continue
+                if url_key in self._url_keys or hashed in self._title_hashes:
+                    continue
+                self._url_keys.add(url_key)
+                if hashed:
+                    self._title_hashes.add(hashed)
+                new.append(article)
+                rows.append((url_key, hashed, now, json.dumps(article)))
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO articles (url_key, title_hash, seen_at, article) "
+                "VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+        return new
+
+    def recent(self, limit: int = 50) -> List[Dict]:
+        """Return the most recently seen articles, newest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT article FROM articles ORDER BY seen_at DESC, rowid DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def prune(self, max_age_days: float = NEWS_RETENTION_DAYS) -> int:
+        """Forget articles seen more than max_age_days ago; returns how many."""
+        cutoff = time.time() - max_age_days * 86400
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT url_key, title_hash FROM articles WHERE seen_at < ?", (cutoff,)
+            ).fetchall()
+            if not rows:
+                return 0
+            self._conn.execute("DELETE FROM articles WHERE seen_at < ?", (cutoff,))
+            self._conn.commit()
+            for url_key, hashed in rows:
+                self._url_keys.discard(url_key)
+                self._title_hashes.discard(hashed)
+        return len(rows)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class NewsIngestion:
+    """
+    Fetches every RSS/Atom feed concurrently with conditional requests, so
+    unchanged feeds cost a 304 and no parsing, then keeps only articles the
+    NewsStore has not seen.
+    :param http: HTTP client the feeds are fetched with.
+    :param store: Seen articles and feed validators.
+    :param feed_urls: RSS or Atom feed URLs.
+    :param fetch_extra: Optional coroutine returning more articles per cycle,
+        such as CryptoPanic's.
+    """
+
+    def __init__(
+        self,
+        http: AsyncHTTPClient,
+        store: NewsStore,
+        feed_urls: List[str],
+        fetch_extra: Optional[ArticlesFetcher] = None,
+    ):
+        self.http = http
+        self.store = store
+        self.feed_urls = list(feed_urls)
+        self.fetch_extra = fetch_extra
+        self.stats = {
+            "cycles": 0,
+            "feeds_fetched": 0,
+            "feeds_not_modified": 0,
+            "feed_errors": 0,
+            "articles_fetched": 0,
+            "articles_new": 0,
+        }
+
+    async def _fetch_feed(
+        self, url: str
+    ) -> Tuple[List[Dict], Optional[Tuple[str, str]]]:
+        """Return the feed's articles and its new validators, or nothing if unchanged."""
+        etag, last_modified = await asyncio.to_thread(self.store.get_validators, url)
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        response = await self.http.request("GET", url, headers=headers)
+        if response.status == 304:
+            self.stats["feeds_not_modified"] += 1
+            return [], None
+        if not 200 <= response.status < 300:
+            raise HTTPRequestError(
+                f"GET {url} returned {response.status}", response.status
+            )
+        self.stats["feeds_fetched"] += 1
+        feed = await asyncio.to_thread(feedparser.parse, response.body)
+        source = feed.feed.get("title", urlsplit(url).hostname)
+        articles = [
+            {
+                "title": entry.get("title"),
+                "url": entry.get("link"),
+                "source": source,
+                "published_at": entry.get("published", entry.get("updated")),
+                "content": entry.get("summary"),
+            }
+            for entry in feed.entries
+        ]
+        validators = (
+            response.headers.get("ETag"),
+            response.headers.get("Last-Modified"),
+        )
+        return articles, validators
+
+    async def fetch_feeds(
+        self, feed_urls: Optional[List[str]] = None
+    ) -> Tuple[List[Dict], Dict[str, Tuple[str, str]]]:
+        """
+        Fetch all feeds concurrently. A failing feed is reported and skipped.
+        :return: Articles of the changed feeds, and their new validators by URL.
+        """
+        feed_urls = feed_urls or self.feed_urls
+        results = await asyncio.gather(
+            *(self._fetch_feed(url) for url in feed_urls), return_exceptions=True
+        )
+        articles, validators = [], {}
+        for url, result in zip(feed_urls, results):
+            if isinstance(result, Exception):
+                self.stats["feed_errors"] += 1
+                print(f"Error fetching RSS feed {url}: {result}")
+                continue
+            articles.extend(result[0])
+            if result[1] is not None:
+                validators[url] = result[1]
+        return articles, validators
+
+    async def collect(self, feed_urls: Optional[List[str]] = None) -> List[Dict]:
+        """
+        Run one ingestion cycle and return only the articles not seen before.
+        Feed validators are saved after the articles are recorded, so a crash in
+        between refetches the feed rather than losing its articles.
+        """
+
+        async def fetch_extra():
+            if self.fetch_extra is None:
+                return []
+            try:
+                return await self.fetch_extra()
+            except Exception as e:
+                print(f"Error fetching news: {e}")
+                return []
+
+        (articles, validators), extra = await asyncio.gather(
+            self.fetch_feeds(feed_urls), fetch_extra()
+        )
+        articles = list(extra) + articles
+        new = await asyncio.to_thread(self.store.add_new, articles)
+        for url, (etag, last_modified) in validators.items():
+            await asyncio.to_thread(self.store.set_validators, url, etag, last_modified)
+        await asyncio.to_thread(self.store.prune)
+        self.stats["cycles"] += 1
+        self.stats["articles_fetched"] += len(articles)
+        self.stats["articles_new"] += len(new)
+        return new
@@ -0,0 +1,304 @@
+import asyncio
+import random
+import re
+import time
+import uuid
+from calendar import timegm
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from decouple import config
+from llama_index.core import VectorStoreIndex
+from llama_index.core.base.base_query_engine import BaseQueryEngine
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.base.response.schema import RESPONSE_TYPE, Response
+from llama_index.core.postprocessor.types import BaseNodePostprocessor
+from llama_index.core.prompts.mixin import PromptMixinType
+from llama_index.core.retrievers import VectorIndexRetriever
+from llama_index.core.schema import MetadataMode, NodeWithScore, QueryBundle, TextNode
+from llama_index.vector_stores.qdrant import QdrantVectorStore
+from pydantic import Field
+from qdrant_client import QdrantClient
+from qdrant_client.models import (
+    Distance,
+    FieldCondition,
+    Filter,
+    FilterSelector,
+    Range,
+    VectorParams,
+)
+
+from ingestion import NODE_ID_NAMESPACE
+from news_feed import NEWS_RETENTION_DAYS, normalize_url, title_hash
+from sentiment import TIMESTAMP_FORMAT
+
+NEWS_COLLECTION = config("NEWS_COLLECTION", default="CryptoNews-index")
+NEWS_TOP_K = config("NEWS_TOP_K", default=5, cast=int)
+# Headlines retrieved by similarity before recency decay picks the top_k.
+NEWS_CANDIDATES = config("NEWS_CANDIDATES", default=20, cast=int)
+# Hours after which a headline's score is halved; 0 ranks by similarity alone.
+NEWS_RECENCY_HALF_LIFE_HOURS = config(
+    "NEWS_RECENCY_HALF_LIFE_HOURS", default=24, cast=float
+)
+# Seconds between news aggregation cycles.
+NEWS_POLL_INTERVAL = config("NEWS_POLL_INTERVAL", default=600, cast=float)
+
+_TAGS = re.compile(r"<[^>]+>")
+
+
+def published_timestamp(published_at: Optional[str]) -> float:
+    """Epoch seconds of a processed published_at, or now if it is missing."""
+    if published_at:
+        try:
+            return timegm(datetime.strptime(published_at, TIMESTAMP_FORMAT).timetuple())
+        except ValueError:
+            pass
+    return time.time()
+
+
+class RecencyDecayPostprocessor(BaseNodePostprocessor):
+    """
+    Multiplies each node's score by 0.5 ** (age / half_life) and keeps the
+    top_n, so a slightly less similar headline from today beats last week's.
+    """
+
+    half_life_hours: float = Field(default=NEWS_RECENCY_HALF_LIFE_HOURS)
+    top_n: int = Field(default=NEWS_TOP_K)
+    time_key: str = Field(default="published_ts")
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "RecencyDecayPostprocessor"
+
+    def _postprocess_nodes(
+        self,
+        nodes: List[NodeWithScore],
+        query_bundle: Optional[QueryBundle] = None,
+    ) -> List[NodeWithScore]:
+        if self.half_life_hours > 0:
+            now = time.time()
+            for node in nodes:
+                published = node.node.metadata.get(self.time_key, now)
+                age_hours = max(now - published, 0.0) / 3600
+                node.score = (node.score or 0.0) * 0.5 ** (
+                    age_hours / self.half_life_hours
+                )
+        return sorted(nodes, key=lambda n: n.score or 0.0, reverse=True)[: self.top_n]
+
+
+class NewsIndex:
+    """
+    Aggregated news articles embedded into their own Qdrant collection.
+    Point ids derive from the article's normalized URL, so adding an article
+    twice overwrites it instead of duplicating it.
+    :param client: Qdrant client; QdrantClient(location=":memory:") works too.
+    :param embed_model: Model embedding headlines and queries.
+    :param vector_size: Dimension of embed_model's vectors.
+    """
+
+    def __init__(
+        self,
+        client: QdrantClient,
+        embed_model: BaseEmbedding,
+        collection_name: str = NEWS_COLLECTION,
+        vector_size: int = 1536,
+    ):
+        self.client = client
+        self.embed_model = embed_model
+        self.collection_name = collection_name
+        if not client.collection_exists(collection_name):
+            client.create_collection(
+                collection_name=collection_name,
+                vectors_config=VectorParams(size=vector_size, distance=Distance.COSINE),
+            )
+        self.vector_store = QdrantVectorStore(
+            client=client, collection_name=collection_name
+        )
+        self.index = VectorStoreIndex.from_vector_store(
+            vector_store=self.vector_store, embed_model=embed_model
+        )
+
+    def __len__(self) -> int:
+        return self.client.count(self.collection_name).count
+
+    @staticmethod
+    def article_node(article: Dict) -> Optional[TextNode]:
+        title = (article.get("title") or "").strip()
+        key = normalize_url(article["url"]) if article.get("url") else title_hash(title)
+        if key is None:
+            return None
+        content = _TAGS.sub(" ", article.get("content") or "").strip()
+        # Feeds often repeat the headline as the summary.
+        text = (
+            title if not content or content.startswith(title) else f"{title}\n{content}"
+        )
+        if not text:
+            return None
+        metadata = {
+            "title": title,
+            "url": article.get("url"),
+            "source": article.get("source"),
+            "sentiment": article.get("sentiment"),
+            "published_at": article.get("published_at"),
+            "published_ts": published_timestamp(article.get("published_at")),
+        }
+        return TextNode(
+            id_=str(uuid.uuid5(NODE_ID_NAMESPACE, key)),
+            text=text,
+            metadata=metadata,
+            # Only the headline and summary are embedded
+            excluded_embed_metadata_keys=list(metadata),
+            excluded_llm_metadata_keys=["url", "published_ts"],
+        )
+
+    def add_articles(self, articles: List[Dict]) -> int:
+        """Embed processed articles in one batch and upsert them; returns how many."""
+        # The same article twice in a batch is embedded once
+        nodes = list(
+            {n.node_id: n for n in map(self.article_node, articles) if n}.values()
+        )
+        if not nodes:
+            return 0
+        embeddings = self.embed_model.get_text_embedding_batch(
+            [n.get_content(metadata_mode=MetadataMode.EMBED) for n in nodes]
+        )
+        for node, embedding in zip(nodes, embeddings):
+            node.embedding = embedding
+        self.vector_store.add(nodes)
+        return len(nodes)
+
+    def prune(self, max_age_days: float = NEWS_RETENTION_DAYS) -> None:
+        """Delete headlines published more than max_age_days ago."""
+        self.client.delete(
+            collection_name=self.collection_name,
+            points_selector=FilterSelector(
+                filter=Filter(
+                    must=[
+                        FieldCondition(
+                            key="published_ts",
+                            range=Range(lt=time.time() - max_age_days * 86400),
+                        )
+                    ]
+                )
+            ),
+        )
+
+    def as_query_engine(
+        self,
+        top_k: int = NEWS_TOP_K,
+        candidates: int = NEWS_CANDIDATES,
+        half_life_hours: float = NEWS_RECENCY_HALF_LIFE_HOURS,
+    ) -> "HeadlineQueryEngine":
+        return HeadlineQueryEngine(
+            VectorIndexRetriever(index=self.index, similarity_top_k=candidates),
+            RecencyDecayPostprocessor(half_life_hours=half_life_hours, top_n=top_k),
+        )
+
+
+class HeadlineQueryEngine(BaseQueryEngine):
+    """
+    Answers with the most relevant recent headlines, one line each with source,
+    time and sentiment, instead of synthesizing with the LLM. The calling agent
+    reads the list directly, so no article bodies pass through its prompt.
+    """
+
+    def __init__(
+        self, retriever: VectorIndexRetriever, decay: RecencyDecayPostprocessor
+    ):
+        self.retriever = retriever
+        self.decay = decay
+        super().__init__(callback_manager=None)
+
+    def _get_prompt_modules(self) -> PromptMixinType:
+        return {}
+
+    def _query(self, query_bundle: QueryBundle) -> RESPONSE_TYPE:
+        nodes = self.decay.postprocess_nodes(
+            self.retriever.retrieve(query_bundle), query_bundle
+        )
+        lines = [
+            f"- [{n.node.metadata.get('sentiment') or 'neutral'}] "
+            f"{n.node.metadata.get('title')} "
+            f"({n.node.metadata.get('source')}, {n.node.metadata.get('published_at')})"
+            for n in nodes
+        ]
+        return Response(
+            response="\n".join(lines) or "No recent news matches the question.",
+            source_nodes=nodes,
+        )
+
+    async def _aquery(self, query_bundle: QueryBundle) -> RESPONSE_TYPE:
+        # The Qdrant vector store has no async client here.
+        return await asyncio.to_thread(self._query, query_bundle)
+
+
+class NewsIndexer:
+    """
+    Background asyncio task aggregating news, scoring sentiment and embedding
+    the new articles into a NewsIndex every interval.
+    Articles that fail to index are retried on the next cycle, since the news
+    store already counts them as seen. An empty index, after a restart with no
+    new articles or a wiped collection, is seeded from the store's recent
+    articles on the next cycle.
+    :param tools: CryptoTools providing aggregation and sentiment.
+    :param get_index: Returns the NewsIndex, building it on first call.
+    :param retention_days: Headlines older than this are pruned each cycle.
+    """
+
+    def __init__(
+        self,
+        tools,
+        get_index: Callable[[], NewsIndex],
+        interval: float = NEWS_POLL_INTERVAL,
+        retention_days: float = NEWS_RETENTION_DAYS,
+    ):
+        self.tools = tools
+        self.get_index = get_index
+        self.interval = interval
+        self.retention_days = retention_days
+        self.indexed = 0
+        self.failures = 0
+        self._pending: List[Dict] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def _is_empty(self) -> bool:
+        return len(self.get_index()) == 0
+
+    def _index(self, articles: List[Dict]) -> int:
+        index = self.get_index()
+        if len(index) == 0:
+            articles = self.tools.news.store.recent(limit=500) + articles
+        self.tools.process_news_articles(articles)
+        added = index.add_articles(articles)
+        index.prune(self.retention_days)
+        return added
+
+    async def index_once(self) -> int:
+        """Run one cycle and return how many articles were embedded."""
+        self._pending.extend(await self.tools.aaggregate_news())
+        # Embedding and Qdrant calls block, so they stay off the event loop.
+        if not self._pending and not await asyncio.to_thread(self._is_empty):
+            return 0
+        added = await asyncio.to_thread(self._index, self._pending)
+        self._pending = []
+        self.indexed += added
+        return added
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self.index_once()
+            except Exception as e:
+                self.failures += 1
+                print(f"Error indexing news: {e}")
+            await asyncio.sleep(self.interval * random.uniform(0.9, 1.1))
+
+    def start(self) -> asyncio.Task:
+        """Start indexing on the running loop; calling it again is a no-op."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
@@ -0,0 +1,223 @@
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from decouple import config
+from llama_index.core.agent.react.formatter import (
+    ReActChatFormatter,
+    get_react_tool_descriptions,
+)
+from llama_index.core.agent.react.prompts import (
+    CONTEXT_REACT_CHAT_SYSTEM_HEADER,
+    REACT_CHAT_SYSTEM_HEADER,
+)
+from llama_index.core.agent.react.types import (
+    BaseReasoningStep,
+    ObservationReasoningStep,
+)
+from llama_index.core.llms import ChatMessage, MessageRole
+from llama_index.core.tools import BaseTool
+from pydantic import Field, PrivateAttr
+
+# Tokens one LLM request may use for persona, tools, history and reasoning.
+PROMPT_TOKEN_BUDGET = config("PROMPT_TOKEN_BUDGET", default=4000, cast=int)
+# Older history messages are cut down to this many tokens each.
+PROMPT_MESSAGE_TOKEN_LIMIT = config("PROMPT_MESSAGE_TOKEN_LIMIT", default=300, cast=int)
+# Most recent history messages kept verbatim.
+PROMPT_RECENT_MESSAGES = config("PROMPT_RECENT_MESSAGES", default=2, cast=int)
+# Tokens for the summary of turns that no longer fit; 0 drops them silently.
+PROMPT_SUMMARY_TOKENS = config("PROMPT_SUMMARY_TOKENS", default=150, cast=int)
+# tiktoken encoding used to count tokens.
+PROMPT_TOKENIZER_ENCODING = config("PROMPT_TOKENIZER_ENCODING", default="o200k_base")
+# Print each request's section sizes.
+PROMPT_LOG_TOKENS = config("PROMPT_LOG_TOKENS", default=True, cast=bool)
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s|\n")
+
+
+@lru_cache(maxsize=1)
+def get_encoding():
+    """The tiktoken encoding, or None if it cannot be loaded (e.g. offline)."""
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding(PROMPT_TOKENIZER_ENCODING)
+    except Exception as e:
+        print(f"tiktoken unavailable, estimating tokens from text length: {e}")
+        return None
+
+
+# History messages are counted again on every ReAct step.
+@lru_cache(maxsize=4096)
+def count_tokens(text: str) -> int:
+    encoding = get_encoding()
+    if encoding is None:
+        # About four characters per token for English.
+        return (len(text) + 3) // 4
+    return len(encoding.encode_ordinary(text))
+
+
+def truncate_tokens(text: str, limit: int) -> str:
+    """Cut text down to about limit tokens, marking the cut."""
+    if count_tokens(text) <= limit:
+        return text
+    encoding = get_encoding()
+    if encoding is None:
+        return text[: limit * 4].rstrip() + " [...]"
+    return encoding.decode(encoding.encode_ordinary(text)[:limit]).rstrip() + " [...]"
+
+
+def summarize_turns(messages: Sequence[ChatMessage], limit: int) -> str:
+    """
+    Extractive summary of older turns: the first sentence of each message,
+    newest first until limit tokens are used. No LLM call, so it adds no
+    latency to the request.
+    """
+    lines: List[str] = []
+    used = count_tokens("Earlier in this conversation:")
+    for message in reversed(messages):
+        first = _SENTENCE_END.split((message.content or "").strip(), maxsplit=1)[0]
+        if not first:
+            continue
+        line = f"- {message.role.value}: {truncate_tokens(first, 40)}"
+        tokens = count_tokens(line)
+        if used + tokens > limit:
+            break
+        lines.append(line)
+        used += tokens
+    if not lines:
+        return ""
+    return "Earlier in this conversation:\n" + "\n".join(reversed(lines))
+
+
+class PromptBuilder(ReActChatFormatter):
+    """
+    ReAct chat formatter that fits each LLM request into a token budget.
+    The persona and tool sections are rendered once per tool set. History
+    fills what is left of the budget newest first: the most recent messages
+    verbatim, older ones truncated, and turns that no longer fit summarized
+    into the system message. The current ReAct reasoning is never cut.
+    Section sizes are logged per request.
+    :param name: Label for the token log, e.g. the bot or user.
+    :param token_budget: Tokens per LLM request.
+    :param message_token_limit: Tokens kept of each older history message.
+    :param recent_messages: Most recent history messages kept verbatim.
+    :param summary_tokens: Tokens for the summary of dropped turns.
+    """
+
+    name: str = Field(default="agent")
+    token_budget: int = Field(default=PROMPT_TOKEN_BUDGET)
+    message_token_limit: int = Field(default=PROMPT_MESSAGE_TOKEN_LIMIT)
+    recent_messages: int = Field(default=PROMPT_RECENT_MESSAGES)
+    summary_tokens: int = Field(default=PROMPT_SUMMARY_TOKENS)
+    log_tokens: bool = Field(default=PROMPT_LOG_TOKENS)
+
+    _rendered: Dict[Tuple[str, ...], Tuple[str, Dict[str, int]]] = PrivateAttr(
+        default_factory=dict
+    )
+
+    @classmethod
+    def from_context(cls, context: str, **kwargs) -> "PromptBuilder":
+        return cls(
+            system_header=(
+                CONTEXT_REACT_CHAT_SYSTEM_HEADER
+                if context
+                else REACT_CHAT_SYSTEM_HEADER
+            ),
+            context=context,
+            **kwargs,
+        )
+
+    def render_header(self, tools: Sequence[BaseTool]) -> Tuple[str, Dict[str, int]]:
+        """The system header for a tool set and its section sizes, cached."""
+        key = tuple(tool.metadata.get_name() for tool in tools)
+        rendered = self._rendered.get(key)
+        if rendered is None:
+            tool_desc = "\n".join(get_react_tool_descriptions(tools))
+            format_args = {"tool_desc": tool_desc, "tool_names": ", ".join(key)}
+            if self.context:
+                format_args["context"] = self.context
+            header = self.system_header.format(**format_args)
+            sizes = {
+                "persona": count_tokens(self.context),
+                "tools": count_tokens(tool_desc),
+                "header": count_tokens(header),
+            }
+            rendered = self._rendered[key] = (header, sizes)
+        return rendered
+
+    def fit_history(
+        self, chat_history: List[ChatMessage], budget: int
+    ) -> Tuple[List[ChatMessage], List[ChatMessage], int]:
+        """
+        Keep history newest first within budget tokens; the newest message is
+        always kept.
+        :return: The kept messages, the older ones that did not fit, and the
+            kept messages' tokens.
+        """
+        kept: List[ChatMessage] = []
+        used = 0
+        for i in range(len(chat_history) - 1, -1, -1):
+            message = chat_history[i]
+            content = message.content or ""
+            if len(kept) >= self.recent_messages:
+                content = truncate_tokens(content, self.message_token_limit)
+            tokens = count_tokens(content)
+            if kept and used + tokens > budget:
+                kept.reverse()
+                return kept, chat_history[: i + 1], used
+            if content != (message.content or ""):
+                # A copy, so the agent's memory keeps the full message
+                message = ChatMessage(role=message.role, content=content)
+            kept.append(message)
+            used += tokens
+        kept.reverse()
+        return kept, [], used
+
+    def format(
+        self,
+        tools: Sequence[BaseTool],
+        chat_history: List[ChatMessage],
+        current_reasoning: Optional[List[BaseReasoningStep]] = None,
+    ) -> List[ChatMessage]:
+        header, sizes = self.render_header(tools)
+        reasoning_history = [
+            ChatMessage(
+                role=(
+                    self.observation_role
+                    if isinstance(step, ObservationReasoningStep)
+                    else MessageRole.ASSISTANT
+                ),
+                content=step.get_content(),
+            )
+            for step in current_reasoning or []
+        ]
+        reasoning_tokens = sum(count_tokens(m.content) for m in reasoning_history)
+
+        budget = self.token_budget - sizes["header"] - reasoning_tokens
+        history, dropped, history_tokens = self.fit_history(chat_history, budget)
+        summary = ""
+        if dropped and self.summary_tokens > 0:
+            # Make room for the summary, then summarize everything left out
+            history, dropped, history_tokens = self.fit_history(
+                chat_history, budget - self.summary_tokens
+            )
+            summary = summarize_turns(dropped, self.summary_tokens)
+            if summary:
+                header = f"{header}\n\n{summary}"
+        summary_tokens = count_tokens(summary) if summary else 0
+
+        if self.log_tokens:
+            total = sizes["header"] + summary_tokens + history_tokens + reasoning_tokens
+            print(
+                f"Prompt tokens for {self.name}: {total}/{self.token_budget} "
+                f"(persona {sizes['persona']}, tools {sizes['tools']}, "
+                f"history {history_tokens} in {len(history)}/{len(chat_history)} "
+                f"messages, summary {summary_tokens} of {len(dropped)} messages, "
+                f"reasoning {reasoning_tokens})"
+            )
+        return [
+            ChatMessage(role=MessageRole.SYSTEM, content=header),
+            *history,
+            *reasoning_history,
+        ]
@@ -0,0 +1,188 @@
+import re
+from collections import deque
+from functools import lru_cache
+from typing import Awaitable, Callable, Deque, Iterable, List, Optional, Tuple
+
+import numpy as np
+from decouple import config
+from llama_index.core.llms import LLM
+
+# Check bot replies against their channel's recent messages before sending.
+REPETITION_CHECK = config("REPETITION_CHECK", default=True, cast=bool)
+# Recent messages per channel a reply is compared with.
+REPETITION_WINDOW = config("REPETITION_WINDOW", default=50, cast=int)
+# Estimated Jaccard similarity of two messages' shingles from which a reply
+# counts as a repeat.
+REPETITION_THRESHOLD = config("REPETITION_THRESHOLD", default=0.6, cast=float)
+# MinHash permutations per message; more is more precise and slower.
+REPETITION_NUM_PERM = config("REPETITION_NUM_PERM", default=64, cast=int)
+# Bytes per shingle.
+REPETITION_SHINGLE_SIZE = config("REPETITION_SHINGLE_SIZE", default=5, cast=int)
+# Regenerations of a repeated reply before it is sent anyway.
+REPETITION_MAX_REWRITES = config("REPETITION_MAX_REWRITES", default=1, cast=int)
+# Model rewriting repeated replies; empty uses the bots' model.
+REPETITION_REWRITE_MODEL = config("REPETITION_REWRITE_MODEL", default="")
+
+_WORD = re.compile(r"\w+")
+_CASHTAG = re.compile(r"\$[a-zA-Z]\w*")
+
+REWRITE_PROMPT = (
+    "You are a degen crypto trader chatting on Discord. Your draft reply "
+    "repeats what was already said in the channel.\n"
+    "Message you are replying to:\n{message}\n"
+    "Draft:\n{draft}\n"
+    "{hint}\n"
+    "Write the new reply, about as long as the draft, and nothing else.\n"
+    "Reply: "
+)
+
+
+class MinHasher:
+    """
+    MinHash sketches of the shingles of a text; the share of equal values in
+    two sketches estimates the Jaccard similarity of their shingle sets.
+    Shingles are the byte n-grams of the lowercased words, hashed and
+    permuted with numpy in one pass. Recent sketches are cached, so a reply
+    checked and then added is only sketched once.
+    :param num_perm: Hash functions, i.e. values per sketch.
+    :param shingle_size: Bytes per shingle.
+    :param seed: Seed of the hash functions; sketches compare only under the same seed.
+    """
+
+    def __init__(
+        self,
+        num_perm: int = REPETITION_NUM_PERM,
+        shingle_size: int = REPETITION_SHINGLE_SIZE,
+        seed: int = 1,
+    ):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        # Multiply-shift hashing, h(x) = (a * x + b) >> 32 with wrapping
+        # 64-bit arithmetic and odd a, needs no modulo
+        self._a = rng.integers(0, 2**64, num_perm, dtype=np.uint64)[:, None] | 1
+        self._b = rng.integers(0, 2**64, num_perm, dtype=np.uint64)[:, None]
+        self.signature = lru_cache(maxsize=1024)(self._signature)
+
+    def shingles(self, text: str) -> np.ndarray:
+        """Distinct shingles of text as integers, ignoring case and punctuation."""
+        data = np.frombuffer(
+            " ".join(_WORD.findall(text.lower())).encode(), dtype=np.uint8
+        ).astype(np.uint64)
+        count = max(len(data) - self.shingle_size + 1, 1 if len(data) else 0)
+        shingles = np.zeros(count, dtype=np.uint64)
+        # Shingle bytes packed into one integer, the first byte highest
+        for offset in range(min(self.shingle_size, len(data))):
+            shingles = (shingles << np.uint64(8)) | data[offset : offset + count]
+        return np.unique(shingles)
+
+    def _signature(self, text: str) -> Optional[np.ndarray]:
+        """The sketch of text, or None if it has no words."""
+        shingles = self.shingles(text)
+        if not len(shingles):
+            return None
+        permuted = (self._a * shingles + self._b) >> np.uint64(32)
+        return permuted.min(axis=1).astype(np.uint32)
+
+
+class ConversationTracker:
+    """
+    A channel's recent messages as MinHash sketches in a ring buffer, for
+    telling whether a reply nearly repeats one of them before it is sent.
+    Adding a message overwrites the oldest sketch in place, and a check
+    compares one sketch with the whole window in a single vectorized pass.
+    Also keeps the cashtags discussed lately, for topic-shift hints.
+    :param window: Recent messages kept.
+    :param threshold: Estimated similarity from which a reply is a repeat.
+    :param hasher: Sketches texts; share one between channels.
+    """
+
+    def __init__(
+        self,
+        window: int = REPETITION_WINDOW,
+        threshold: float = REPETITION_THRESHOLD,
+        hasher: Optional[MinHasher] = None,
+    ):
+        self.window = window
+        self.threshold = threshold
+        self.hasher = hasher or MinHasher()
+        self._signatures = np.zeros((window, self.hasher.num_perm), dtype=np.uint32)
+        self.discussion_history: List[Optional[str]] = [None] * window
+        self.previous_topics: Deque[str] = deque(maxlen=5)
+        self._next = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def add_topic(self, topic: str) -> None:
+        if topic in self.previous_topics:
+            self.previous_topics.remove(topic)
+        self.previous_topics.append(topic)
+
+    def add_message(self, message: str) -> None:
+        """Add a sent message, replacing the oldest once the window is full."""
+        for topic in _CASHTAG.findall(message):
+            self.add_topic(topic.upper())
+        signature = self.hasher.signature(message)
+        if signature is None:
+            return
+        self._signatures[self._next] = signature
+        self.discussion_history[self._next] = message
+        self._next = (self._next + 1) % self.window
+        self._count = min(self._count + 1, self.window)
+
+    def check(
+        self, reply: str, pending: Iterable[str] = ()
+    ) -> Optional[Tuple[float, str]]:
+        """
+        Find the message a reply repeats.
+        :param pending: Messages not added yet that also count, e.g. the one
+            being replied to while it waits to be posted.
+        :return: The estimated similarity and the most similar message, or
+            None if the reply is new enough.
+        """
+        signature = self.hasher.signature(reply)
+        if signature is None:
+            return None
+        best, best_message = 0.0, None
+        if self._count:
+            similarity = (self._signatures[: self._count] == signature).mean(axis=1)
+            index = int(similarity.argmax())
+            best, best_message = (
+                float(similarity[index]),
+                self.discussion_history[index],
+            )
+        for message in pending:
+            other = self.hasher.signature(message)
+            similarity = 0.0 if other is None else float((other == signature).mean())
+            if similarity > best:
+                best, best_message = similarity, message
+        if best >= self.threshold:
+            return best, best_message
+        return None
+
+    def topic_shift_hint(self, repeated: str) -> str:
+        """Instruction for regenerating a reply that repeated the given message."""
+        excerpt = repeated if len(repeated) <= 120 else repeated[:117] + "..."
+        hint = (
+            f'Your draft repeats an earlier message ("{excerpt}"). Make a fresh '
+            f"point from a different angle"
+        )
+        if self.previous_topics:
+            hint += (
+                f", or move on from {', '.join(self.previous_topics)} to another coin"
+            )
+        return hint + "."
+
+
+def llm_rewriter(llm: LLM) -> Callable[[str, str, str], Awaitable[str]]:
+    """A rewriter asking the LLM once for a new reply, without the agent's tools."""
+
+    async def rewrite(message: str, draft: str, hint: str) -> str:
+        response = await llm.acomplete(
+            REWRITE_PROMPT.format(message=message, draft=draft, hint=hint)
+        )
+        return response.text.strip()
+
+    return rewrite
@@ -0,0 +1,138 @@
+import asyncio
+import statistics
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from decouple import config
+
+# Maximum number of agent turns running at the same time across all users.
+QUEUE_MAX_CONCURRENCY = config("QUEUE_MAX_CONCURRENCY", default=4, cast=int)
+# Maximum number of queued messages across all users before new ones are rejected.
+QUEUE_MAX_PENDING = config("QUEUE_MAX_PENDING", default=100, cast=int)
+
+
+class _UserQueue:
+    """Messages waiting for one user's next turn."""
+
+    def __init__(self, reply: Callable[[str], Awaitable]):
+        self.pending: List[str] = []
+        self.first_enqueued_at: Optional[float] = None
+        self.reply = reply
+        self.task: Optional[asyncio.Task] = None
+
+
+class UserRequestQueue:
+    """
+    Per-user async work queue for agent turns.
+    Messages that arrive while a user's turn is queued or running are merged
+    into that user's next turn, so each user has at most one turn in flight.
+    :param handler: Async callable taking (username, message) and returning the
+        reply, or an async iterator of its pieces to stream through reply.
+    :param max_concurrency: Maximum number of turns running at once.
+    :param max_pending: Maximum number of queued messages before submit rejects.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[str, str], Awaitable[str]],
+        max_concurrency: int = QUEUE_MAX_CONCURRENCY,
+        max_pending: int = QUEUE_MAX_PENDING,
+    ):
+        self.handler = handler
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        # Created on first submit so it binds to the bot's running loop.
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._users: Dict[str, _UserQueue] = {}
+        self._wait_times = deque(maxlen=1000)
+        self.depth = 0
+        self.running = 0
+        self.submitted = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+
+    def submit(
+        self, username: str, message: str, reply: Callable[[str], Awaitable]
+    ) -> bool:
+        """
+        Queue a message for a user's next turn.
+        :param reply: Async callable that sends the turn's response.
+        :return: False if the queue is full and the message was rejected.
+        """
+        if self.depth >= self.max_pending:
+            self.rejected += 1
+            return False
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        user = self._users.get(username)
+        if user is None:
+            user = _UserQueue(reply)
+            self._users[username] = user
+        if user.pending:
+            self.coalesced += 1
+        else:
+            user.first_enqueued_at = time.monotonic()
+        user.pending.append(message)
+        user.reply = reply
+        self.depth += 1
+        self.submitted += 1
+        if user.task is None:
+            user.task = asyncio.create_task(self._drain(username, user))
+        return True
+
+    async def _drain(self, username: str, user: _UserQueue):
+        try:
+            while user.pending:
+                async with self._semaphore:
+                    messages, user.pending = user.pending, []
+                    self.depth -= len(messages)
+                    self._wait_times.append(time.monotonic() - user.first_enqueued_at)
+                    self.running += 1
+                    try:
+                        response = await self.handler(username, "\n".join(messages))
+                        if hasattr(response, "__aiter__"):
+                            # A streamed reply is generated as it is sent, so it
+                            # is sent while the turn still holds its slot.
+                            await user.reply(response)
+                            response = None
+                        self.completed += 1
+                    except Exception as e:
+                        print(f"Error generating response for {username}: {e}")
+                        response = (
+                            "Sorry, I couldn't answer that one. Please try again."
+                        )
+                        self.failed += 1
+                    finally:
+                        self.running -= 1
+                if response is None:
+                    continue
+                try:
+                    await user.reply(response)
+                except Exception as e:
+                    print(f"Error sending response to {username}: {e}")
+        finally:
+            del self._users[username]
+
+    def metrics(self) -> Dict[str, float]:
+        """Return queue depth, wait time and throughput counters."""
+        waits = list(self._wait_times)
+        return {
+            "depth": self.depth,
+            "queued_users": len(self._users),
+            "running": self.running,
+            "submitted": self.submitted,
+            "coalesced": self.coalesced,
+            "rejected": self.rejected,
+            "completed": self.completed,
+            "failed": self.failed,
+            "wait_avg_s": statistics.fmean(waits) if waits else 0.0,
+            "wait_p95_s": (
+                statistics.quantiles(waits, n=20, method="inclusive")[18]
+                if len(waits) > 1
+                else 0.0
+            ),
+            "wait_max_s": max(waits, default=0.0),
+        }
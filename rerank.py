@@ -0,0 +1,175 @@
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+from decouple import config
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.postprocessor.types import BaseNodePostprocessor
+from llama_index.core.schema import MetadataMode, NodeWithScore, QueryBundle
+from pydantic import Field, PrivateAttr
+
+from bm25_index import tokenize
+from hybrid_retriever import VECTOR_SCORE_KEY
+
+# "cohere" calls the Cohere rerank API, "local" scores candidates on CPU with
+# embedding similarity and query term coverage, "none" keeps retrieval order.
+RERANK_BACKEND = config("RERANK_BACKEND", default="cohere")
+RERANK_TOP_N = config("RERANK_TOP_N", default=8, cast=int)
+# Candidates retrieved for the reranker to choose the top_n from.
+RERANK_CANDIDATES = config("RERANK_CANDIDATES", default=16, cast=int)
+# Gap in vector similarity at the top_n cut-off, as a fraction of the
+# candidates' similarity range, above which the retrieval order is trusted and
+# reranking is skipped.
+RERANK_SKIP_MARGIN = config("RERANK_SKIP_MARGIN", default=0.25, cast=float)
+# Weight of query term coverage against embedding similarity in the local score.
+RERANK_LEXICAL_WEIGHT = config("RERANK_LEXICAL_WEIGHT", default=0.3, cast=float)
+
+
+class LocalRerank(BaseNodePostprocessor):
+    """
+    CPU reranker scoring all candidates of a query in one batch.
+    The score blends the cosine similarity of query and candidate embeddings
+    with the share of query terms the candidate contains. Candidate texts are
+    the ones embedded at ingestion, so a cached embed model answers them without
+    an API call.
+    """
+
+    embed_model: BaseEmbedding = Field(description="Model embedding query and nodes.")
+    top_n: int = Field(default=RERANK_TOP_N)
+    lexical_weight: float = Field(default=RERANK_LEXICAL_WEIGHT)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "LocalRerank"
+
+    def _postprocess_nodes(
+        self,
+        nodes: List[NodeWithScore],
+        query_bundle: Optional[QueryBundle] = None,
+    ) -> List[NodeWithScore]:
+        if query_bundle is None:
+            raise ValueError("Missing query bundle in extra info.")
+        if not nodes:
+            return []
+        if query_bundle.embedding is None:
+            query_bundle.embedding = self.embed_model.get_query_embedding(
+                query_bundle.query_str
+            )
+        texts = [n.node.get_content(metadata_mode=MetadataMode.EMBED) for n in nodes]
+        matrix = np.asarray(
+            self.embed_model.get_text_embedding_batch(texts), dtype=np.float32
+        )
+        query = np.asarray(query_bundle.embedding, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+        dense = np.divide(
+            matrix @ query, norms, out=np.zeros(len(nodes), np.float32), where=norms > 0
+        )
+
+        query_terms = set(tokenize(query_bundle.query_str))
+        if query_terms:
+            coverage = np.array(
+                [len(query_terms.intersection(tokenize(t))) for t in texts],
+                dtype=np.float32,
+            ) / len(query_terms)
+        else:
+            coverage = np.zeros(len(nodes), np.float32)
+
+        scores = (1 - self.lexical_weight) * dense + self.lexical_weight * coverage
+        order = np.argsort(-scores, kind="stable")[: self.top_n]
+        return [
+            NodeWithScore(node=nodes[i].node, score=float(scores[i])) for i in order
+        ]
+
+
+class FastPathRerank(BaseNodePostprocessor):
+    """
+    Runs a reranker only when retrieval is unsure which candidates make the cut.
+    When the vector similarities of the top_n candidates are well separated
+    from the rest, or there are no more candidates than top_n, the retrieval
+    order is kept and the rerank call is saved. Similarities are read from
+    VECTOR_SCORE_KEY, as fused scores only reflect rank agreement; candidates
+    found by keyword alone rank below every vector match, and without any
+    similarities the node scores are used. A reranker of None always keeps the
+    retrieval order.
+    """
+
+    reranker: Optional[BaseNodePostprocessor] = Field(default=None)
+    top_n: int = Field(default=RERANK_TOP_N)
+    skip_margin: float = Field(default=RERANK_SKIP_MARGIN)
+
+    _stats: Dict[str, float] = PrivateAttr(
+        default_factory=lambda: {"reranked": 0, "skipped": 0, "rerank_seconds": 0.0}
+    )
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "FastPathRerank"
+
+    @staticmethod
+    def vector_scores(nodes: List[NodeWithScore]) -> List[float]:
+        """Vector similarity of each node, as far as the retriever kept it."""
+        scores = [n.node.metadata.get(VECTOR_SCORE_KEY) for n in nodes]
+        known = [s for s in scores if s is not None]
+        if not known:
+            return [n.score or 0.0 for n in nodes]
+        # A keyword-only match was not among the vector results, so it is no
+        # more similar than the least similar of them
+        return [min(known) if s is None else s for s in scores]
+
+    def well_separated(self, nodes: List[NodeWithScore]) -> bool:
+        if len(nodes) <= self.top_n:
+            return True
+        ranked = sorted(nodes, key=lambda n: n.score or 0.0, reverse=True)
+        scores = self.vector_scores(ranked)
+        spread = max(scores) - min(scores)
+        # Between the least similar node kept and the most similar one cut
+        gap = min(scores[: self.top_n]) - max(scores[self.top_n :])
+        return spread > 0 and gap / spread >= self.skip_margin
+
+    def _postprocess_nodes(
+        self,
+        nodes: List[NodeWithScore],
+        query_bundle: Optional[QueryBundle] = None,
+    ) -> List[NodeWithScore]:
+        if self.reranker is None or self.well_separated(nodes):
+            self._stats["skipped"] += 1
+            return sorted(nodes, key=lambda n: n.score or 0.0, reverse=True)[
+                : self.top_n
+            ]
+        start = time.perf_counter()
+        reranked = self.reranker.postprocess_nodes(nodes, query_bundle)
+        self._stats["rerank_seconds"] += time.perf_counter() - start
+        self._stats["reranked"] += 1
+        return reranked
+
+    def stats(self) -> Dict[str, float]:
+        """Return how many queries were reranked or skipped, and rerank time."""
+        return dict(self._stats)
+
+
+def create_reranker(
+    embed_model: BaseEmbedding,
+    backend: str = RERANK_BACKEND,
+    top_n: int = RERANK_TOP_N,
+    cohere_api_key: Optional[str] = None,
+) -> FastPathRerank:
+    """
+    Build the rerank stage for the configured backend.
+    :param embed_model: Embedding model used by the local backend.
+    :param backend: "cohere", "local" or "none".
+    :param cohere_api_key: API key for the cohere backend.
+    """
+    if backend == "cohere":
+        from llama_index.postprocessor.cohere_rerank import CohereRerank
+
+        reranker = CohereRerank(api_key=cohere_api_key, top_n=top_n)
+    elif backend == "local":
+        reranker = LocalRerank(embed_model=embed_model, top_n=top_n)
+    elif backend == "none":
+        reranker = None
+    else:
+        raise ValueError(
+            f"Unknown rerank backend: {backend}. "
+            "Supported backends are: cohere, local, none"
+        )
+    return FastPathRerank(reranker=reranker, top_n=top_n)
@@ -1,9 +1,22 @@
-from pydantic import BaseModel
+from typing import List
+
+from pydantic import BaseModel, Field
 
 
 class CoingeckoMarketData(BaseModel):
-    coin_id: str
+    coin_ids: List[str] = Field(
+        description="CoinGecko coin IDs, tickers or names, e.g. ['bitcoin', 'PEPE', '$WIF']; fetched in one request."
+    )
 
 
 class BinancePriceData(BaseModel):
     symbol: str
+
+
+class PriceMomentumData(BaseModel):
+    coin_ids: List[str] = Field(
+        description="CoinGecko coin IDs, tickers or names, e.g. ['bitcoin', 'PEPE']."
+    )
+    window_minutes: float = Field(
+        default=60, description="How far back to look, up to 1440 (24 hours)."
+    )
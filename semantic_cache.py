@@ -0,0 +1,162 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+import numpy as np
+from decouple import config
+from llama_index.core.base.base_query_engine import BaseQueryEngine
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.base.response.schema import RESPONSE_TYPE
+from llama_index.core.prompts.mixin import PromptMixinType
+from llama_index.core.schema import QueryBundle
+
+# Minimum cosine similarity for a new query to reuse a cached answer.
+SEMANTIC_CACHE_THRESHOLD = config("SEMANTIC_CACHE_THRESHOLD", default=0.95, cast=float)
+# Seconds a cached answer stays valid; market context goes stale quickly.
+SEMANTIC_CACHE_TTL = config("SEMANTIC_CACHE_TTL", default=300, cast=float)
+SEMANTIC_CACHE_MAX_ENTRIES = config("SEMANTIC_CACHE_MAX_ENTRIES", default=256, cast=int)
+
+
+class _CacheEntry:
+    def __init__(self, query: str, vector: np.ndarray, response: Any, latency: float):
+        self.query = query
+        self.vector = vector
+        self.response = response
+        self.latency = latency
+        self.created_at = time.monotonic()
+
+
+class SemanticCache:
+    """
+    Recent answers keyed by query embedding, matched by cosine similarity.
+    :param similarity_threshold: Minimum cosine similarity counted as a hit.
+    :param ttl: Seconds an entry stays valid.
+    :param max_entries: Maximum number of entries; the oldest is dropped first.
+    """
+
+    def __init__(
+        self,
+        similarity_threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        ttl: float = SEMANTIC_CACHE_TTL,
+        max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+    ):
+        self.similarity_threshold = similarity_threshold
+        self.ttl = ttl
+        self._entries: Deque[_CacheEntry] = deque(maxlen=max_entries)
+        # Stacked entry vectors, rebuilt lazily after the entries change.
+        self._matrix: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.seconds_saved = 0.0
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _expire(self) -> None:
+        cutoff = time.monotonic() - self.ttl
+        # Entries are kept in insertion order, so expired ones are at the front.
+        while self._entries and self._entries[0].created_at < cutoff:
+            self._entries.popleft()
+            self._matrix = None
+
+    def lookup(self, embedding: List[float]) -> Optional[Any]:
+        """Return the cached response closest to the embedding, if close enough."""
+        vector = self._normalize(embedding)
+        with self._lock:
+            self._expire()
+            if self._entries:
+                if self._matrix is None:
+                    self._matrix = np.stack([e.vector for e in self._entries])
+                similarities = self._matrix @ vector
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.similarity_threshold:
+                    entry = self._entries[best]
+                    self.hits += 1
+                    self.seconds_saved += entry.latency
+                    return entry.response
+            self.misses += 1
+            return None
+
+    def add(
+        self, query: str, embedding: List[float], response: Any, latency: float
+    ) -> None:
+        """Cache a response along with how long it took to produce."""
+        with self._lock:
+            self._entries.append(
+                _CacheEntry(query, self._normalize(embedding), response, latency)
+            )
+            self._matrix = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the query time saved."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "seconds_saved": self.seconds_saved,
+        }
+
+
+class SemanticCacheQueryEngine(BaseQueryEngine):
+    """
+    Query engine that answers semantically equivalent queries from a SemanticCache
+    and forwards everything else to the wrapped engine.
+    The query embedding is passed on with the query, so a miss does not embed twice.
+    """
+
+    def __init__(
+        self,
+        query_engine: BaseQueryEngine,
+        embed_model: BaseEmbedding,
+        cache: Optional[SemanticCache] = None,
+    ):
+        self.query_engine = query_engine
+        self.embed_model = embed_model
+        self.cache = cache or SemanticCache()
+        super().__init__(callback_manager=query_engine.callback_manager)
+
+    def _get_prompt_modules(self) -> PromptMixinType:
+        return {"query_engine": self.query_engine}
+
+    def _query(self, query_bundle: QueryBundle) -> RESPONSE_TYPE:
+        if query_bundle.embedding is None:
+            query_bundle.embedding = self.embed_model.get_query_embedding(
+                query_bundle.query_str
+            )
+        cached = self.cache.lookup(query_bundle.embedding)
+        if cached is not None:
+            return cached
+        start = time.perf_counter()
+        response = self.query_engine.query(query_bundle)
+        self.cache.add(
+            query_bundle.query_str,
+            query_bundle.embedding,
+            response,
+            time.perf_counter() - start,
+        )
+        return response
+
+    async def _aquery(self, query_bundle: QueryBundle) -> RESPONSE_TYPE:
+        if query_bundle.embedding is None:
+            query_bundle.embedding = await self.embed_model.aget_query_embedding(
+                query_bundle.query_str
+            )
+        cached = self.cache.lookup(query_bundle.embedding)
+        if cached is not None:
+            return cached
+        start = time.perf_counter()
+        response = await self.query_engine.aquery(query_bundle)
+        self.cache.add(
+            query_bundle.query_str,
+            query_bundle.embedding,
+            response,
+            time.perf_counter() - start,
+        )
+        return response
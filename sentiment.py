@@ -0,0 +1,171 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Sequence
+
+from decouple import config
+
+# Sentiment labels remembered by content hash.
+SENTIMENT_CACHE_SIZE = config("SENTIMENT_CACHE_SIZE", default=20000, cast=int)
+# Worker processes for large batches; 0 scores every batch in-process.
+SENTIMENT_POOL_WORKERS = config("SENTIMENT_POOL_WORKERS", default=0, cast=int)
+# Uncached texts a batch needs before it is sent to the process pool.
+SENTIMENT_POOL_MIN_BATCH = config("SENTIMENT_POOL_MIN_BATCH", default=500, cast=int)
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_MONTHS = {
+    month: i
+    for i, month in enumerate(
+        "jan feb mar apr may jun jul aug sep oct nov dec".split(), start=1
+    )
+}
+# Hours from UTC of the zone names RFC 822 allows.
+_ZONES = {"gmt": 0, "ut": 0, "utc": 0, "z": 0, "est": -5, "edt": -4}
+_ZONES.update({"cst": -6, "cdt": -5, "mst": -7, "mdt": -6, "pst": -8, "pdt": -7})
+# RFC 822 dates as RSS uses them, e.g. "Fri, 14 Mar 2025 11:58:00 +0000".
+_RFC822 = re.compile(
+    r"(?:[A-Za-z]{3},\s*)?(\d{1,2})\s+([A-Za-z]{3})[a-z]*\s+(\d{2,4})\s+"
+    r"(\d{1,2}):(\d{2})(?::(\d{2}))?\s*([+-]\d{4}|[A-Za-z]+)?"
+)
+
+
+def polarity_label(polarity: float) -> str:
+    if polarity > 0:
+        return "bullish"
+    elif polarity < 0:
+        return "bearish"
+    return "neutral"
+
+
+def score_texts(texts: Sequence[str]) -> List[str]:
+    """Label texts with TextBlob; a module function so pool workers can run it."""
+    from textblob import TextBlob
+
+    return [polarity_label(TextBlob(text).sentiment.polarity) for text in texts]
+
+
+def content_hash(text: str) -> bytes:
+    return hashlib.blake2b(text.encode(), digest_size=16).digest()
+
+
+def parse_timestamp(value: str) -> Optional[str]:
+    """
+    Parse an ISO 8601 or RFC 822 timestamp in one pass and format it in UTC as
+    TIMESTAMP_FORMAT. The format is picked from the first character instead of
+    trying strptime patterns in turn. Naive times are taken as UTC, so an
+    already formatted value comes back unchanged.
+    :return: The formatted time, or None if the value is not a known format.
+    """
+    value = value.strip()
+    if not value:
+        return None
+    if value[0].isdigit() and value[4:5] == "-":
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    else:
+        match = _RFC822.match(value)
+        if match is None:
+            return None
+        day, month, year, hour, minute, second, zone = match.groups()
+        if month.lower() not in _MONTHS:
+            return None
+        year = int(year)
+        if year < 100:
+            year += 2000
+        if zone is None or zone[0] not in "+-":
+            offset = timedelta(hours=_ZONES.get((zone or "utc").lower(), 0))
+        else:
+            offset = timedelta(hours=int(zone[1:3]), minutes=int(zone[3:5]))
+            if zone[0] == "-":
+                offset = -offset
+        try:
+            parsed = datetime(
+                year,
+                _MONTHS[month.lower()],
+                int(day),
+                int(hour),
+                int(minute),
+                int(second or 0),
+                tzinfo=timezone(offset),
+            )
+        except ValueError:
+            return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc)
+    return parsed.strftime(TIMESTAMP_FORMAT)
+
+
+class SentimentAnalyzer:
+    """
+    Batched TextBlob sentiment with an LRU memo keyed by content hash.
+    A batch scores each distinct uncached text once. With pool_workers set,
+    batches of at least pool_min_batch uncached texts are split across worker
+    processes, started on first use.
+    :param cache_size: Labels remembered.
+    :param pool_workers: Worker processes; 0 keeps scoring in-process.
+    """
+
+    def __init__(
+        self,
+        cache_size: int = SENTIMENT_CACHE_SIZE,
+        pool_workers: int = SENTIMENT_POOL_WORKERS,
+        pool_min_batch: int = SENTIMENT_POOL_MIN_BATCH,
+    ):
+        self.cache_size = cache_size
+        self.pool_workers = pool_workers
+        self.pool_min_batch = pool_min_batch
+        self._cache: "OrderedDict[bytes, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.stats = {"texts": 0, "hits": 0, "scored": 0, "pooled_batches": 0}
+
+    def _score(self, texts: List[str]) -> List[str]:
+        if self.pool_workers <= 0 or len(texts) < self.pool_min_batch:
+            return score_texts(texts)
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.pool_workers)
+        self.stats["pooled_batches"] += 1
+        chunk = -(-len(texts) // self.pool_workers)
+        labels = []
+        for part in self._pool.map(
+            score_texts, [texts[i : i + chunk] for i in range(0, len(texts), chunk)]
+        ):
+            labels.extend(part)
+        return labels
+
+    def analyze_batch(self, texts: Sequence[str]) -> List[str]:
+        """Return a bullish, bearish or neutral label per text, in order."""
+        keys = [content_hash(text) for text in texts]
+        labels: Dict[bytes, str] = {}
+        misses: Dict[bytes, str] = {}
+        with self._lock:
+            for key, text in zip(keys, texts):
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    labels[key] = self._cache[key]
+                else:
+                    misses.setdefault(key, text)
+        self.stats["texts"] += len(texts)
+        self.stats["hits"] += len(texts) - sum(1 for k in keys if k in misses)
+        if misses:
+            scored = self._score(list(misses.values()))
+            self.stats["scored"] += len(scored)
+            with self._lock:
+                for key, label in zip(misses, scored):
+                    labels[key] = self._cache[key] = label
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return [labels[key] for key in keys]
+
+    def close(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown()
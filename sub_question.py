@@ -0,0 +1,277 @@
+import asyncio
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from decouple import config
+from llama_index.core.base.base_retriever import BaseRetriever
+from llama_index.core.base.response.schema import RESPONSE_TYPE
+from llama_index.core.callbacks.schema import CBEventType, EventPayload
+from llama_index.core.query_engine import SubQuestionQueryEngine
+from llama_index.core.query_engine.sub_question_query_engine import (
+    SubQuestionAnswerPair,
+)
+from llama_index.core.question_gen.types import SubQuestion
+from llama_index.core.schema import NodeWithScore, QueryBundle
+from llama_index.core.utils import get_color_mapping, print_text
+
+# Give the QA agent a tool that splits multi-part questions into sub-questions.
+QA_SUB_QUESTIONS = config("QA_SUB_QUESTIONS", default=True, cast=bool)
+# Sub-questions of one question answered at the same time.
+SUB_QUESTION_CONCURRENCY = config("SUB_QUESTION_CONCURRENCY", default=4, cast=int)
+# Seconds a retrieval is reused by later queries asking the same thing.
+SHARED_RETRIEVAL_TTL = config("SHARED_RETRIEVAL_TTL", default=60, cast=float)
+SHARED_RETRIEVAL_MAX_ENTRIES = config(
+    "SHARED_RETRIEVAL_MAX_ENTRIES", default=128, cast=int
+)
+
+_WORD = re.compile(r"\w+")
+
+
+def normalize_query(text: str) -> str:
+    """Lowercased words of a query, so case and punctuation don't tell queries apart."""
+    return " ".join(_WORD.findall(text.lower()))
+
+
+def pool_sources(qa_pairs: List[SubQuestionAnswerPair]) -> List[NodeWithScore]:
+    """Source nodes of all sub-answers, each node once with its best score."""
+    pooled: Dict[str, NodeWithScore] = {}
+    for pair in qa_pairs:
+        for source in pair.sources:
+            kept = pooled.get(source.node.node_id)
+            if kept is None or (source.score or 0.0) > (kept.score or 0.0):
+                pooled[source.node.node_id] = source
+    return list(pooled.values())
+
+
+class SharedRetriever(BaseRetriever):
+    """
+    Shares retrievals between queries that ask the same thing.
+    A query arriving while the same query is being retrieved waits for that
+    lookup instead of starting its own, and results are reused for ttl
+    seconds; sub-questions answered concurrently miss the semantic cache
+    together, since it only stores finished answers. Every caller gets its
+    own NodeWithScore list over the same nodes. If the lookup is cancelled,
+    its waiters are woken and one of them retrieves in its place; a waiter
+    being cancelled leaves the lookup running for the others.
+    :param retriever: Retriever doing the lookups, e.g. a HybridRetriever.
+    :param ttl: Seconds a result is reused.
+    :param max_entries: Maximum number of results kept; the oldest is dropped first.
+    """
+
+    def __init__(
+        self,
+        retriever: BaseRetriever,
+        ttl: float = SHARED_RETRIEVAL_TTL,
+        max_entries: int = SHARED_RETRIEVAL_MAX_ENTRIES,
+    ):
+        self.retriever = retriever
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._results: "OrderedDict[str, Tuple[float, List[NodeWithScore]]]" = (
+            OrderedDict()
+        )
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.joined = 0
+        self.misses = 0
+        super().__init__(callback_manager=retriever.callback_manager)
+
+    @staticmethod
+    def _copy(nodes: List[NodeWithScore]) -> List[NodeWithScore]:
+        # Postprocessors may rescore results; the nodes themselves are shared
+        return [NodeWithScore(node=n.node, score=n.score) for n in nodes]
+
+    def _claim(self, key: str) -> Tuple[Optional[List[NodeWithScore]], Future, bool]:
+        """
+        Look the query up under the lock.
+        :return: Cached nodes, or the future to wait on and whether this
+            caller must do the retrieval and resolve it.
+        """
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is not None and time.monotonic() - cached[0] < self.ttl:
+                self._results.move_to_end(key)
+                self.hits += 1
+                return cached[1], None, False
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.joined += 1
+                return None, future, False
+            future = self._in_flight[key] = Future()
+            self.misses += 1
+            return None, future, True
+
+    def _settle(
+        self, key: str, future: Future, nodes=None, error: BaseException = None
+    ) -> None:
+        """
+        Resolve an owned lookup. An error that is not an Exception, e.g. the
+        owner's task being cancelled, cancels the future instead, so waiters
+        retry rather than fail with it.
+        """
+        with self._lock:
+            del self._in_flight[key]
+            if error is None:
+                self._results[key] = (time.monotonic(), nodes)
+                self._results.move_to_end(key)
+                while len(self._results) > self.max_entries:
+                    self._results.popitem(last=False)
+        if error is None:
+            future.set_result(nodes)
+        elif isinstance(error, Exception):
+            future.set_exception(error)
+        else:
+            future.cancel()
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        key = normalize_query(query_bundle.query_str)
+        while True:
+            nodes, future, owner = self._claim(key)
+            if nodes is not None:
+                return self._copy(nodes)
+            if owner:
+                break
+            try:
+                return self._copy(future.result())
+            except CancelledError:
+                continue
+        try:
+            nodes = self.retriever.retrieve(query_bundle)
+        except BaseException as e:
+            self._settle(key, future, error=e)
+            raise
+        self._settle(key, future, nodes)
+        return self._copy(nodes)
+
+    async def _aretrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        key = normalize_query(query_bundle.query_str)
+        while True:
+            nodes, future, owner = self._claim(key)
+            if nodes is not None:
+                return self._copy(nodes)
+            if owner:
+                break
+            try:
+                # Shielded, so a waiter being cancelled doesn't cancel the lookup
+                return self._copy(await asyncio.shield(asyncio.wrap_future(future)))
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+        try:
+            nodes = await self.retriever.aretrieve(query_bundle)
+        except BaseException as e:
+            self._settle(key, future, error=e)
+            raise
+        self._settle(key, future, nodes)
+        return self._copy(nodes)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._results.clear()
+
+
+class ParallelSubQuestionQueryEngine(SubQuestionQueryEngine):
+    """
+    SubQuestionQueryEngine answering the sub-questions of a question
+    concurrently, at most max_concurrency at a time. Sub-questions asking the
+    same tool the same thing are answered once, and a node found by several
+    sub-answers reaches the final synthesis once.
+    The sync path runs sub-questions on worker threads, so it also fans out
+    when called from the ReAct agent's tool thread.
+    """
+
+    max_concurrency: int = SUB_QUESTION_CONCURRENCY
+
+    @classmethod
+    def from_defaults(
+        cls, *args, max_concurrency: int = SUB_QUESTION_CONCURRENCY, **kwargs
+    ) -> "ParallelSubQuestionQueryEngine":
+        """
+        SubQuestionQueryEngine.from_defaults with a bound on concurrency.
+        :param max_concurrency: Sub-questions answered at the same time.
+        """
+        engine = super().from_defaults(*args, **kwargs)
+        engine.max_concurrency = max_concurrency
+        return engine
+
+    def _distinct(self, sub_questions: List[SubQuestion]) -> List[SubQuestion]:
+        distinct = {}
+        for sub_q in sub_questions:
+            key = (sub_q.tool_name, normalize_query(sub_q.sub_question))
+            distinct.setdefault(key, sub_q)
+        if self._verbose:
+            print_text(
+                f"Generated {len(sub_questions)} sub questions, "
+                f"{len(distinct)} distinct.\n"
+            )
+        return list(distinct.values())
+
+    def _nodes(
+        self, qa_pairs_all: List[Optional[SubQuestionAnswerPair]]
+    ) -> Tuple[List[NodeWithScore], List[NodeWithScore]]:
+        # filter out sub questions that failed
+        qa_pairs = [pair for pair in qa_pairs_all if pair is not None]
+        nodes = [self._construct_node(pair) for pair in qa_pairs]
+        return nodes, pool_sources(qa_pairs)
+
+    def _query(self, query_bundle: QueryBundle) -> RESPONSE_TYPE:
+        with self.callback_manager.event(
+            CBEventType.QUERY, payload={EventPayload.QUERY_STR: query_bundle.query_str}
+        ) as query_event:
+            sub_questions = self._distinct(
+                self._question_gen.generate(self._metadatas, query_bundle)
+            )
+            colors = get_color_mapping([str(i) for i in range(len(sub_questions))])
+            workers = max(1, min(self.max_concurrency, len(sub_questions)))
+            with ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix="sub-question"
+            ) as executor:
+                qa_pairs_all = list(
+                    executor.map(
+                        lambda i: self._query_subq(
+                            sub_questions[i], color=colors[str(i)]
+                        ),
+                        range(len(sub_questions)),
+                    )
+                )
+            nodes, source_nodes = self._nodes(qa_pairs_all)
+            response = self._response_synthesizer.synthesize(
+                query=query_bundle,
+                nodes=nodes,
+                additional_source_nodes=source_nodes,
+            )
+            query_event.on_end(payload={EventPayload.RESPONSE: response})
+        return response
+
+    async def _aquery(self, query_bundle: QueryBundle) -> RESPONSE_TYPE:
+        with self.callback_manager.event(
+            CBEventType.QUERY, payload={EventPayload.QUERY_STR: query_bundle.query_str}
+        ) as query_event:
+            sub_questions = self._distinct(
+                await self._question_gen.agenerate(self._metadatas, query_bundle)
+            )
+            colors = get_color_mapping([str(i) for i in range(len(sub_questions))])
+            semaphore = asyncio.Semaphore(max(1, self.max_concurrency))
+
+            async def answer(i: int) -> Optional[SubQuestionAnswerPair]:
+                async with semaphore:
+                    return await self._aquery_subq(
+                        sub_questions[i], color=colors[str(i)]
+                    )
+
+            qa_pairs_all = await asyncio.gather(
+                *(answer(i) for i in range(len(sub_questions)))
+            )
+            nodes, source_nodes = self._nodes(qa_pairs_all)
+            response = await self._response_synthesizer.asynthesize(
+                query=query_bundle,
+                nodes=nodes,
+                additional_source_nodes=source_nodes,
+            )
+            query_event.on_end(payload={EventPayload.RESPONSE: response})
+        return response